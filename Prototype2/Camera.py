@@ -1,8 +1,9 @@
 from Constants import *
+from FrameGrabber import *
+from CarLocator import *
 
 import cv2 as cv
 import numpy as np
-from time import time
 from heapq import nsmallest
 
 
@@ -23,7 +24,20 @@ class CameraInput:
             raise ValueError("Camera", "The number of track locations must be at least 2")
         
         self.__cameraFeed = cv.VideoCapture(1)
-        self.__backgroundSubtractor = cv.createBackgroundSubtractorMOG2(detectShadows=False)
+        # reads the camera on its own thread, so frames are ready the moment they're needed
+        self.__frameGrabber = FrameGrabber(self.__cameraFeed)
+        self.__frameGrabber.startReading()
+        # when the last frame processed for the car's location was taken
+        self.__lastFrameTime = 0.0
+        # the last place the car was seen and when, so the next getCarInfo can measure its
+        # speed from there with one new frame (INVALID when it wasn't found)
+        self.__lastCarLocation = INVALID
+        self.__lastCarTime = 0.0
+        # pixels per second, for predicting where the car will be in the next frame
+        self.__carVelocity = (0.0, 0.0)
+        self.__framesSinceFullFrameSearch = 0
+        # finds the car in the frames, using a background subtractor
+        self.__carLocator = CarLocator()
         self.__detector = cv.SimpleBlobDetector_create()
         
         self.__trackLocations = {}
@@ -69,8 +83,10 @@ class CameraInput:
         return np.array(colourRange, dtype="uint8")
     
     def close(self) -> None:
-        """correct way to close the camera input.
+        """correct way to close the camera input. The frame grabber is stopped first, as it
+        could be reading the camera.
         """
+        self.__frameGrabber.stopReading()
         self.__cameraFeed.release()
         
 # ==================== Validation Routine ========================================
@@ -115,11 +131,14 @@ class CameraInput:
             list: the collection of frames gathered
         """
         frames = []
+        timeOfFrame = 0.0
         for _ in range(SAMPLE_ITERATIONS):
-            success, frame = self.__cameraFeed.read()
-            if not success:
+            returnInfo = self.__frameGrabber.getFrameAfter(timeOfFrame)
+            if returnInfo is INVALID:
                 return INVALID
-            frames.append(frame)
+            frame, timeOfFrame = returnInfo
+            # copied, as the frame grabber reuses its frames
+            frames.append(frame.copy())
         return frames
     
     def __getAverageNumCarPixels(self, sampleFrames: list) -> int:
@@ -135,12 +154,7 @@ class CameraInput:
         """
         totalPixels = 0
         for frame in sampleFrames:
-            foregroundMask = self.__backgroundSubtractor.apply(frame)
-            foregroundMask = cv.blur(foregroundMask, (5, 5))
-            # we need to index '[0]' as np.where returns list format: [[all,the,xs], [all,the,ys]]
-            # len([all,the,xs]) will be the number of moving pixels.
-            # positive pixels are represented with value 255 which is white.
-            totalPixels += len(np.where(foregroundMask == 255)[0])
+            totalPixels += self.__carLocator.countCarPixels(frame)
         
         # prevent division by 0 error
         if len(sampleFrames) > 0:
@@ -154,8 +168,7 @@ class CameraInput:
         Args:
             trainingFrames (list): a collection of SAMPLE_ITERATIONS frames from the camera
         """
-        for frame in trainingFrames:
-            self.__backgroundSubtractor.apply(frame)
+        self.__carLocator.trainBackground(trainingFrames)
         
     def checkCameraConnected(self) -> bool:
         """Checks if the camera is actually sending the live video feed to me. 
@@ -167,11 +180,14 @@ class CameraInput:
             bool: True if blue dots can't be found, meaning the camera feed is connected.
         """
         resultForEachFrame = []
+        timeOfFrame = 0.0
         # take 3 repeat readings
         for _ in range(3):
-            success, frame = self.__cameraFeed.read()
-            if not success:
+            returnInfo = self.__frameGrabber.getFrameAfter(timeOfFrame)
+            if returnInfo is INVALID:
                 resultForEachFrame.append(False)
+                continue
+            frame, timeOfFrame = returnInfo
                 
             blueMask = cv.inRange(frame, *self.__BLUE_RANGE)
             blueMask = cv.bitwise_not(cv.blur(blueMask, (5,5)))
@@ -205,24 +221,22 @@ class CameraInput:
         
 
 # ==================== Training ========================================
-    @staticmethod
-    def __calcAverageLocation(mask: np.array) -> tuple:
-        """calculate the mean x and y position of all the positive pixels in the mask given. 
-        returns invalid if the mask is empty.
+    def __predictCarLocation(self, timeOfFrame: float) -> tuple:
+        """predicts where the car is from its last known location and velocity
 
         Args:
-            mask (np.array): the mask of the camera image
+            timeOfFrame (float): the time the frame was taken
 
         Returns:
-            tuple: meanX, meanY 
+            tuple: the predicted position, or INVALID if the car hasn't been seen within
+                   TRACKING_MAX_AGE seconds
         """
-        xCoords, yCoords = np.where(mask == 255)
-        
-        if len(xCoords) > 0:
-            return int(np.mean(xCoords)), int(np.mean(yCoords))
-        else:
+        timePassed = timeOfFrame - self.__lastCarTime
+        if self.__lastCarLocation is INVALID or timePassed > TRACKING_MAX_AGE:
             return INVALID
-
+        return (int(self.__lastCarLocation[0] + self.__carVelocity[0]*timePassed),
+                int(self.__lastCarLocation[1] + self.__carVelocity[1]*timePassed))
+    
     def __calcDistancePixels(self, startCoords: tuple, endCoords: tuple) -> float:
         """uses the 'distance between two points' formula to calculate the distance in pixels
 
@@ -236,22 +250,44 @@ class CameraInput:
         return np.sqrt(((endCoords[0] - startCoords[0])**2) + ((endCoords[1] - startCoords[1])**2))
 
     def __getCarLocationAndTimeOfMeasurement(self) -> tuple:
-        """uses the camera to find the cars location and saves the time when the frame was taken.
+        """uses the newest camera frame to find the cars location, along with the time the frame
+        was taken. It only waits for the camera if the newest frame has already been processed.
+        If the car was seen recently, it is only searched for in a region around where it is
+        predicted to be. The whole frame is searched if it wasn't, if it isn't found there, and
+        every ROI_FULL_FRAME_INTERVAL frames to keep the background up to date.
+        The result is remembered as the car's last known location.
 
         Returns:
             tuple: the car's position and the time the frame was taken.
         """
-        success, frame = self.__cameraFeed.read()
-        timeOfMeasurement = time()
-        if not success:
+        returnInfo = self.__frameGrabber.getLatestFrame(self.__lastFrameTime)
+        if returnInfo is INVALID:
+            self.__lastCarLocation = INVALID
             return INVALID
+        frame, timeOfMeasurement = returnInfo
+        self.__lastFrameTime = timeOfMeasurement
         
-        foreGroundMask = self.__backgroundSubtractor.apply(frame)
-        foreGroundMask = cv.blur(foreGroundMask, (5,5))
+        carLocation = INVALID
+        predictedLocation = self.__predictCarLocation(timeOfMeasurement)
+        self.__framesSinceFullFrameSearch += 1
+        if (predictedLocation is not INVALID and self.__carLocator.hasBackground() and
+            self.__framesSinceFullFrameSearch < ROI_FULL_FRAME_INTERVAL):
+            carLocation = self.__carLocator.locateInRegion(frame, predictedLocation)
+        if carLocation is INVALID:
+            carLocation = self.__carLocator.locateInFullFrame(frame)
+            self.__framesSinceFullFrameSearch = 0
         
-        carLocation = self.__calcAverageLocation(foreGroundMask)
         if carLocation is INVALID:
+            self.__lastCarLocation = INVALID
             return INVALID
+        if predictedLocation is not INVALID:
+            timePassed = timeOfMeasurement - self.__lastCarTime
+            self.__carVelocity = ((carLocation[0] - self.__lastCarLocation[0]) / timePassed,
+                                  (carLocation[1] - self.__lastCarLocation[1]) / timePassed)
+        else:
+            self.__carVelocity = (0.0, 0.0)
+        self.__lastCarLocation = carLocation
+        self.__lastCarTime = timeOfMeasurement
         return carLocation, timeOfMeasurement
             
     def __getCarSpeed(self, startCoords: tuple, endCoords: tuple, timeSeconds: float) -> float:
@@ -311,23 +347,35 @@ class CameraInput:
     def getCarInfo(self) -> dict:
         """calls all the necessary functions to get all the needed information. It stores all
         of this in a dictionary so that it can easily be returned.
+        The car's speed and direction need two locations. The car's last known location (from
+        the previous call) is used as the first one if it was seen within
+        LOCATION_REUSE_MAX_AGE seconds, so only one new frame is needed. That is only a couple
+        of frames, so only back to back calls (e.g. the end of one training iteration and the
+        start of the next) share a location: over a longer gap, such as waiting for an action,
+        the straight line between the locations would cut corners and could pass a track
+        location. Otherwise a second new frame is used.
 
         Returns:
             dict: all the information collected into this dictionary.
         """
+        previousCoords, previousTime = self.__lastCarLocation, self.__lastCarTime
         # getCarLocationAndTimeOfMeasurement doesn't always return 2 values so I cant use:
-        # startCoords, startTime = getCarLocationsAndTimeOfMeasurement() as it will cause an error.
+        # endCoords, endTime = getCarLocationsAndTimeOfMeasurement() as it will cause an error.
         returnInfo = self.__getCarLocationAndTimeOfMeasurement()
         if returnInfo is INVALID:
             return INVALID
         else:
-            startCoords, startTime = returnInfo
+            endCoords, endTime = returnInfo
         
-        returnInfo = self.__getCarLocationAndTimeOfMeasurement()
-        if returnInfo is INVALID:
-            return INVALID
+        if previousCoords is not INVALID and endTime - previousTime <= LOCATION_REUSE_MAX_AGE:
+            startCoords, startTime = previousCoords, previousTime
         else:
-            endCoords, endTime = returnInfo
+            startCoords, startTime = endCoords, endTime
+            returnInfo = self.__getCarLocationAndTimeOfMeasurement()
+            if returnInfo is INVALID:
+                return INVALID
+            else:
+                endCoords, endTime = returnInfo
         
         trackLocationInfo = self.__getNextTrackLocationInfo(startCoords, endCoords)
         if trackLocationInfo is INVALID:
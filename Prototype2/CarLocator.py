@@ -0,0 +1,332 @@
+from Constants import *
+
+import cv2 as cv
+import numpy as np
+from math import atan2
+
+
+class CarLocator:
+    """Finds the car in camera frames: anything that isn't the background is the car. The
+    background is learned by a background subtractor from every frame searched in full, and
+    the car is searched for either in the full frame or in a region of it around where it is
+    expected to be.
+    Processing a whole frame at the camera's resolution is expensive, so the full frame
+    search can be done coarse to fine: the background subtractor runs on the frame shrunk
+    pyramidLevels times (each level halves the width and height), which finds roughly where
+    the car is, and then its position is refined at full resolution in just that part of the
+    frame. 0 levels searches the full frame at full resolution.
+    When the background subtractor works on shrunk frames, a full resolution background is
+    kept as well (a running average of the frames, leaving out where the car is), so that
+    regions of the frame and the car's pixels are always compared at full resolution.
+    """
+    def __init__(self, pyramidLevels: int = PYRAMID_LEVELS) -> None:
+        """sets up the background subtractor, which learns what the track looks like
+
+        Args:
+            pyramidLevels (int, optional): how many times frames are halved in size for the
+                                           full frame search. Defaults to PYRAMID_LEVELS.
+
+        Raises:
+            ValueError: if pyramidLevels is negative
+        """
+        if pyramidLevels < 0:
+            raise ValueError("CarLocator", f"pyramidLevels must be >= 0, not '{pyramidLevels}'")
+        self.__pyramidLevels = pyramidLevels
+        # how many full resolution pixels wide one pixel of the shrunk frame is
+        self.__scale = 2 ** pyramidLevels
+        self.__backgroundSubtractor = cv.createBackgroundSubtractorMOG2(detectShadows=False)
+        # what the track looks like without the car, at the background subtractor's
+        # resolution. It is only taken from the subtractor when a region search needs it.
+        self.__backgroundImage = EMPTY
+        self.__backgroundIsOutOfDate = True
+        # what the track looks like without the car at full resolution (as float32), only
+        # used when the background subtractor works on shrunk frames
+        self.__fullBackground = EMPTY
+        self.__numBackgroundFrames = 0
+        self.__hasBackground = False
+
+    # ==================== Private ========================================
+    @staticmethod
+    def __binariseMask(mask: np.array) -> np.array:
+        """only the pixels that are still 255 after blurring (so every pixel around them is
+        moving too) are counted as the car, everything else is set to 0. This is done in place,
+        so no new mask is made.
+
+        Args:
+            mask (np.array): a blurred mask of the moving pixels
+
+        Returns:
+            np.array: the same mask, with only 0s and 255s
+        """
+        cv.threshold(mask, 254, 255, cv.THRESH_BINARY, dst=mask)
+        return mask
+
+    @staticmethod
+    def __calcAverageLocation(mask: np.array) -> tuple:
+        """calculate the mean x and y position of all the positive pixels in the mask given.
+        returns invalid if the mask is empty.
+
+        Args:
+            mask (np.array): the binarised mask of the camera image
+
+        Returns:
+            tuple: meanX, meanY
+        """
+        statistics = CarLocator.calcMaskStatistics(mask)
+        if statistics is INVALID:
+            return INVALID
+        meanX, meanY = statistics["centre"]
+        return int(meanX), int(meanY)
+
+    def __getBackgroundRegion(self, left: int, top: int, right: int, bottom: int) -> np.array:
+        """gets part of the background image at full resolution. If the background subtractor
+        works on shrunk frames, the full resolution background is used instead of its own.
+
+        Args:
+            left (int): the first column (x) of the region
+            top (int): the first row (y) of the region
+            right (int): one after the last column of the region
+            bottom (int): one after the last row of the region
+
+        Returns:
+            np.array: the background in the region
+        """
+        if self.__pyramidLevels > 0:
+            return cv.convertScaleAbs(self.__fullBackground[top:bottom, left:right])
+        if self.__backgroundIsOutOfDate:
+            self.__backgroundImage = self.__backgroundSubtractor.getBackgroundImage()
+            self.__backgroundIsOutOfDate = False
+        return self.__backgroundImage[top:bottom, left:right]
+
+    def __getBoxMask(self, frame: np.array, left: int, top: int, right: int,
+                     bottom: int) -> tuple:
+        """gets the pixels of a box of the frame that aren't the background, at full
+        resolution, by comparing the box with the background image. This is far cheaper than
+        searching the whole frame, as the car is a tiny part of it.
+
+        Args:
+            frame (np.array): the camera frame
+            left (int): the first column (x) of the box
+            top (int): the first row (y) of the box
+            right (int): one after the last column of the box
+            bottom (int): one after the last row of the box
+
+        Returns:
+            tuple: the mask of moving pixels in the box and the left and top of the box once
+                   it has been cut off at the edges of the frame, or INVALID if none of the box
+                   is in the frame
+        """
+        top, bottom = max(0, top), min(frame.shape[0], bottom)
+        left, right = max(0, left), min(frame.shape[1], right)
+        if top >= bottom or left >= right:
+            return INVALID
+
+        difference = cv.absdiff(frame[top:bottom, left:right],
+                                self.__getBackgroundRegion(left, top, right, bottom))
+        difference = cv.cvtColor(difference, cv.COLOR_BGR2GRAY)
+        _, foreGroundMask = cv.threshold(difference, ROI_DIFFERENCE_THRESHOLD, 255,
+                                         cv.THRESH_BINARY)
+        return self.__binariseMask(cv.blur(foreGroundMask, (5,5))), left, top
+
+    def __getForegroundMask(self, frame: np.array) -> np.array:
+        """shrinks the frame pyramidLevels times, then gets the pixels that aren't the
+        background. This also teaches the background subtractor the latest background.
+
+        Args:
+            frame (np.array): the camera frame at full resolution
+
+        Returns:
+            np.array: the mask of moving pixels at the shrunk resolution
+        """
+        shrunkFrame = frame
+        for _ in range(self.__pyramidLevels):
+            shrunkFrame = cv.pyrDown(shrunkFrame)
+        foreGroundMask = self.__backgroundSubtractor.apply(shrunkFrame)
+        self.__backgroundIsOutOfDate = True
+        self.__hasBackground = True
+        if self.__pyramidLevels > 0:
+            self.__updateFullBackground(frame, foreGroundMask)
+        # the car is much smaller in a shrunk frame, so a smaller blur is needed to keep it
+        foreGroundMask = cv.blur(foreGroundMask, (5,5) if self.__pyramidLevels == 0 else (3,3))
+        return self.__binariseMask(foreGroundMask)
+
+    def __locateCarInBox(self, frame: np.array, left: int, top: int, right: int,
+                         bottom: int) -> tuple:
+        """finds the car in a box of the frame at full resolution
+
+        Args:
+            frame (np.array): the camera frame
+            left (int): the first column (x) of the box
+            top (int): the first row (y) of the box
+            right (int): one after the last column of the box
+            bottom (int): one after the last row of the box
+
+        Returns:
+            tuple: the car's position, or INVALID if it isn't all inside the box (it has been
+                   lost, or is at the edge of the box so its position would be off)
+        """
+        boxMask = self.__getBoxMask(frame, left, top, right, bottom)
+        if boxMask is INVALID:
+            return INVALID
+        foreGroundMask, left, top = boxMask
+
+        statistics = self.calcMaskStatistics(foreGroundMask)
+        if statistics is INVALID:
+            return INVALID
+        # if any of the car is on the edge of the box, some of it could be outside
+        x, y, width, height = statistics["boundingBox"]
+        if (x == 0 or y == 0 or x + width == foreGroundMask.shape[1] or
+            y + height == foreGroundMask.shape[0]):
+            return INVALID
+        meanX, meanY = statistics["centre"]
+        return int(meanX) + left, int(meanY) + top
+
+    def __updateFullBackground(self, frame: np.array, coarseMask: np.array) -> None:
+        """teaches the full resolution background the latest frame, as a running average that
+        learns as fast as the background subtractor (1/history of the way to each new frame).
+        Pixels the background subtractor found moving, and the shrunk pixels around them, are
+        left out so the car never blurs into the background.
+
+        Args:
+            frame (np.array): the camera frame at full resolution
+            coarseMask (np.array): the background subtractor's mask of moving pixels
+        """
+        self.__numBackgroundFrames += 1
+        if self.__numBackgroundFrames == 1:
+            self.__fullBackground = frame.astype("float32")
+            return
+        s = self.__scale
+        movingMask = cv.dilate(coarseMask, np.ones((3,3), dtype="uint8"))
+        # a shrunk frame is rounded up in size, so the enlarged mask can be a bit too big
+        movingMask = cv.resize(movingMask, (movingMask.shape[1]*s, movingMask.shape[0]*s),
+                               interpolation=cv.INTER_NEAREST)
+        stillMask = cv.bitwise_not(movingMask[:frame.shape[0], :frame.shape[1]])
+        learningRate = 1 / min(self.__numBackgroundFrames,
+                               self.__backgroundSubtractor.getHistory())
+        cv.accumulateWeighted(frame, self.__fullBackground, learningRate, mask=stillMask)
+
+    # ==================== Public ========================================
+    @staticmethod
+    def calcMaskStatistics(mask: np.array) -> dict:
+        """calculates everything needed about the positive pixels in a mask in one pass over
+        it, from its image moments, without making an array of their coordinates.
+
+        Args:
+            mask (np.array): a mask with only 0s and 255s
+
+        Returns:
+            dict: the number of positive pixels, their centre (x, y), their bounding box
+                  (x, y, width, height) and the angle of their longest axis from the x axis in
+                  radians, or INVALID if there are none
+        """
+        moments = cv.moments(mask, binaryImage=True)
+        if moments["m00"] == 0:
+            return INVALID
+        return {
+            "numPixels": int(moments["m00"]),
+            "centre": (moments["m10"] / moments["m00"], moments["m01"] / moments["m00"]),
+            "boundingBox": cv.boundingRect(mask),
+            "orientation": 0.5 * atan2(2*moments["mu11"], moments["mu20"] - moments["mu02"])
+        }
+
+    def countCarPixels(self, frame: np.array) -> int:
+        """counts the moving pixels in the frame at full resolution, which should be the car.
+        If the background subtractor works on shrunk frames, they are counted in the box
+        around its moving pixels (with PYRAMID_MARGIN pixels spare on each side), so every
+        pixel of the car is counted once, like it is with 0 pyramid levels.
+        This also teaches the background subtractor the latest background.
+
+        Args:
+            frame (np.array): the camera frame
+
+        Returns:
+            int: the number of moving pixels
+        """
+        foreGroundMask = self.__getForegroundMask(frame)
+        if self.__pyramidLevels > 0:
+            x, y, width, height = cv.boundingRect(foreGroundMask)
+            if width == 0:
+                return 0
+            s = self.__scale
+            boxMask = self.__getBoxMask(frame,
+                                        x*s - PYRAMID_MARGIN,
+                                        y*s - PYRAMID_MARGIN,
+                                        (x+width)*s + PYRAMID_MARGIN,
+                                        (y+height)*s + PYRAMID_MARGIN)
+            if boxMask is INVALID:
+                return 0
+            foreGroundMask = boxMask[0]
+        # positive pixels are represented with value 255 which is white.
+        return cv.countNonZero(foreGroundMask)
+
+    def hasBackground(self) -> bool:
+        """getter for whether the background has been learned yet
+
+        Returns:
+            bool: True once the background subtractor has seen a frame, so regions can be
+                  searched
+        """
+        return self.__hasBackground
+
+    def locateInFullFrame(self, frame: np.array) -> tuple:
+        """finds the car anywhere in the frame, coarse to fine if pyramidLevels > 0: the car's
+        bounding box is found in the shrunk frame, then its position is refined at full
+        resolution in that box (with PYRAMID_MARGIN pixels spare on each side). If the
+        refining fails, the position found in the shrunk frame is used.
+        This also teaches the background subtractor the latest background.
+
+        Args:
+            frame (np.array): the camera frame
+
+        Returns:
+            tuple: the car's x, y position, or INVALID if it couldn't be found
+        """
+        foreGroundMask = self.__getForegroundMask(frame)
+        if self.__pyramidLevels == 0:
+            return self.__calcAverageLocation(foreGroundMask)
+
+        # the shrunk mask is small, so labelling it is cheap, and it means a speck of noise
+        # elsewhere in the frame can't stretch the box the car is refined in
+        numLabels, _, stats, centres = cv.connectedComponentsWithStats(foreGroundMask)
+        if numLabels <= 1:
+            return INVALID
+        # label 0 is the background, the biggest of the rest is the car
+        car = 1 + int(np.argmax(stats[1:, cv.CC_STAT_AREA]))
+        x, y, width, height = (int(value) for value in stats[car, :4])
+        s = self.__scale
+        carLocation = self.__locateCarInBox(frame,
+                                            x*s - PYRAMID_MARGIN,
+                                            y*s - PYRAMID_MARGIN,
+                                            (x+width)*s + PYRAMID_MARGIN,
+                                            (y+height)*s + PYRAMID_MARGIN)
+        if carLocation is INVALID:
+            # the middle of the shrunk pixels, in full resolution pixels
+            return int(centres[car][0]*s + (s-1)/2), int(centres[car][1]*s + (s-1)/2)
+        return carLocation
+
+    def locateInRegion(self, frame: np.array, predictedCoords: tuple) -> tuple:
+        """finds the car within ROI_HALF_SIZE pixels of where it is predicted to be. The
+        background subtractor isn't used (or taught), so a full frame search is needed every
+        so often to keep the background up to date.
+
+        Args:
+            frame (np.array): the camera frame
+            predictedCoords (tuple): the x, y position the car is predicted to be at
+
+        Returns:
+            tuple: the car's position, or INVALID if it isn't all inside the region
+        """
+        return self.__locateCarInBox(frame,
+                                     predictedCoords[0] - ROI_HALF_SIZE,
+                                     predictedCoords[1] - ROI_HALF_SIZE,
+                                     predictedCoords[0] + ROI_HALF_SIZE,
+                                     predictedCoords[1] + ROI_HALF_SIZE)
+
+    def trainBackground(self, trainingFrames: list) -> None:
+        """trains the background subtractor on the frames passed in.
+
+        Args:
+            trainingFrames (list): a collection of frames from the camera
+        """
+        for frame in trainingFrames:
+            self.__getForegroundMask(frame)
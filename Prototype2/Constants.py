@@ -28,6 +28,15 @@ SAMPLE_ITERATIONS = 50
 NUM_TRACK_LOCATIONS = 6
 NUM_CAR_PIXELS_RANGE = [3500, 5500] # optimum car pixels ~= 4200
 MILLIMETERS_PER_PIXEL = 2000 / 1442 # track is 2000mm wide. track is 1432 pixels wide on the camera
+FRAME_RING_SIZE = 4 # camera frames kept by the frame grabber thread
+FRAME_TIMEOUT = 1.0 # seconds to wait for a new camera frame before giving up
+TRACKING_MAX_AGE = 0.5 # seconds a car location is used for to predict where to search for the car next
+LOCATION_REUSE_MAX_AGE = 0.1 # seconds a car location is reused for as the start of the next speed measurement
+ROI_HALF_SIZE = 160 # pixels either side of the predicted car location that it is searched for in
+ROI_DIFFERENCE_THRESHOLD = 40 # how different (0-255) a pixel must be from the background to be the car
+ROI_FULL_FRAME_INTERVAL = 100 # frames between searches of the whole frame, which update the background
+PYRAMID_LEVELS = 2 # times frames are halved in size to search the whole frame for the car (0 for full size)
+PYRAMID_MARGIN = 8 # pixels spare around the car when refining its location at full size
 
 
 # Hardware
@@ -54,4 +63,36 @@ DISCOUNT_FACTOR = 0.9
 MAX_EXPLORING_ITERATIONS = 1000000
 STATE_SHAPE = [[0, 0, 0], [1, 99, 999], [1, 30, 100]]
 ACTION_SHAPE = [30, 90, 2]
-WAITING_TIME_FOR_ACTION = 0.3 # second
\ No newline at end of file
+WAITING_TIME_FOR_ACTION = 0.3 # second
+QTABLE_FILE_NAME = "QTable.qtable" # binary QTable that training is saved to and resumed from
+QTABLE_STORAGE = "dense" # "dense" or "sparse" (only visited states are stored)
+SPARSE_QTABLE_INITIAL_COLUMNS = 256 # doubles whenever it runs out
+QTABLE_DTYPE = "float32" # "float64", "float32", "float16" or "int16"
+QTABLE_INT16_SCALE = 1.0 # int16 only: the QValue of one int16 step
+QTABLE_INT16_OFFSET = 0.0 # int16 only: the QValue an int16 of 0 stands for
+FILE_BLOCK_STATES = 4096 # states read or written at a time when loading or saving the QTable file
+JOURNAL_BUFFER_RECORDS = 64 # QTable updates buffered before they're written to the journal
+CHECKPOINT_INTERVAL = 30 # seconds between QTable checkpoints during training
+EXPORT_BLOCK_STATES = 4096 # states formatted at a time when exporting the QTable as text
+SNAPSHOT_INTERVAL = 20 # training iterations between QTable snapshots published for other threads
+SNAPSHOT_BLOCK_STATES = 1024 # states per block of a snapshot, only the blocks trained on are copied when publishing
+REPLAY_BUFFER_CAPACITY = 10000 # most recent transitions remembered for experience replay
+REPLAY_BATCH_SIZE = 32 # past transitions learned from again between each real action
+REPLAY_MODE = "uniform" # "uniform" or "prioritised" (by TD error) experience replay
+REPLAY_PRIORITY_ALPHA = 0.6 # prioritised only: 0 is uniform sampling, 1 is fully by priority
+REPLAY_PRIORITY_BETA = 0.4 # prioritised only: starting sampling bias correction, annealed to 1
+REPLAY_PRIORITY_EPSILON = 0.01 # prioritised only: added to |TD error| so nothing has 0 priority
+DYNA_PLANNING = True # plan with a learned model of the track while waiting for each action
+DYNA_BATCH_SIZE = 64 # made up transitions learned from at once while planning
+DYNA_MAX_UPDATES_PER_PAIR = 4 # most made up transitions learned from per pair in the model while waiting for each action
+Q_LAMBDA = 0.0 # Watkins Q(lambda) trace decay: 0 is one step Q-learning, e.g. 0.9 for traces
+TRACE_CUTOFF = 0.01 # eligibility traces smaller than this are dropped
+STARTING_REWARD = 2000.0 # the total reward an agent starts with (any arbitrary value should work)
+RANDOM_BLOCK_SIZE = 4096 # random numbers drawn at once for scalar draws
+SPEED_REWARD_WEIGHT = 0.1 # reward for each mm/s of speed
+LAP_REWARD_WEIGHT = 10 # reward for each lap completed without deslotting
+DESLOT_REWARD_FACTOR = 0.5 # the total reward is multiplied by this when the car deslots
+EXPLORATION_SCHEDULE = "cosine" # P(explore) over training: "cosine", "exponential", "linear" or "piecewise"
+EXPLORATION_TABLE_SIZE = 4096 # points P(explore) is precomputed at, interpolated between
+EXPLORATION_DECAY = 1 - 1e-5 # exponential only: P(explore) is multiplied by this every iteration
+EXPLORATION_POINTS = [[0, 1], [0.2, 0.5], [0.8, 0.05], [1, 0]] # piecewise only: [fraction of MAX_EXPLORING_ITERATIONS, P(explore)]
@@ -0,0 +1,125 @@
+from Constants import *
+from RandomStream import *
+
+import numpy as np
+
+
+class DynaModel:
+    """A learned model of the track for Dyna-Q planning. For every state and action the car has
+    tried, it counts how often each next state (and whether the car deslotted) followed, and
+    keeps the average reward. Planning then samples made-up transitions from these counts,
+    which the QAgent learns from as if they were real.
+    Outcomes are added one at a time while training, but sampled in large batches while
+    planning, so they're kept in lists and only turned into numpy arrays (once) when they are
+    first sampled after a change.
+    """
+    def __init__(self, randomStream: RandomStream = None) -> None:
+        """starts with an empty model that hasn't seen any transitions
+
+        Args:
+            randomStream (RandomStream, optional): where samples are drawn from. None for a new
+                                                   unseeded stream. Defaults to None.
+        """
+        self.__random = RandomStream() if randomStream is None else randomStream
+        # (state, action) -> index of the pair in the pair lists
+        self.__pairs = {}
+        self.__pairStates = []
+        self.__pairActions = []
+        self.__pairVisits = []
+        self.__pairRewardSums = []
+        # (pair index, next state, done) -> index of the outcome in the outcome lists
+        self.__outcomes = {}
+        self.__outcomePairs = []
+        self.__outcomeNextStates = []
+        self.__outcomeDones = []
+        self.__outcomeCounts = []
+        # the arrays sample() uses, rebuilt after the model changes (EMPTY when out of date)
+        self.__sampleArrays = EMPTY
+
+    # ==================== Private ========================================
+    def __buildSampleArrays(self) -> tuple:
+        """builds the arrays needed to sample outcomes. Each pair is picked with the same
+        probability, then one of its outcomes in proportion to how often it happened, so an
+        outcome's probability is its count / its pair's visits / the number of pairs. Their
+        running total lets a batch of outcomes be picked with one np.searchsorted.
+
+        Returns:
+            tuple: the running total of the outcome probabilities, and arrays of the states,
+                   actions, average rewards, next states and done flags of each outcome
+        """
+        outcomePairs = np.array(self.__outcomePairs, dtype="int64")
+        pairVisits = np.array(self.__pairVisits, dtype="float64")
+        averageRewards = np.array(self.__pairRewardSums) / pairVisits
+        probabilities = (np.array(self.__outcomeCounts, dtype="float64") /
+                         pairVisits[outcomePairs] / len(self.__pairs))
+        return (np.cumsum(probabilities),
+                np.array(self.__pairStates, dtype="int64")[outcomePairs],
+                np.array(self.__pairActions, dtype="int64")[outcomePairs],
+                averageRewards[outcomePairs],
+                np.array(self.__outcomeNextStates, dtype="int64"),
+                np.array(self.__outcomeDones, dtype="bool"))
+
+    # ==================== Public ========================================
+    def add(self, state: int, action: int, reward: float, nextState: int, done: bool) -> None:
+        """counts a real transition towards the model
+
+        Args:
+            state (int): the integer state the car started in
+            action (int): the integer action taken
+            reward (float): the reward the action led to
+            nextState (int): the integer state the car ended in
+            done (bool): True if the run ended with this transition (e.g. the car deslotted)
+        """
+        pair = self.__pairs.get((state, action))
+        if pair is None:
+            pair = len(self.__pairStates)
+            self.__pairs[(state, action)] = pair
+            self.__pairStates.append(state)
+            self.__pairActions.append(action)
+            self.__pairVisits.append(0)
+            self.__pairRewardSums.append(0.0)
+        self.__pairVisits[pair] += 1
+        self.__pairRewardSums[pair] += reward
+
+        outcome = self.__outcomes.get((pair, nextState, done))
+        if outcome is None:
+            outcome = len(self.__outcomeCounts)
+            self.__outcomes[(pair, nextState, done)] = outcome
+            self.__outcomePairs.append(pair)
+            self.__outcomeNextStates.append(nextState)
+            self.__outcomeDones.append(done)
+            self.__outcomeCounts.append(0)
+        self.__outcomeCounts[outcome] += 1
+        self.__sampleArrays = EMPTY
+
+    def getNumPairs(self) -> int:
+        """getter for the number of pairs that can be planned from
+
+        Returns:
+            int: the number of different (state, action) pairs the model has seen
+        """
+        return len(self.__pairs)
+
+    def sample(self, batchSize: int) -> tuple:
+        """makes up transitions from the model: a (state, action) pair that has been seen is
+        picked at random, then a next state in proportion to how often it followed
+
+        Args:
+            batchSize (int): the number of transitions to make up
+
+        Returns:
+            tuple: arrays of the states, actions, average rewards, next states and done flags,
+                   or EMPTY if the model hasn't seen any transitions
+        """
+        if len(self.__pairs) == 0:
+            return EMPTY
+        if self.__sampleArrays is EMPTY:
+            self.__sampleArrays = self.__buildSampleArrays()
+        cumulativeProbabilities, states, actions, rewards, nextStates, dones = self.__sampleArrays
+        # the last total may be a tiny bit under 1 due to rounding, so don't pick past the end
+        indices = np.minimum(np.searchsorted(cumulativeProbabilities,
+                                             self.__random.randomArray(batchSize),
+                                             side="right"),
+                             len(cumulativeProbabilities) - 1)
+        return (states[indices], actions[indices], rewards[indices], nextStates[indices],
+                dones[indices])
@@ -0,0 +1,72 @@
+from Constants import *
+
+import numpy as np
+
+
+class EligibilityTraces:
+    """The eligibility traces for Watkins Q(lambda): how much credit each recently visited
+    (state, action) pair gets for the TD error of the latest transition. Each trace starts at 1
+    when its pair is visited and shrinks by DISCOUNT_FACTOR * Q_LAMBDA every step, so it's
+    dropped once it falls below TRACE_CUTOFF. Only those few active traces are stored, as
+    arrays of states, actions and values, so every step costs O(active traces) rather than
+    O(size of the QTable).
+    """
+    def __init__(self, decay: float = DISCOUNT_FACTOR * Q_LAMBDA,
+                 cutoff: float = TRACE_CUTOFF) -> None:
+        """starts with no active traces
+
+        Args:
+            decay (float, optional): what every trace is multiplied by each step. Defaults to
+                                     DISCOUNT_FACTOR * Q_LAMBDA.
+            cutoff (float, optional): traces smaller than this are dropped. Defaults to
+                                      TRACE_CUTOFF.
+        """
+        self.__decay = decay
+        self.__cutoff = cutoff
+        self.clear()
+
+    # ==================== Public ========================================
+    def clear(self) -> None:
+        """drops every trace, e.g. when the run ends or the agent explores (which Watkins
+        Q(lambda) can't give credit through)
+        """
+        self.__states = np.zeros(0, dtype="int64")
+        self.__actions = np.zeros(0, dtype="int64")
+        self.__values = np.zeros(0, dtype="float64")
+
+    def decay(self) -> None:
+        """shrinks every trace by one step, dropping the ones that fall below the cutoff
+        """
+        self.__values *= self.__decay
+        active = self.__values >= self.__cutoff
+        self.__states = self.__states[active]
+        self.__actions = self.__actions[active]
+        self.__values = self.__values[active]
+
+    def getNumActive(self) -> int:
+        """getter for how many traces are currently active
+
+        Returns:
+            int: the number of traces stored
+        """
+        return len(self.__values)
+
+    def getTraces(self) -> tuple:
+        """getter for the active traces, for updating all of their QValues at once
+
+        Returns:
+            tuple: arrays of the states, actions and values of the active traces
+        """
+        return self.__states, self.__actions, self.__values
+
+    def visit(self, state: int, action: int) -> None:
+        """sets the trace of the pair to 1 (a replacing trace), adding it if it isn't active
+
+        Args:
+            state (int): the integer state
+            action (int): the integer action
+        """
+        isPair = (self.__states == state) & (self.__actions == action)
+        self.__states = np.append(self.__states[~isPair], state)
+        self.__actions = np.append(self.__actions[~isPair], action)
+        self.__values = np.append(self.__values[~isPair], 1.0)
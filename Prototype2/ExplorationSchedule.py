@@ -0,0 +1,204 @@
+from Constants import *
+
+import numpy as np
+import sys
+from abc import ABC, abstractmethod
+
+
+class ExplorationSchedule(ABC):
+    """How the probability to explore falls over training, from 1 at the start to 0 after
+    maxExploringIterations. A schedule only has to say what P(explore) is at each fraction of
+    the way through exploring (see _calcProbabilities). That is worked out once, at
+    EXPLORATION_TABLE_SIZE evenly spaced points, and every lookup after that interpolates
+    between them, which costs a couple of python float operations per training iteration
+    rather than a numpy scalar calculation.
+    """
+    def __init__(self, maxExploringIterations: int = MAX_EXPLORING_ITERATIONS,
+                 tableSize: int = EXPLORATION_TABLE_SIZE) -> None:
+        """precomputes P(explore) at tableSize evenly spaced points of training
+
+        Args:
+            maxExploringIterations (int, optional): the training iterations until P(explore)
+                                                    reaches 0. Defaults to
+                                                    MAX_EXPLORING_ITERATIONS.
+            tableSize (int, optional): the number of points P(explore) is precomputed at.
+                                       Defaults to EXPLORATION_TABLE_SIZE.
+
+        Raises:
+            ValueError: if maxExploringIterations is 0, as it would cause a division by 0 error
+            if left unchecked.
+        """
+        if not maxExploringIterations > 0:
+            raise ValueError("ExplorationSchedule", "maxExploringIterations "+
+                             "(MAX_EXPLORING_ITERATIONS) must be > 0")
+        self.__maxExploringIterations = maxExploringIterations
+        # the table has tableSize gaps, so a point every iterationsPerPoint iterations
+        self.__iterationsPerPoint = maxExploringIterations / tableSize
+        self.__table = np.clip(self._calcProbabilities(np.linspace(0, 1, tableSize + 1)), 0, 1)
+        # python floats are faster than numpy scalars for one lookup at a time
+        self.__tableList = self.__table.tolist()
+
+    # ==================== Protected ========================================
+    @abstractmethod
+    def _calcProbabilities(self, progress: np.ndarray) -> np.ndarray:
+        """calculates P(explore) for each fraction of the way through exploring. Every schedule
+        must override this.
+
+        Args:
+            progress (np.ndarray): fractions from 0 (the start of training) to 1 (when
+                                   exploring stops)
+
+        Returns:
+            np.ndarray: P(explore) at each fraction
+        """
+
+    # ==================== Public ========================================
+    def getMaxExploringIterations(self) -> int:
+        """getter for the length of the exploring part of training
+
+        Returns:
+            int: the training iterations until P(explore) reaches 0
+        """
+        return self.__maxExploringIterations
+
+    def getProbabilities(self, iterations: np.ndarray) -> np.ndarray:
+        """the array version of getProbability, e.g. for vectorised training or plotting
+
+        Args:
+            iterations (np.ndarray): numbers of successful training iterations completed
+
+        Returns:
+            np.ndarray: P(explore) after each number of iterations
+        """
+        points = np.asarray(iterations, dtype="float64") / self.__iterationsPerPoint
+        probabilities = np.interp(points, np.arange(len(self.__table)), self.__table)
+        return np.where(points >= len(self.__table) - 1, 0.0, probabilities)
+
+    def getProbability(self, iterations: int) -> float:
+        """interpolates P(explore) between the two nearest precomputed points
+
+        Args:
+            iterations (int): the number of successful training iterations completed
+
+        Returns:
+            float: the value between 0 -> 1 for P(explore), 0 once exploring has finished
+        """
+        point = iterations / self.__iterationsPerPoint
+        i = int(point)
+        if i >= len(self.__tableList) - 1:
+            return 0.0
+        low = self.__tableList[i]
+        return low + (self.__tableList[i + 1] - low) * (point - i)
+
+
+class CosineSchedule(ExplorationSchedule):
+    """Half a cosine wave: explores a lot for longer at the start, then falls quickly in the
+    middle and levels off towards 0. This was the original QAgent schedule.
+    """
+    def _calcProbabilities(self, progress: np.ndarray) -> np.ndarray:
+        return 0.5 * np.cos(np.pi * progress) + 0.5
+
+
+class LinearSchedule(ExplorationSchedule):
+    """Falls at the same rate all the way from 1 to 0."""
+    def _calcProbabilities(self, progress: np.ndarray) -> np.ndarray:
+        return 1 - progress
+
+
+class ExponentialSchedule(ExplorationSchedule):
+    """P(explore) is multiplied by decay every training iteration, so it falls quickly at the
+    start and exploring mostly happens early on. It is cut to 0 after maxExploringIterations.
+    """
+    def __init__(self, maxExploringIterations: int = MAX_EXPLORING_ITERATIONS,
+                 tableSize: int = EXPLORATION_TABLE_SIZE,
+                 decay: float = EXPLORATION_DECAY) -> None:
+        """a schedule where P(explore) decays by the same fraction every iteration
+
+        Args:
+            maxExploringIterations (int, optional): see ExplorationSchedule. Defaults to
+                                                    MAX_EXPLORING_ITERATIONS.
+            tableSize (int, optional): see ExplorationSchedule. Defaults to
+                                       EXPLORATION_TABLE_SIZE.
+            decay (float, optional): what P(explore) is multiplied by every iteration (0 -> 1).
+                                     Defaults to EXPLORATION_DECAY.
+        """
+        # needed by _calcProbabilities, which the base constructor calls
+        self.__decay = decay
+        super().__init__(maxExploringIterations, tableSize)
+
+    def _calcProbabilities(self, progress: np.ndarray) -> np.ndarray:
+        return self.__decay ** (progress * self.getMaxExploringIterations())
+
+
+class PiecewiseSchedule(ExplorationSchedule):
+    """Straight lines between chosen points, to shape exploring by hand, e.g. a long period of
+    high P(explore) followed by a short fall.
+    """
+    def __init__(self, maxExploringIterations: int = MAX_EXPLORING_ITERATIONS,
+                 tableSize: int = EXPLORATION_TABLE_SIZE,
+                 points: list = EXPLORATION_POINTS) -> None:
+        """a schedule that goes in straight lines between the points given
+
+        Args:
+            maxExploringIterations (int, optional): see ExplorationSchedule. Defaults to
+                                                    MAX_EXPLORING_ITERATIONS.
+            tableSize (int, optional): see ExplorationSchedule. Defaults to
+                                       EXPLORATION_TABLE_SIZE.
+            points (list, optional): [fraction of maxExploringIterations, P(explore)] pairs,
+                                     in order of fraction. Defaults to EXPLORATION_POINTS.
+
+        Raises:
+            ValueError: if the fractions aren't in increasing order
+        """
+        fractions = np.array([fraction for fraction, _ in points], dtype="float64")
+        if np.any(np.diff(fractions) <= 0):
+            raise ValueError("PiecewiseSchedule", f"the fractions of the points must be in "+
+                                                  f"increasing order, not '{points}'")
+        self.__fractions = fractions
+        self.__probabilities = np.array([probability for _, probability in points],
+                                        dtype="float64")
+        super().__init__(maxExploringIterations, tableSize)
+
+    def _calcProbabilities(self, progress: np.ndarray) -> np.ndarray:
+        return np.interp(progress, self.__fractions, self.__probabilities)
+
+
+# the name of each schedule, for EXPLORATION_SCHEDULE
+SCHEDULES = {"cosine": CosineSchedule,
+             "linear": LinearSchedule,
+             "exponential": ExponentialSchedule,
+             "piecewise": PiecewiseSchedule}
+
+
+def makeExplorationSchedule(name: str = EXPLORATION_SCHEDULE,
+                            maxExploringIterations: int = MAX_EXPLORING_ITERATIONS
+                            ) -> ExplorationSchedule:
+    """makes a schedule from its name, with the rest of its settings from the constants
+
+    Args:
+        name (str, optional): one of SCHEDULES. Defaults to EXPLORATION_SCHEDULE.
+        maxExploringIterations (int, optional): the training iterations until P(explore)
+                                                reaches 0. Defaults to MAX_EXPLORING_ITERATIONS.
+
+    Raises:
+        ValueError: if there is no schedule with the name
+
+    Returns:
+        ExplorationSchedule: the new schedule
+    """
+    if name not in SCHEDULES:
+        raise ValueError("ExplorationSchedule", f"the schedule must be one of {list(SCHEDULES)}"+
+                                                f", not '{name}'")
+    return SCHEDULES[name](maxExploringIterations)
+
+
+if __name__ == '__main__':
+    # python ExplorationSchedule.py [maxExploringIterations]
+    # prints P(explore) over training for every schedule, to compare them
+    maxIterations = int(sys.argv[1]) if len(sys.argv) > 1 else MAX_EXPLORING_ITERATIONS
+    iterations = np.linspace(0, maxIterations, 11).astype("int64")
+    schedules = {name: makeExplorationSchedule(name, maxIterations) for name in SCHEDULES}
+    print(f"{'iteration':>12}" + "".join(f"{name:>14}" for name in schedules))
+    columns = [schedule.getProbabilities(iterations) for schedule in schedules.values()]
+    for row, iteration in enumerate(iterations):
+        print(f"{iteration:>12}" + "".join(f"{column[row]:>14.4f}" for column in columns))
@@ -0,0 +1,193 @@
+from Constants import *
+
+import cv2 as cv
+import numpy as np
+from time import time
+from threading import Thread, Condition
+
+
+class FrameGrabber:
+    """Reads frames from a camera continuously on its own thread, so whoever needs a frame gets
+    one straight away instead of waiting on the camera (and never gets an old frame that was
+    sitting in the camera's buffer). The frames are read into a small ring of preallocated
+    images, each with the time it was grabbed, which is when it was taken rather than when it
+    was processed.
+    The frames handed out are the images in the ring, not copies, so they are only valid until
+    the grabber wraps round to them again: FRAME_RING_SIZE - 1 frames later. Anything kept for
+    longer than that (e.g. a list of sample frames) needs copying.
+    """
+    def __init__(self, cameraFeed: cv.VideoCapture, ringSize: int = FRAME_RING_SIZE) -> None:
+        """sets up the grabber without reading anything yet, see startReading
+
+        Args:
+            cameraFeed (cv.VideoCapture): the open camera (or video file) to read from
+            ringSize (int, optional): the number of frames kept. Defaults to FRAME_RING_SIZE.
+
+        Raises:
+            ValueError: if the ring size is smaller than 2, as the frame being read into would
+            be the only one
+        """
+        if ringSize < 2:
+            raise ValueError("FrameGrabber", f"ringSize must be at least 2, not '{ringSize}'")
+        self.__cameraFeed = cameraFeed
+        self.__ringSize = ringSize
+        # the ring is allocated when the first frame arrives, as that gives the frame size
+        self.__frames = EMPTY
+        # a timestamp of 0 marks a slot that hasn't been filled yet
+        self.__timestamps = np.zeros(ringSize)
+        self.__latestIndex = INVALID
+        # notified whenever a new frame is ready or reading stops
+        self.__newFrame = Condition()
+        self.__continueReading = False
+        self.__thread = None
+
+    # ==================== Private ========================================
+    def __allocateFrames(self, frame: np.ndarray) -> None:
+        """makes a new ring of frames the size of the frame given, with the frame in slot 0.
+        Frames already handed out keep the old ring alive, so they stay valid.
+
+        Args:
+            frame (np.ndarray): the first frame of the new ring
+        """
+        frames = np.zeros((self.__ringSize,) + frame.shape, dtype=frame.dtype)
+        frames[0] = frame
+        with self.__newFrame:
+            self.__frames = frames
+            self.__timestamps[:] = 0
+            self.__latestIndex = INVALID
+
+    def __readFrames(self) -> None:
+        """target method for the thread that reads the camera. grab() captures the frame and
+        retrieve() decodes it, so the timestamp is taken in between. The frame is decoded
+        straight into the next slot of the ring, so no new image is allocated per frame. A frame
+        that can't be decoded is dropped. Reading stops if the camera stops giving frames (e.g.
+        it was disconnected).
+        """
+        while self.__continueReading:
+            if not self.__cameraFeed.grab():
+                break
+            timeOfFrame = time()
+            if self.__frames is EMPTY:
+                success, frame = self.__cameraFeed.retrieve()
+                if not success:
+                    continue
+                self.__allocateFrames(frame)
+                i = 0
+            else:
+                i = (self.__latestIndex + 1) % self.__ringSize
+                # a slot is skipped on its way to being overwritten, so it is never handed out
+                # half decoded
+                with self.__newFrame:
+                    self.__timestamps[i] = 0
+                slot = self.__frames[i]
+                success, frame = self.__cameraFeed.retrieve(slot)
+                # the slot is tried again with the next frame, so the ring never has a gap
+                if not success:
+                    continue
+                # retrieve() only decodes into the slot if the frame fits it, otherwise it
+                # returns a new image
+                if frame is not slot:
+                    if frame.shape == slot.shape and frame.dtype == slot.dtype:
+                        slot[...] = frame
+                    else:
+                        self.__allocateFrames(frame)
+                        i = 0
+            with self.__newFrame:
+                self.__timestamps[i] = timeOfFrame
+                self.__latestIndex = i
+                self.__newFrame.notify_all()
+
+        with self.__newFrame:
+            self.__continueReading = False
+            self.__newFrame.notify_all()
+
+    def __hasFrameAfter(self, after: float) -> bool:
+        """checks whether a frame newer than the time given has been grabbed yet. Must be called
+        while holding __newFrame.
+
+        Args:
+            after (float): the time (from time.time()) the frame must be newer than
+
+        Returns:
+            bool: True if the newest frame was grabbed after the time given
+        """
+        return self.__latestIndex != INVALID and self.__timestamps[self.__latestIndex] > after
+
+    def __waitForFrame(self, after: float, timeout: float) -> bool:
+        """waits until the newest frame was grabbed after the time given. Must be called while
+        holding __newFrame.
+
+        Args:
+            after (float): the time (from time.time()) the frame must be newer than
+            timeout (float): the most seconds to wait
+
+        Returns:
+            bool: True if there is a frame newer than after, False if it timed out or reading
+                  has stopped
+        """
+        self.__newFrame.wait_for(lambda: self.__hasFrameAfter(after) or not self.__continueReading,
+                                 timeout)
+        return self.__hasFrameAfter(after)
+
+    # ==================== Public ========================================
+    def getFrameAfter(self, after: float, timeout: float = FRAME_TIMEOUT) -> tuple:
+        """gets the first frame grabbed after the time given, e.g. to go through the frames
+        one after another without missing any that are still in the ring. It only waits if
+        there isn't one yet.
+
+        Args:
+            after (float): the time (from time.time()) the frame must be newer than
+            timeout (float, optional): the most seconds to wait. Defaults to FRAME_TIMEOUT.
+
+        Returns:
+            tuple: the frame and the time it was grabbed, or INVALID if there wasn't one in time
+        """
+        with self.__newFrame:
+            if not self.__waitForFrame(after, timeout):
+                return INVALID
+            newer = np.flatnonzero(self.__timestamps > after)
+            i = newer[np.argmin(self.__timestamps[newer])]
+            return self.__frames[i], float(self.__timestamps[i])
+
+    def getLatestFrame(self, after: float = 0.0, timeout: float = FRAME_TIMEOUT) -> tuple:
+        """gets the newest frame. It only waits if the newest frame isn't newer than after,
+        e.g. so the same frame isn't processed twice.
+
+        Args:
+            after (float, optional): the time (from time.time()) the frame must be newer than.
+                                     Defaults to 0.0 (any frame).
+            timeout (float, optional): the most seconds to wait. Defaults to FRAME_TIMEOUT.
+
+        Returns:
+            tuple: the frame and the time it was grabbed, or INVALID if there wasn't one in time
+        """
+        with self.__newFrame:
+            if not self.__waitForFrame(after, timeout):
+                return INVALID
+            return self.__frames[self.__latestIndex], float(self.__timestamps[self.__latestIndex])
+
+    def isReading(self) -> bool:
+        """getter for whether the reading thread is running
+
+        Returns:
+            bool: True while frames are being read from the camera
+        """
+        return self.__continueReading
+
+    def startReading(self) -> None:
+        """method to start the thread that reads the camera.
+        """
+        if not self.__continueReading:
+            # a daemon thread, so a camera that is never closed doesn't stop the program exiting
+            self.__thread = Thread(target=self.__readFrames, daemon=True)
+            self.__continueReading = True
+            self.__thread.start()
+        elif DEBUG:
+            print("frame grabbing has already started")
+
+    def stopReading(self) -> None:
+        """method to stop the thread that reads the camera.
+        """
+        self.__continueReading = False
+        if self.__thread is not None:
+            self.__thread.join()
@@ -0,0 +1,194 @@
+from Constants import *
+from QAgent import *
+from simulation import SimulateTrack
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import csv
+import itertools
+
+
+# the QAgent constructor arguments that can be swept, and the type of each
+HYPERPARAMETERS = {"learningRate": float,
+                   "discountFactor": float,
+                   "maxExploringIterations": int,
+                   "explorationSchedule": str,
+                   "speedRewardWeight": float,
+                   "lapRewardWeight": float,
+                   "deslotRewardFactor": float}
+
+
+def makeGrid(values: dict) -> list:
+    """makes every combination of the hyperparameter values
+
+    Args:
+        values (dict): a list of values for each hyperparameter being swept
+
+    Returns:
+        list: a dictionary of hyperparameters for each combination
+    """
+    names = list(values)
+    return [dict(zip(names, combination))
+            for combination in itertools.product(*(values[name] for name in names))]
+
+
+def makeRandomSearch(ranges: dict, numTrials: int, randomStream: RandomStream) -> list:
+    """picks each hyperparameter uniformly at random from its range, for every trial
+
+    Args:
+        ranges (dict): the (low, high) range of each hyperparameter being searched
+        numTrials (int): how many sets of hyperparameters to pick
+        randomStream (RandomStream): where the values are drawn from
+
+    Returns:
+        list: a dictionary of hyperparameters for each trial
+    """
+    trials = [{} for _ in range(numTrials)]
+    for name, (low, high) in ranges.items():
+        values = low + randomStream.randomArray(numTrials) * (high - low)
+        for trial, value in zip(trials, values):
+            trial[name] = HYPERPARAMETERS[name](value)
+    return trials
+
+
+def runTrial(hyperparameters: dict, seed: int, iterations: int, unitTime: float,
+             numCurvePoints: int) -> dict:
+    """trains a new agent with the hyperparameters on the simulated track. This is run in a
+    worker process, so everything it needs is passed in and everything it finds is returned.
+
+    Args:
+        hyperparameters (dict): the QAgent constructor arguments to use
+        seed (int): seeds the simulation and the agent
+        iterations (int): the number of simulated training iterations
+        unitTime (float): the simulation time step in seconds
+        numCurvePoints (int): how many points the reward curve is averaged down to
+
+    Returns:
+        dict: the hyperparameters, seed, laps completed, deslot rate, total reward and the
+              average reward over each part of training (the reward curve)
+    """
+    randomStream = RandomStream(seed)
+    agent = QAgent(EMPTY, "float64", randomStream, **hyperparameters)
+    sim = SimulateTrack(unitTime, randomStream)
+    rewards = np.zeros(iterations)
+    laps = 0
+    deslots = 0
+
+    for i in range(iterations):
+        s1, speed1 = sim.getStateAndSpeed()
+        a1 = agent.decideAction(s1)
+        lapsBefore = sim.getLapsCompleted()
+        sim.doAction(a1)
+        s2, speed2 = sim.getStateAndSpeed()
+        deslotted = sim.getDeslotted()
+        rewards[i] = agent.getUpdatedReward((speed1+speed2)/2, sim.getLapsCompleted(), deslotted)
+        agent.train(s1, s2, a1, rewards[i], deslotted)
+        # a deslot resets the laps completed, so only count laps when there wasn't one
+        if deslotted:
+            deslots += 1
+            sim.resetCar()
+        else:
+            laps += sim.getLapsCompleted() - lapsBefore
+
+    curve = [float(part.mean()) for part in np.array_split(rewards, numCurvePoints)]
+    return {**hyperparameters, "seed": seed, "laps": laps, "deslotRate": deslots / iterations,
+            "totalReward": float(rewards.sum()), "rewardCurve": curve}
+
+
+def runSweep(trials: list, iterations: int, repeats: int = 1, unitTime: float = 0.2,
+             numCurvePoints: int = 10, maxWorkers: int = None, seed: int = None) -> list:
+    """trains an agent for every set of hyperparameters (repeats times each, with a different
+    seed every time) across a pool of processes, one per core by default
+
+    Args:
+        trials (list): a dictionary of hyperparameters for each trial, see makeGrid and
+                       makeRandomSearch
+        iterations (int): the number of simulated training iterations per agent
+        repeats (int, optional): how many agents to train for each trial. Defaults to 1.
+        unitTime (float, optional): the simulation time step in seconds. Defaults to 0.2.
+        numCurvePoints (int, optional): how many points each reward curve is averaged down to.
+                                        Defaults to 10.
+        maxWorkers (int, optional): the number of processes. None for one per core. Defaults to
+                                    None.
+        seed (int, optional): the seed every agent's seed is drawn from, so the whole sweep can
+                              be reproduced. Defaults to None.
+
+    Returns:
+        list: the result of each agent (see runTrial), in the order of the trials
+    """
+    jobs = [hyperparameters for hyperparameters in trials for _ in range(repeats)]
+    seeds = [int(s) for s in RandomStream(seed).randomInts(2**31, len(jobs))]
+    with ProcessPoolExecutor(maxWorkers) as executor:
+        return list(executor.map(runTrial, jobs, seeds, [iterations] * len(jobs),
+                                 [unitTime] * len(jobs), [numCurvePoints] * len(jobs)))
+
+
+def writeResults(results: list, fileName: str) -> None:
+    """writes the results table to a csv file, with a column for each point of the reward curve
+
+    Args:
+        results (list): the results from runSweep
+        fileName (str): the csv file to write
+    """
+    with open(fileName, "w", newline="") as f:
+        writer = csv.writer(f)
+        columns = [name for name in results[0] if name != "rewardCurve"]
+        writer.writerow(columns + [f"reward{i}" for i in range(len(results[0]["rewardCurve"]))])
+        for result in results:
+            writer.writerow([result[name] for name in columns] + result["rewardCurve"])
+
+
+def parseHyperparameter(argument: str) -> tuple:
+    """parses a command line hyperparameter such as learningRate=0.05,0.1
+
+    Args:
+        argument (str): name=value,value...
+
+    Raises:
+        argparse.ArgumentTypeError: if it isn't a hyperparameter that can be swept
+
+    Returns:
+        tuple: the name and its values
+    """
+    name, _, values = argument.partition("=")
+    if name not in HYPERPARAMETERS:
+        raise argparse.ArgumentTypeError(f"'{name}' is not one of {list(HYPERPARAMETERS)}")
+    return name, [HYPERPARAMETERS[name](value) for value in values.split(",")]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Trains agents with different hyperparameters "+
+                                     "on the simulated track, in parallel")
+    parser.add_argument("hyperparameters", nargs="+", type=parseHyperparameter,
+                        help="name=value,value... for a grid search, or name=low,high with "+
+                             "--random. Names: " + ", ".join(HYPERPARAMETERS))
+    parser.add_argument("--random", type=int, default=0, metavar="TRIALS",
+                        help="random search with this many trials instead of a grid")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=1, help="agents trained per trial")
+    parser.add_argument("--workers", type=int, default=None, help="defaults to one per core")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default="sweep.csv")
+    args = parser.parse_args()
+
+    values = dict(args.hyperparameters)
+    if args.random > 0:
+        if any(len(bounds) != 2 or HYPERPARAMETERS[name] is str
+               for name, bounds in values.items()):
+            parser.error("random search needs name=low,high for each (numeric) hyperparameter")
+        trials = makeRandomSearch(values, args.random, RandomStream(args.seed))
+    else:
+        trials = makeGrid(values)
+    results = runSweep(trials, args.iterations, args.repeats, maxWorkers=args.workers,
+                       seed=args.seed)
+    writeResults(results, args.output)
+
+    print(f"{len(results)} agents trained for {args.iterations} iterations, "+
+          f"results written to {args.output}\n")
+    names = list(values)
+    print("".join(f"{name:>24}" for name in names) +
+          f"{'laps':>8}{'deslot rate':>14}{'total reward':>16}")
+    for result in sorted(results, key=lambda result: result["totalReward"], reverse=True):
+        print("".join(f"{result[name]:>24}" if HYPERPARAMETERS[name] is str else
+                      f"{result[name]:>24.4g}" for name in names) +
+              f"{result['laps']:>8}{result['deslotRate']:>14.3f}{result['totalReward']:>16.1f}")
@@ -2,6 +2,7 @@ from Constants import *
 from UserInterfaceComponents import *
 from Camera import *
 from QAgent import *
+from StateEncoder import *
 from Hardware import *
 
 import tkinter as tk
@@ -46,6 +47,7 @@ class FormulAI:
         try:
             self.__camera = CameraInput()
             self.__qAgent = QAgent()
+            self.__stateEncoder = StateEncoder()
             self.__hardware = HardwareController()
             self.__master.after(SMALL_TIME_DELAY, self.__hardware.stopCar)
             
@@ -133,6 +135,9 @@ class FormulAI:
             self.__hardware.closeSerial()
             print("Releasing Camera Input...")
             self.__camera.close()
+            print("Saving QTable...")
+            self.__qAgent.saveQTable()
+            self.__qAgent.close()
             self.__master.destroy()
         
     def __startMovingCar(self, angle: int) -> None:
@@ -250,6 +255,8 @@ class FormulAI:
         # Update the User Interface
         self.showCurrentFrame()
         self.__updateGraph()
+        # save what has been trained so far, if it's been long enough since the last save
+        self.__qAgent.checkpointIfDue()
         
         # training iteration
         carStateAndSpeed = self.__getCarStateAndSpeed()
@@ -260,8 +267,14 @@ class FormulAI:
                 self.__hardware.setServoAngle(int(action))
                 # cannot use time.sleep as it will affect the GUI
                 startTime = time()
+                # publish what has been learned for other threads, learn from past
+                # transitions, then plan with the model of the track, while the action takes
+                # effect
+                self.__qAgent.publishQTableSnapshotIfDue()
+                self.__qAgent.replay()
+                self.__qAgent.planUntil(startTime + WAITING_TIME_FOR_ACTION)
                 while time() - startTime < WAITING_TIME_FOR_ACTION:
-                    # waiting time doing nothing
+                    # waiting out the rest of the time (less than one planning batch)
                     pass
                 carStateAndSpeed = self.__getCarStateAndSpeed()
                 if carStateAndSpeed is not INVALID:
@@ -272,14 +285,15 @@ class FormulAI:
                     success = self.__qAgent.train(initialState,
                                                   finalState,
                                                   action,
-                                                  reward)
+                                                  reward,
+                                                  self.__carHasDeslotted)
                     if success:
                         self.__outputConsole.printToConsole("Trained:\n"+
                             f"Training Iteration: {self.__qAgent.getNumTrainingIterations()}\n"+
                             f"P(Explore): {self.__qAgent.getProbabilityToExplore()}\n"+
-                            f"Initial State: {initialState}\n"+
+                            f"Initial State: {self.__stateEncoder.toString(initialState)}\n"+
                             f"Action Chosen: {action}\n"+
-                            f"Final State: {finalState}\n"+
+                            f"Final State: {self.__stateEncoder.toString(finalState)}\n"+
                             f"Deslotted: {self.__carHasDeslotted}\n"+
                             f"Total Reward: {reward}\n\n")
                     else:
@@ -302,6 +316,9 @@ class FormulAI:
             self.__master.after(REFRESH_AFTER, self.__doTrainingLoop)
         else:
             self.__outputConsole.printToConsole("Training stopped")
+            self.__qAgent.flushJournal()
+            # so anything reading the QTable from another thread sees the end of this session
+            self.__qAgent.publishQTableSnapshot()
             self.__hardware.stopReadingSerial()
             self.__hardware.stopCar()
             self.__trainingFrame.showResumeButton()
@@ -309,7 +326,7 @@ class FormulAI:
     
     def __getCarStateAndSpeed(self) -> tuple:
         """uses the camera info to get new information on the car. It tries to validate the speed
-        using the hall sensor values. It then formats the information into a 6 digit state string.
+        using the hall sensor values. It then encodes the information into an integer state.
         it returns both the state, and the speed, so that the speed can be used to calculate reward.
 
         Returns:
@@ -323,13 +340,13 @@ class FormulAI:
         if validatedCarSpeed is INVALID:
             return INVALID
         
-        # formatting the state 0-00-000
-        severity = str(carInfo["nextTrackLocationType"])
-        # rounding distance to nearest cm -> 2 digit number
-        distance = "{:02d}".format(int((carInfo["nextTrackLocationDistanceMillimeters"]+5)/10))
-        # rounding speed to nearest cm/s -> 3 digit number
-        speed = "{:03d}".format(int((carInfo["speed"]+5)/10))
-        return f"{severity}{distance}{speed}", carInfo["speed"]
+        # encoding the state 0-00-000 (the state is INVALID if it is out of the state shape)
+        severity = carInfo["nextTrackLocationType"]
+        # rounding distance to nearest cm
+        distance = int((carInfo["nextTrackLocationDistanceMillimeters"]+5)/10)
+        # rounding speed to nearest cm/s
+        speed = int((carInfo["speed"]+5)/10)
+        return self.__stateEncoder.encode(severity, distance, speed), carInfo["speed"]
     
     def __getValidatedCarSpeed(self, cameraInfo: dict) -> float:
         """tries to validate the camera speed against the hall sensor speed if their measurements
@@ -391,11 +408,13 @@ class FormulAI:
     def __updateGraph(self) -> None:
         """checks if there is a new laptime available from the hardware module. If there is a new
         laptime, it will call the relevant functions to update the UI graph with the new info.
+        A checkpoint of the QTable is also made every lap.
         """
         newLapTime = self.__hardware.getNewLapTime()
         if newLapTime is not EMPTY:
             self.__lapTimes.append(newLapTime)
             self.__trainingFrame.updateGraph(self.__lapTimes)
+            self.__qAgent.checkpointQTable()
         
 
 if __name__ == '__main__':
@@ -0,0 +1,82 @@
+from Constants import *
+from CarLocator import *
+
+import sys
+from time import perf_counter
+
+
+def runPyramidReport(fileName: str, pyramidLevels: list = [1, 2, 3],
+                     trainingFrames: int = SAMPLE_ITERATIONS) -> dict:
+    """searches every frame of recorded footage for the car in full, with a CarLocator at full
+    resolution (the reference) and one for each number of pyramid levels. Each locator learns
+    the background from the same frames, so the only difference is how it searches.
+
+    Args:
+        fileName (str): the recorded footage, any video file cv.VideoCapture can read
+        pyramidLevels (list, optional): the numbers of pyramid levels to compare against full
+                                        resolution. Defaults to [1, 2, 3].
+        trainingFrames (int, optional): the frames at the start of the footage that the
+                                        background is learned from, and that aren't measured.
+                                        Defaults to SAMPLE_ITERATIONS.
+
+    Raises:
+        ValueError: if the footage can't be read
+
+    Returns:
+        dict: for each number of levels (0 is the reference), the mean milliseconds per frame,
+              the fraction of frames the car was found in, and the mean and max distance in
+              millimeters from the reference location (over frames both found the car in)
+    """
+    footage = cv.VideoCapture(fileName)
+    if not footage.isOpened():
+        raise ValueError("PyramidReport", f"couldn't read the footage '{fileName}'")
+    locators = {levels: CarLocator(levels) for levels in [0] + list(pyramidLevels)}
+    seconds = {levels: 0.0 for levels in locators}
+    locations = {levels: [] for levels in locators}
+
+    numFrames = 0
+    success, frame = footage.read()
+    while success:
+        for levels, locator in locators.items():
+            startTime = perf_counter()
+            location = locator.locateInFullFrame(frame)
+            if numFrames >= trainingFrames:
+                seconds[levels] += perf_counter() - startTime
+                locations[levels].append(location)
+        numFrames += 1
+        success, frame = footage.read()
+    footage.release()
+
+    numMeasured = numFrames - trainingFrames
+    if numMeasured <= 0:
+        raise ValueError("PyramidReport", f"the footage only has {numFrames} frames, which "+
+                                          f"aren't more than the {trainingFrames} training frames")
+    results = {}
+    for levels in locators:
+        errors = [np.sqrt((location[0]-reference[0])**2 + (location[1]-reference[1])**2)
+                  for location, reference in zip(locations[levels], locations[0])
+                  if location is not INVALID and reference is not INVALID]
+        errors = np.array(errors) * MILLIMETERS_PER_PIXEL
+        results[levels] = {"milliseconds": seconds[levels] / numMeasured * 1000,
+                           "foundRate": sum(location is not INVALID
+                                            for location in locations[levels]) / numMeasured,
+                           "meanError": float(errors.mean()) if len(errors) > 0 else 0.0,
+                           "maxError": float(errors.max()) if len(errors) > 0 else 0.0}
+    return results
+
+
+if __name__ == '__main__':
+    # python PyramidReport.py footage.avi [pyramid levels...]
+    if len(sys.argv) < 2:
+        print("usage: python PyramidReport.py footage.avi [pyramid levels...]")
+        sys.exit(1)
+    pyramidLevels = [int(levels) for levels in sys.argv[2:]] or [1, 2, 3]
+    results = runPyramidReport(sys.argv[1], pyramidLevels)
+    print(f"Car location against full resolution on '{sys.argv[1]}'\n")
+    print(f"{'levels':<8}{'scale':>8}{'ms/frame':>12}{'speedup':>10}{'found':>10}"+
+          f"{'mean error mm':>16}{'max error mm':>16}")
+    for levels, result in results.items():
+        print(f"{levels:<8}{'1/' + str(2**levels):>8}{result['milliseconds']:>12.2f}"+
+              f"{results[0]['milliseconds'] / result['milliseconds']:>10.1f}"+
+              f"{result['foundRate']:>10.3f}{result['meanError']:>16.2f}"+
+              f"{result['maxError']:>16.2f}")
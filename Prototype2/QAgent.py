@@ -1,78 +1,247 @@
 from Constants import *
 from QTable import *
+from ReplayBuffer import *
+from DynaModel import *
+from EligibilityTraces import *
+from ExplorationSchedule import *
 
-from random import random
+from time import time
+import os
 
 
 class QAgent:
-    def __init__(self) -> None:
-        """initialises attibutes needed for the QAgent like total reward and the QTable
+    def __init__(self, qTableFileName: str = QTABLE_FILE_NAME,
+                 qTableDtype: str = QTABLE_DTYPE, randomStream: RandomStream = None,
+                 learningRate: float = LEARNING_RATE, discountFactor: float = DISCOUNT_FACTOR,
+                 maxExploringIterations: int = MAX_EXPLORING_ITERATIONS,
+                 explorationSchedule: str = EXPLORATION_SCHEDULE,
+                 speedRewardWeight: float = SPEED_REWARD_WEIGHT,
+                 lapRewardWeight: float = LAP_REWARD_WEIGHT,
+                 deslotRewardFactor: float = DESLOT_REWARD_FACTOR) -> None:
+        """initialises attibutes needed for the QAgent like total reward and the QTable. If a
+        saved QTable exists, training is resumed from it, along with any updates in its journal
+        that were made after it was saved.
+
+        Args:
+            qTableFileName (str, optional): the binary file the QTable is saved to and resumed
+                                            from. Its journal is this name + ".journal". EMPTY
+                                            to always start from an empty QTable without a
+                                            journal. Defaults to QTABLE_FILE_NAME.
+            qTableDtype (str, optional): how the QTable stores its values. Defaults to
+                                         QTABLE_DTYPE.
+            randomStream (RandomStream, optional): where every random decision is drawn from,
+                                                   seed it to make training reproducible. None
+                                                   for a new unseeded stream. Defaults to None.
+            The rest are the hyperparameters, which default to the constants of the same name
+            (so they only need passing in to try other values, e.g. in a hyperparameter sweep):
+            learningRate (float, optional): how far each QValue moves towards what was learned
+            discountFactor (float, optional): how much future reward is worth
+            maxExploringIterations (int, optional): the training iterations until P(explore)
+                                                    reaches 0
+            explorationSchedule (str, optional): how P(explore) falls over training, see
+                                                 ExplorationSchedule.SCHEDULES
+            speedRewardWeight (float, optional): the reward for each mm/s of speed
+            lapRewardWeight (float, optional): the reward for each lap without deslotting
+            deslotRewardFactor (float, optional): what the total reward is multiplied by when
+                                                  the car deslots
 
         Raises:
-            ValueError: if MAX_EXPLORING_ITERATIONS is 0, as it would cause a division by 0 error
-            if left unchecked.
+            ValueError: if maxExploringIterations is 0 or the exploration schedule doesn't
+            exist (see makeExplorationSchedule)
+            ValueError: if the saved QTable doesn't match the current shape constants
         """
-        # any arbitrary starting reward should work
-        self.__totalReward = 2000.0
+        self.__totalReward = STARTING_REWARD
+        # one total reward per car when training on many simulated cars at once (EMPTY until then)
+        self.__totalRewards = EMPTY
         self.__successfulTrainingIterations = 0
         
-        if not MAX_EXPLORING_ITERATIONS > 0:
-            # division by 0 error preventing
-            raise ValueError("QAgent", "MAX_EXPLORING_ITERATIONS must be > 0")
-        self.__updateProbabilityToExplore()
+        self.__explorationSchedule = makeExplorationSchedule(explorationSchedule,
+                                                             maxExploringIterations)
+        self.__learningRate = learningRate
+        self.__discountFactor = discountFactor
+        self.__maxExploringIterations = maxExploringIterations
+        self.__speedRewardWeight = speedRewardWeight
+        self.__lapRewardWeight = lapRewardWeight
+        self.__deslotRewardFactor = deslotRewardFactor
         
-        self.__qTable = QTable()
+        self.__random = RandomStream() if randomStream is None else randomStream
+        self.__qTable = QTable(qTableDtype, self.__random)
+        # past transitions, so that each one can be learned from more than once
+        if REPLAY_MODE == "uniform":
+            self.__replayBuffer = ReplayBuffer(randomStream=self.__random)
+        elif REPLAY_MODE == "prioritised":
+            self.__replayBuffer = PrioritisedReplayBuffer(randomStream=self.__random)
+        else:
+            raise ValueError("QAgent", f"REPLAY_MODE must be 'uniform' or 'prioritised', not "+
+                                       f"'{REPLAY_MODE}'")
+        # a model of the track learned from real transitions, which is planned with
+        self.__dynaModel = DynaModel(self.__random)
+        # the recently visited pairs that share the credit for each update in Q(lambda)
+        self.__eligibilityTraces = EligibilityTraces(discountFactor * Q_LAMBDA)
+        self.__qTableFileName = qTableFileName
+        self.__journal = None
+        if qTableFileName != EMPTY:
+            journalSequence = 0
+            if os.path.exists(qTableFileName):
+                (self.__successfulTrainingIterations,
+                 journalSequence) = self.__qTable.loadFromFile(qTableFileName)
+            # replay whatever was journaled after the last save (e.g. if the program crashed)
+            journalFileName = qTableFileName + ".journal"
+            records = QJournal.read(journalFileName)
+            self.__successfulTrainingIterations = self.__qTable.replayJournal(
+                records, journalSequence, self.__successfulTrainingIterations)
+            # new records carry on numbering after everything saved or journaled so far
+            journalSequence = max(journalSequence, int(records["sequence"].max(initial=0)))
+            self.__journal = QJournal(journalFileName, journalSequence)
+            self.__qTable.attachJournal(self.__journal)
+        self.publishQTableSnapshot()
+        self.__lastCheckpointTime = time()
+        self.__updateProbabilityToExplore()
+        self.__updateReplayBeta()
         
     # ==================== Private ======================================== 
-    def __calcNewQValue(self, currentState:str, nextState:str, action:str, reward:float) -> float:
-        """uses the QValue formula to calculate the new QValue using the states, action
-        and reward passed in.
+    def __calcNewQValue(self, currentState: int, action: str, tdError: float) -> float:
+        """uses the QValue formula to calculate the new QValue: the old QValue moved
+        the learning rate of the way towards the learned value, i.e.
+        (1 - learningRate) * old + learningRate * learned = old + learningRate * tdError
 
         Args:
-            currentState (str): the 6 digit state string the car started in (assumed to be valid)
-            nextState (str): the 6 digit state string the car ended in (assumed to be valid)    
+            currentState (int): the integer state the car started in (assumed to be valid)
             action (str): the action string chosen (guarenteed to be valid)
-            reward (float): the reward calculated for the this action
+            tdError (float): the TD error calculated by __calcTDError
 
         Returns:
             float: the new Q value
         """
-        oldValue = (1-LEARNING_RATE) * self.__qTable.getQValue(currentState, action)
-        discountedOptimalFutureReward = DISCOUNT_FACTOR * self.__qTable.getMaxQValue(nextState)
+        return self.__qTable.getQValue(currentState, action) + (self.__learningRate * tdError)
+    
+    def __calcTDError(self, currentState: int, nextState: int, action: str, reward: float,
+                      done: bool = False) -> float:
+        """calculates how far the learned value (the reward plus the discounted optimal future
+        reward) is from the current QValue. This is also how surprising the transition was,
+        which is its priority in the replay buffer.
+
+        Args:
+            currentState (int): the integer state the car started in (assumed to be valid)
+            nextState (int): the integer state the car ended in (assumed to be valid)
+            action (str): the action string chosen (guarenteed to be valid)
+            reward (float): the reward calculated for the this action
+            done (bool, optional): True if the run ended (the car deslotted), so there is no
+                                   future reward from the next state. Defaults to False.
+
+        Returns:
+            float: the TD error
+        """
+        discountedOptimalFutureReward = 0.0
+        if not done:
+            discountedOptimalFutureReward = (self.__discountFactor *
+                                             self.__qTable.getMaxQValue(nextState))
         learnedValue = reward + discountedOptimalFutureReward
-        newQValue = oldValue + (LEARNING_RATE * learnedValue)
-        return newQValue
+        return learnedValue - self.__qTable.getQValue(currentState, action)
     
+    def __applyBatchUpdates(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                            nextStates: np.ndarray, dones: np.ndarray, weights: np.ndarray,
+                            journal: bool = True) -> np.ndarray:
+        """the batch version of __calcTDError and __calcNewQValue, which updates the QValues of a
+        whole batch of transitions at once. Every TD error in the batch is calculated from the
+        same QValues, so a (state, action) pair that is in the batch more than once gets a
+        single update of the average of its TD errors. Adding an update for every copy would
+        move it by the learning rate times the number of copies, overshooting (and diverging)
+        whenever a batch has more copies of a pair than 1 / learningRate.
+
+        Args:
+            states (np.ndarray): the integer states the car started in (assumed to be valid)
+            actions (np.ndarray): the integer actions taken
+            rewards (np.ndarray): the rewards the actions led to
+            nextStates (np.ndarray): the integer states the car ended in (assumed to be valid)
+            dones (np.ndarray): True where the run ended, so there is no future reward
+            weights (np.ndarray): how much of each update to apply (1 for a normal update)
+            journal (bool, optional): False to not journal the updates. Defaults to True.
+
+        Returns:
+            np.ndarray: the TD error of each transition
+        """
+        futureRewards = np.where(dones, 0.0,
+                                 self.__discountFactor * self.__qTable.getMaxQValues(nextStates))
+        tdErrors = rewards + futureRewards - self.__qTable.getQValues(states, actions)
+        uniqueStates, uniqueActions, averageErrors = self.__averagePerPair(states, actions,
+                                                                           weights * tdErrors)
+        self.__qTable.addToQValues(uniqueStates, uniqueActions,
+                                   self.__learningRate * averageErrors, journal)
+        return tdErrors
+
     @staticmethod
-    def __getPToExplore(numTrainingIters: int) -> float:
-        """function to calculate the probability to explore for a given iteration during the
-        training. This method can be modified if this particular function turns out to be 
-        unsuitable
+    def __averagePerPair(states: np.ndarray, actions: np.ndarray, values: np.ndarray) -> tuple:
+        """groups a batch by (state, action) pair and averages the values of each pair
 
         Args:
-            numTrainingIters (int): the number of successful training iterations completed
+            states (np.ndarray): the integer states
+            actions (np.ndarray): the integer actions
+            values (np.ndarray): a value for each transition
 
         Returns:
-            float: the value between 0 -> 1 for the new P(explore)
+            tuple: arrays of each different state and action pair and the average of its values
+        """
+        states = np.asarray(states, dtype="int64")
+        actionIndices = (np.asarray(actions, dtype="int64") - ACTION_SHAPE[0]) // ACTION_SHAPE[2]
+        numActions = len(range(ACTION_SHAPE[0], ACTION_SHAPE[1] + 1, ACTION_SHAPE[2]))
+        uniquePairs, inverse = np.unique(states * numActions + actionIndices,
+                                         return_inverse=True)
+        inverse = inverse.ravel()
+        averages = (np.bincount(inverse, weights=values) /
+                    np.bincount(inverse, minlength=len(uniquePairs)))
+        uniqueStates, uniqueActionIndices = np.divmod(uniquePairs, numActions)
+        return uniqueStates, uniqueActionIndices * ACTION_SHAPE[2] + ACTION_SHAPE[0], averages
+    
+    def __updateTracedQValues(self, currentState: int, action: str, tdError: float,
+                              done: bool) -> None:
+        """Watkins Q(lambda): the TD error of the latest transition is also credited to the
+        pairs visited before it, in proportion to their eligibility traces, so a deslot is
+        learned from all the way back to where the car should have braked. The latest pair
+        has already been updated by train() (its trace is 1).
+
+        Args:
+            currentState (int): the integer state the car started in
+            action (str): the action that was taken
+            tdError (float): the TD error of the transition
+            done (bool): True if the run ended, which clears the traces
         """
-        return 0.5 * np.cos((np.pi / MAX_EXPLORING_ITERATIONS) * numTrainingIters) + 0.5
+        self.__eligibilityTraces.visit(currentState, int(action))
+        states, actions, values = self.__eligibilityTraces.getTraces()
+        # the latest pair is always the last trace
+        if len(states) > 1:
+            self.__qTable.addToQValues(states[:-1], actions[:-1],
+                                       self.__learningRate * tdError * values[:-1])
+        if done:
+            self.__eligibilityTraces.clear()
+        else:
+            self.__eligibilityTraces.decay()
     
     def __updateProbabilityToExplore(self) -> None:
         """Updates the probability to explore based on how many training iterations have been
-        completed. Once __successfulTrainingIterations > MAX_EXPLORING_ITERATIONS, the 
-        p(explore) is 0, so we dont need to update it.
+        completed, from the exploration schedule. Once __successfulTrainingIterations >
+        maxExploringIterations, the p(explore) is 0 (e.g. when resuming a QTable that has
+        finished exploring).
+        """
+        self.__probabilityToExplore = self.__explorationSchedule.getProbability(
+            self.__successfulTrainingIterations)
+    
+    def __updateReplayBeta(self) -> None:
+        """anneals how much the prioritised replay's sampling bias is corrected, from
+        REPLAY_PRIORITY_BETA up to fully (1) once exploring has finished, as an unbiased
+        estimate matters most when the QValues are converging.
         """
-        if self.__successfulTrainingIterations <= MAX_EXPLORING_ITERATIONS:
-            self.__probabilityToExplore = self.__getPToExplore(self.__successfulTrainingIterations)
+        progress = min(1.0, self.__successfulTrainingIterations / self.__maxExploringIterations)
+        self.__replayBuffer.setBeta(REPLAY_PRIORITY_BETA + (1-REPLAY_PRIORITY_BETA) * progress)
         
     # ==================== Public ======================================== 
-    def decideAction(self, state: str) -> str:
+    def decideAction(self, state: int) -> str:
         """using Epsilon greedy action selection to decide an action for the agent to take.
         Depending on probability to explore, the agent takes a random action to 'explore' the 
         environment or choose (what it thinks is) the best action to 'exploit' its knowledge.
 
         Args:
-            state (str): the 6 digit state string (needs to be validated)
+            state (int): the integer state from the StateEncoder (needs to be validated)
 
         Returns:
             str: the action taken
@@ -80,11 +249,24 @@ class QAgent:
         if not self.__qTable.validateState(state):
             return INVALID
         
-        if random() < self.__probabilityToExplore:
-            return self.__qTable.getRandomAction()
+        if self.__random.random() < self.__probabilityToExplore:
+            action = self.__qTable.getRandomAction()
+            # Watkins Q(lambda) only learns about the greedy policy, so credit can't be passed
+            # back through an action that isn't greedy
+            if action != self.__qTable.getActionWithMaxQValue(state):
+                self.__eligibilityTraces.clear()
+            return action
         else:
             return self.__qTable.getActionWithMaxQValue(state)  
     
+    def getAllQValues(self) -> np.ndarray:
+        """getter for the whole table of QValues, so it can be inspected or compared
+
+        Returns:
+            np.ndarray: the (actions x states) table of QValues
+        """
+        return self.__qTable.getAllQValues()
+    
     def getNumTrainingIterations(self) -> int:
         """getter method for the user interface so it can display the number of 
         training iterations to the user.
@@ -108,8 +290,9 @@ class QAgent:
         information passed in:
         speed: using the speed (mm/s) to encourage higher speeds
         lapsCompleted: using the number or laps completed without deslotting
-        to encourage longer runs. (x10 for higher weighting)
+        to encourage longer runs. (x10 by default for higher weighting)
         deslotted: apply a big punishment for a deslot to discourage this.
+        The weights are the reward hyperparameters passed to the constructor.
 
         Args:
             speed (float): the final speed of the car after taking an action (mm/s)
@@ -121,23 +304,105 @@ class QAgent:
         """
         previousReward = self.__totalReward
         if carHasDeslotted:
-            self.__totalReward *= 0.5 
+            self.__totalReward *= self.__deslotRewardFactor
         else:
-            self.__totalReward += (speed*0.1) + (lapsCompleted*10)
+            self.__totalReward += ((speed*self.__speedRewardWeight) +
+                                   (lapsCompleted*self.__lapRewardWeight))
         return self.__totalReward - previousReward
     
+    def getQTableSnapshot(self) -> QTableSnapshot:
+        """getter for the latest snapshot of the QTable. Unlike the other getters, this is safe
+        to call from any thread while training, e.g. from the user interface or an export.
+
+        Returns:
+            QTableSnapshot: the latest immutable copy of the QTable
+        """
+        return self.__qTable.getSnapshot()
+    
     def getTotalReward(self):
         return self.__totalReward
     
-    def train(self, currentState: str, nextState: str, action: str, reward: float) -> bool:
+    def planUntil(self, deadline: float) -> int:
+        """Dyna-Q planning: learns from transitions made up by the model of the track, in
+        batches of DYNA_BATCH_SIZE, for as long as there is time. A batch is only started if
+        the longest batch so far would still finish before the deadline, so this returns just
+        before it, however long each batch takes. Planning also stops after
+        DYNA_MAX_UPDATES_PER_PAIR made up transitions per pair in the model: the model only
+        changes when the car makes a real transition, so planning far past that just learns
+        the same few pairs over and over. Like replay(), it doesn't count as a training
+        iteration. There can be a huge number of updates, so rather than journaling each one,
+        the final QValue of every pair planned with is journaled once at the end.
+
+        Args:
+            deadline (float): the time (from time.time()) to stop by
+
+        Returns:
+            int: the number of made up transitions learned from (0 if DYNA_PLANNING is off or
+                 nothing has been trained yet)
+        """
+        if not DYNA_PLANNING:
+            return 0
+        maxUpdates = DYNA_MAX_UPDATES_PER_PAIR * self.__dynaModel.getNumPairs()
+        numUpdates = 0
+        plannedStates = []
+        plannedActions = []
+        longestBatchTime = 0.0
+        batchStartTime = time()
+        while numUpdates < maxUpdates and batchStartTime + longestBatchTime < deadline:
+            batch = self.__dynaModel.sample(min(DYNA_BATCH_SIZE, maxUpdates - numUpdates))
+            if batch is EMPTY:
+                break
+            states, actions, rewards, nextStates, dones = batch
+            self.__applyBatchUpdates(states, actions, rewards, nextStates, dones,
+                                     np.ones(len(states)), journal=False)
+            plannedStates.append(states)
+            plannedActions.append(actions)
+            numUpdates += len(states)
+            batchEndTime = time()
+            longestBatchTime = max(longestBatchTime, batchEndTime - batchStartTime)
+            batchStartTime = batchEndTime
+        if numUpdates > 0:
+            self.__qTable.journalQValues(np.concatenate(plannedStates),
+                                         np.concatenate(plannedActions))
+        return numUpdates
+    
+    def replay(self, numUpdates: int = REPLAY_BATCH_SIZE) -> int:
+        """learns again from transitions that have already happened: a batch of them is picked
+        at random from the replay buffer and all of their QValues are updated at once. It
+        doesn't count as a training iteration, and is meant to be called between real actions
+        (while waiting for the car) so more is learned per lap without any extra track time.
+        Nothing is replayed until the buffer holds at least numUpdates transitions, otherwise
+        each batch would just be the same few transitions many times over.
+
+        Args:
+            numUpdates (int, optional): the number of transitions to learn from. Defaults to
+                                        REPLAY_BATCH_SIZE.
+
+        Returns:
+            int: the number of transitions learned from (0 if there aren't enough yet)
+        """
+        if self.__replayBuffer.getSize() < numUpdates:
+            return 0
+        batch = self.__replayBuffer.sample(numUpdates)
+        states, actions, rewards, nextStates, dones, indices, weights = batch
+        # the importance sampling weights undo the bias of prioritised sampling
+        tdErrors = self.__applyBatchUpdates(states, actions, rewards, nextStates, dones, weights)
+        self.__replayBuffer.updatePriorities(indices, tdErrors)
+        return numUpdates
+    
+    def train(self, currentState: int, nextState: int, action: str, reward: float,
+              done: bool = False) -> bool:
         """uses the states, actions and reward passed in to update the QTable for this training
-        iteration. Then it calculates the new p(explore). 
+        iteration. Then it calculates the new p(explore). The transition is also remembered so
+        that replay() can learn from it again.
 
         Args:
-            currentState (str): the 6 digit starting state of the car (validation needed)
-            nextState (str): the 6 digit ending state of the car (validation needed)
+            currentState (int): the integer starting state of the car (validation needed)
+            nextState (int): the integer ending state of the car (validation needed)
             action (str): the action that was taken between the states
             reward (float): the cumulative reward that that action led to
+            done (bool, optional): True if the run ended with this action (the car deslotted).
+                                   Defaults to False.
 
         Returns:
             bool: True if the training was successful, False otherwise.
@@ -146,119 +411,178 @@ class QAgent:
                 self.__qTable.validateState(nextState)):
             return False
         
-        newQValue = self.__calcNewQValue(currentState, nextState, action, reward)
-        self.__qTable.update(currentState, action, newQValue)
+        tdError = self.__calcTDError(currentState, nextState, action, reward, done)
+        newQValue = self.__calcNewQValue(currentState, action, tdError)
         self.__successfulTrainingIterations += 1
+        if self.__journal is not None:
+            self.__journal.setIteration(self.__successfulTrainingIterations)
+        self.__qTable.update(currentState, action, newQValue)
+        if Q_LAMBDA > 0:
+            self.__updateTracedQValues(currentState, action, tdError, done)
+        replayIndex = self.__replayBuffer.add(currentState, int(action), reward, nextState, done)
+        # so the transition is replayed as often as it was surprising
+        self.__replayBuffer.updatePriorities(np.array([replayIndex]), np.array([tdError]))
+        self.__dynaModel.add(currentState, int(action), reward, nextState, done)
         self.__updateProbabilityToExplore()
+        self.__updateReplayBeta()
         return True
     
-    def saveQTable(self):
-        self.__qTable.writeTableToFile()
-        
-    
-    
-if __name__ == '__main__':
-    from simulation import SimulateTrack
-    qAgent = QAgent()
-    # qAgent.saveQTable()
+    def checkpointIfDue(self) -> bool:
+        """checkpoints the QTable if CHECKPOINT_INTERVAL seconds have passed since the last
+        checkpoint. It's cheap to call every training iteration.
+
+        Returns:
+            bool: True if a checkpoint was made, False otherwise
+        """
+        if time() - self.__lastCheckpointTime < CHECKPOINT_INTERVAL:
+            return False
+        self.checkpointQTable()
+        return True
     
-    unitTime = 0.2
-    sim = SimulateTrack(unitTime)
+    def checkpointQTable(self) -> None:
+        """saves only the states which have changed since the last save into the QTable file,
+        so the cost depends on how much was trained rather than the size of the table. The
+        journal is then emptied, as everything in it is in the file.
+        """
+        if self.__qTableFileName != EMPTY:
+            self.__journal.flush()
+            self.__qTable.checkpointToFile(self.__qTableFileName,
+                                           self.__successfulTrainingIterations)
+            self.__journal.truncate()
+        self.__lastCheckpointTime = time()
     
-    for i in range(MAX_EXPLORING_ITERATIONS):
-        print(f"Training iteration: {i}     total reward: {qAgent.getTotalReward()}")
-        s1, speed1 = sim.getStateAndSpeed()
-        a1 = qAgent.decideAction(s1)
-        sim.doAction(a1)
-        s2, speed2 = sim.getStateAndSpeed()
-        reward = qAgent.getUpdatedReward((speed1+speed2)/2, 
-                                         sim.getLapsCompleted(), 
-                                         sim.getDeslotted())
-        qAgent.train(s1, s2, a1, reward)
-        if sim.getDeslotted():
-            sim.resetCar()
-            
-    qAgent.saveQTable()
+    def close(self) -> None:
+        """writes any buffered journal records and closes the journal file. Call this last,
+        after saveQTable, as nothing can be journaled once it is closed.
+        """
+        if self.__journal is not None:
+            self.__journal.close()
     
-    # testing the agent
-    sim = SimulateTrack(unitTime)
-    inp = ""
-    i = 0
-    while inp == "":
-        s1, speed1 = sim.getStateAndSpeed()
-        a1 = qAgent.decideAction(s1)
-        sim.doAction(a1)
-        s2, speed2 = sim.getStateAndSpeed()
-        reward = qAgent.getUpdatedReward((speed1+speed2)/2, 
-                                         sim.getLapsCompleted(), 
-                                         sim.getDeslotted())
-        
-        print(f"Testing iteration {i}")
-        i += 1
-        if sim.getDeslotted():
-            print("Deslotted...")
-        print(f"s1: {s1}    action chosen: {a1}     s2: {s2}")
-        print(f"reward: {reward}    LapsCompleted: {sim.getLapsCompleted()}")
-        print(f"Total reward: {qAgent.getTotalReward()}")
-        inp = input(":")
-        
-            
+    def exportQTable(self, fileName: str = "QTable.txt", fileFormat: str = "text",
+                     stateMajor: bool = False) -> None:
+        """writes the QTable to a human readable file for inspection (see QTable.writeTableToFile)
+
+        Args:
+            fileName (str, optional): the file to write to. Defaults to "QTable.txt".
+            fileFormat (str, optional): "text" or "csv". Defaults to "text".
+            stateMajor (bool, optional): True for one row per state. Defaults to False.
+        """
+        self.__qTable.writeTableToFile(fileName, fileFormat, stateMajor)
     
-        
+    def flushJournal(self) -> None:
+        """writes any buffered journal records to the file, e.g. when training stops, so they
+        survive a crash without waiting for a full save.
+        """
+        if self.__journal is not None:
+            self.__journal.flush()
     
-    """
-    sim = Sim()
+    def publishQTableSnapshot(self) -> None:
+        """publishes a new snapshot of the QTable for other threads to read
+        """
+        self.__qTable.publishSnapshot(self.__successfulTrainingIterations)
+        self.__lastSnapshotIterations = self.__successfulTrainingIterations
     
-    s1, speed1 = sim.getStateAndSpeed()
-    a1 = qAgent.getAction(s1)
-    sim.doAction(a1)
-    s2, speed = sim.getStateAndSpeed()
-    reward = qAgent.getReward(speed, sim.getLapsCompleted(), sim.getCarDeslotted)
-    qAgent.train(s1, s2, a1, reward)
-    """
+    def publishQTableSnapshotIfDue(self) -> bool:
+        """publishes a new snapshot of the QTable if there have been SNAPSHOT_INTERVAL training
+        iterations since the last one. Publishing isn't done by train() so that it never delays
+        a real action: call this while waiting for the car instead.
+
+        Returns:
+            bool: True if a snapshot was published, False otherwise
+        """
+        if self.__successfulTrainingIterations - self.__lastSnapshotIterations < SNAPSHOT_INTERVAL:
+            return False
+        self.publishQTableSnapshot()
+        return True
     
+    def saveQTable(self) -> None:
+        """saves the QTable and the number of training iterations to the binary QTable file, so
+        that the next session can resume from it. Everything in the journal is now in the saved
+        table, so the journal is emptied (compacted).
+        """
+        if self.__qTableFileName != EMPTY:
+            self.__qTable.saveToFile(self.__qTableFileName, self.__successfulTrainingIterations)
+            self.__journal.truncate()
+        self.__lastCheckpointTime = time()
     
-    # import matplotlib.pyplot as plt
     
-    # exponentials Test 1
-    # exps = [1-(1e-2),
-    #         1-(1e-3),
-    #         1-(1e-4),
-    #         1-(1e-5),
-    #         1-(1e-6)]
-    # colours = ["r", "y", "g", "b", "m"]
-    # xs = []
-    # ys = []
+    # ==================== Batch
+    # These are for training on many simulated cars at once (see simulation.SimulateTracks),
+    # where every car's state, action and reward is an element of a numpy array
+    def decideActions(self, states: np.ndarray, greedy: bool = False) -> np.ndarray:
+        """the batch version of decideAction. Each car explores independently.
+
+        Args:
+            states (np.ndarray): the integer states of the cars (need to be validated)
+            greedy (bool, optional): True to never explore, e.g. to evaluate what has been
+                                     learned. Defaults to False.
+
+        Returns:
+            np.ndarray: the integer action each car takes, INVALID where its state was invalid
+        """
+        states = np.asarray(states, dtype="int64")
+        valid = self.__qTable.validateStates(states)
+        actions = self.__qTable.getActionsWithMaxQValue(np.where(valid, states, 0))
+        if not greedy:
+            explore = self.__random.randomArray(len(states)) < self.__probabilityToExplore
+            actions[explore] = self.__qTable.getRandomActions(int(explore.sum()))
+        actions[~valid] = INVALID
+        return actions
     
+    def getUpdatedRewards(self, speeds: np.ndarray, lapsCompleted: np.ndarray,
+                          carsHaveDeslotted: np.ndarray) -> np.ndarray:
+        """the batch version of getUpdatedReward, where each car has its own total reward
+
+        Args:
+            speeds (np.ndarray): the final speed of each car after taking an action (mm/s)
+            lapsCompleted (np.ndarray): the number of laps each car completed without deslotting
+            carsHaveDeslotted (np.ndarray): True for each car that has deslotted
+
+        Returns:
+            np.ndarray: the reward gained by each car's action
+        """
+        if self.__totalRewards is EMPTY or len(self.__totalRewards) != len(speeds):
+            self.__totalRewards = np.full(len(speeds), STARTING_REWARD)
+        previousRewards = self.__totalRewards
+        self.__totalRewards = np.where(carsHaveDeslotted,
+                                       previousRewards * self.__deslotRewardFactor,
+                                       previousRewards + (speeds*self.__speedRewardWeight) +
+                                       (lapsCompleted*self.__lapRewardWeight))
+        return self.__totalRewards - previousRewards
     
-    # for i in range(5):
-    #     n = exps[i]
-    #     pEx = 1
-    #     x = []
-    #     y = []
-    #     for j in range(500000):
-    #         x.append(j)
-    #         y.append(pEx)
-    #         pEx *= n
-    #     xs.append(x)
-    #     ys.append(y)
+    def trainBatch(self, currentStates: np.ndarray, nextStates: np.ndarray, actions: np.ndarray,
+                   rewards: np.ndarray, dones: np.ndarray) -> np.ndarray:
+        """the batch version of train: every valid transition updates the QTable at once and
+        counts as a training iteration. The updates are all calculated from the QTable as it was
+        before the batch, so cars that took the same action in the same state share a single
+        update towards their average learned value, rather than each moving the QValue by the
+        learning rate (which diverges once there are more cars than 1 / learningRate).
+        Simulated transitions are cheap, so they aren't remembered for replay,
+        planning or eligibility traces, which are for getting more out of real transitions.
+
+        Args:
+            currentStates (np.ndarray): the integer starting states of the cars
+            nextStates (np.ndarray): the integer ending states of the cars
+            actions (np.ndarray): the integer actions that were taken
+            rewards (np.ndarray): the rewards the actions led to
+            dones (np.ndarray): True for each car whose run ended (it deslotted)
+
+        Returns:
+            np.ndarray: True for each transition that was trained, False where a state was
+                        invalid
+        """
+        valid = (self.__qTable.validateStates(currentStates) &
+                 self.__qTable.validateStates(nextStates))
+        numValid = int(valid.sum())
+        if numValid == 0:
+            return valid
         
-    # for i in range(5):
-    #     plt.plot(xs[i], ys[i], colours[i])
-    # plt.show()
-    
-    # # cos Test 2
-    # ITERS = 300
-    # def f(x):
-    #     if x < ITERS:
-    #         return 0.5*np.cos((np.pi/ITERS)*x) + 0.5
-    #     else: return 0
-    
-    # x = []
-    # y = []
-    # for i in range(500):
-    #     x.append(i)
-    #     y.append(f(i))
-    # plt.plot(x, y)
-    # plt.show()
-    
\ No newline at end of file
+        self.__successfulTrainingIterations += numValid
+        if self.__journal is not None:
+            self.__journal.setIteration(self.__successfulTrainingIterations)
+        self.__applyBatchUpdates(np.asarray(currentStates)[valid], np.asarray(actions)[valid],
+                                 np.asarray(rewards)[valid], np.asarray(nextStates)[valid],
+                                 np.asarray(dones)[valid], np.ones(numValid))
+        self.__updateProbabilityToExplore()
+        self.__updateReplayBeta()
+        return valid
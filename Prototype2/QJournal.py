@@ -0,0 +1,143 @@
+from Constants import *
+
+import numpy as np
+import os
+
+
+class QJournal:
+    """An append-only file of every QTable update, so that training isn't lost if the program
+    crashes between saves. Each update is a fixed size binary record of the state, action
+    index, new QValue, the training iteration it was made in and a sequence number. Updates
+    made between training iterations (e.g. replay) share an iteration with the one before
+    them, so the sequence number, which counts up by 1 for every record and carries on after
+    the journal is emptied, is what tells which records were made after a save. Records are
+    buffered in a preallocated numpy array and written in one go when the buffer is full, so
+    the training loop never waits on a full table write.
+    """
+    RECORD_DTYPE = np.dtype([("state", "<u4"),
+                             ("action", "<u2"),
+                             ("value", "<f8"),
+                             ("iteration", "<u8"),
+                             ("sequence", "<u8")])
+
+    def __init__(self, fileName: str, sequence: int = 0) -> None:
+        """opens the journal file for appending (creating it if it doesn't exist yet). The
+        records in it should already have been read with read() if they are needed.
+
+        Args:
+            fileName (str): the journal file
+            sequence (int, optional): the sequence number of the last record made so far (in the
+                                      file or before the last save), so the next record carries
+                                      on after it. Defaults to 0.
+        """
+        self.__fileName = fileName
+        self.__file = open(fileName, "ab")
+        # cut off a record that was only partly written before a crash, otherwise every record
+        # appended after it would be read back misaligned
+        fileSize = self.__file.tell()
+        if fileSize % self.RECORD_DTYPE.itemsize != 0:
+            self.__file.truncate(fileSize - fileSize % self.RECORD_DTYPE.itemsize)
+        self.__buffer = np.zeros(JOURNAL_BUFFER_RECORDS, dtype=self.RECORD_DTYPE)
+        self.__numBuffered = 0
+        self.__iteration = 0
+        self.__sequence = sequence
+
+    # ==================== Public ========================================
+    def close(self) -> None:
+        """writes any buffered records and closes the file
+        """
+        self.flush()
+        self.__file.close()
+
+    def flush(self) -> None:
+        """writes the buffered records to the file. They are handed to the operating system
+        (which survives the program crashing) without waiting for them to reach the disk.
+        """
+        if self.__numBuffered > 0:
+            self.__file.write(self.__buffer[:self.__numBuffered].tobytes())
+            self.__file.flush()
+            self.__numBuffered = 0
+
+    def getSequence(self) -> int:
+        """getter for the number of records made so far, over every session
+
+        Returns:
+            int: the sequence number of the last record made, which is saved with the QTable so
+                 that only the records after it are replayed
+        """
+        return self.__sequence
+
+    @staticmethod
+    def read(fileName: str) -> np.ndarray:
+        """reads every complete record from a journal file. If the program crashed part way
+        through writing a record, that record is ignored.
+
+        Args:
+            fileName (str): the journal file
+
+        Returns:
+            np.ndarray: the records, in the order they were written
+        """
+        if not os.path.exists(fileName):
+            return np.zeros(0, dtype=QJournal.RECORD_DTYPE)
+        numRecords = os.path.getsize(fileName) // QJournal.RECORD_DTYPE.itemsize
+        return np.fromfile(fileName, dtype=QJournal.RECORD_DTYPE, count=numRecords)
+
+    def record(self, state: int, actionIndex: int, value: float) -> None:
+        """adds one update to the buffer, writing the buffer out if it is full
+
+        Args:
+            state (int): the integer state that was updated
+            actionIndex (int): the row of the action that was updated
+            value (float): the new QValue
+        """
+        self.__sequence += 1
+        self.__buffer[self.__numBuffered] = (state, actionIndex, value, self.__iteration,
+                                             self.__sequence)
+        self.__numBuffered += 1
+        if self.__numBuffered == len(self.__buffer):
+            self.flush()
+
+    def recordBatch(self, states: np.ndarray, actionIndices: np.ndarray,
+                    values: np.ndarray) -> None:
+        """adds a batch of updates, writing them straight out if they don't fit in the buffer.
+        Like record(), the buffer is written out as soon as it is full, so there is always room
+        for the next record.
+
+        Args:
+            states (np.ndarray): the integer states that were updated
+            actionIndices (np.ndarray): the rows of the actions that were updated
+            values (np.ndarray): the new QValues
+        """
+        records = np.zeros(len(states), dtype=self.RECORD_DTYPE)
+        records["state"] = states
+        records["action"] = actionIndices
+        records["value"] = values
+        records["iteration"] = self.__iteration
+        records["sequence"] = np.arange(self.__sequence + 1, self.__sequence + 1 + len(records))
+        self.__sequence += len(records)
+        if self.__numBuffered + len(records) > len(self.__buffer):
+            self.flush()
+            self.__file.write(records.tobytes())
+            self.__file.flush()
+        else:
+            self.__buffer[self.__numBuffered:self.__numBuffered + len(records)] = records
+            self.__numBuffered += len(records)
+            if self.__numBuffered == len(self.__buffer):
+                self.flush()
+
+    def setIteration(self, iteration: int) -> None:
+        """sets the training iteration that the next records are made in
+
+        Args:
+            iteration (int): the training iteration
+        """
+        self.__iteration = iteration
+
+    def truncate(self) -> None:
+        """empties the journal. Only call this once everything in it has been saved to a
+        snapshot, as the records are lost.
+        """
+        self.__numBuffered = 0
+        self.__file.close()
+        self.__file = open(self.__fileName, "wb")
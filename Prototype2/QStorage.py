@@ -0,0 +1,447 @@
+from Constants import *
+
+import numpy as np
+import sys
+
+
+class DenseQStorage:
+    DTYPES = ("float64", "float32", "float16", "int16")
+    __INT16_RANGE = (np.iinfo("int16").min, np.iinfo("int16").max)
+    
+    def __init__(self, numActions: int, numStates: int, dtype: str,
+                 scale: float = 1.0, offset: float = 0.0) -> None:
+        """The storage behind the QTable, which holds the QValues as an (actions x states) numpy
+        array with one column per state. Along with the values it caches the best action (row)
+        and max QValue of every column, so that deciding and training only ever look at one
+        column instead of the whole table. Rows and columns are passed in as indices, mapping
+        actions and states onto indices is left to the QTable.
+
+        Args:
+            numActions (int): the number of actions (rows)
+            numStates (int): the number of states (columns)
+            dtype (str): how each value is stored: "float64", "float32", "float16" or "int16".
+                         int16 stores round((value - offset) / scale) to quarter the memory of
+                         float64, at the cost of precision and range.
+            scale (float, optional): the size of one int16 step. Defaults to 1.0.
+            offset (float, optional): the value an int16 of 0 stands for. Defaults to 0.0.
+        """
+        self._setValueFormat(numActions, numStates, dtype, scale, offset)
+        self._allocate(numStates)
+
+    # ==================== Protected ========================================
+    # These map states onto the columns of _data. Every state has its own column here, but
+    # SparseQStorage overrides them so only states that have been written to get a column.
+    def _getReadColumn(self, state: int) -> int:
+        """the column to read the state's values from"""
+        return state
+
+    def _getReadColumns(self, states: np.ndarray) -> np.ndarray:
+        """the batch version of _getReadColumn"""
+        return np.asarray(states, dtype="int64")
+
+    def _getWriteColumn(self, state: int) -> int:
+        """the column to write the state's values to"""
+        return state
+
+    def _getWriteColumns(self, states: np.ndarray) -> np.ndarray:
+        """the batch version of _getWriteColumn"""
+        return np.asarray(states, dtype="int64")
+
+    def _loadColumns(self, states: np.ndarray, values: np.ndarray) -> None:
+        """writes the QValues of states that are being loaded (see loadArray)
+
+        Args:
+            states (np.ndarray): the integer states, which haven't been written to since
+                                 _startLoading
+            values (np.ndarray): their (actions x len(states)) QValues
+        """
+        columns = self._getWriteColumns(states)
+        self._data[:, columns] = self._encode(values)
+        self._recalcMaxQValueCache(columns)
+
+    def _startLoading(self) -> None:
+        """sets every value to 0 (in place), ready for loadArray to write the states that
+        aren't 0"""
+        zero = self._encode(0.0)
+        self._data[:] = zero
+        self._bestActionIndices[:] = 0
+        self._maxQValues[:] = zero
+
+    def _allocate(self, numColumns: int) -> None:
+        """creates arrays for the values and the max QValue cache, with every value set to 0
+
+        Args:
+            numColumns (int): the number of columns to make room for
+        """
+        zero = self._encode(0.0)
+        self._data = np.full((self._numActions, numColumns), zero, dtype=self._dtype)
+        # argmax() picks the first row on ties, so a column of zeros starts with row 0 as its best
+        self._bestActionIndices = np.zeros(numColumns, dtype="int64")
+        # the cache holds stored values (not decoded) so it compares exactly like the table
+        self._maxQValues = np.full(numColumns, zero, dtype=self._dtype)
+
+    def _decode(self, stored: np.ndarray) -> np.ndarray:
+        """turns stored values back into QValues. Only int16 values need changing.
+
+        Args:
+            stored (np.ndarray): values (or a single value) as they are stored
+
+        Returns:
+            np.ndarray: the QValues
+        """
+        if self._isQuantised:
+            return stored * self._scale + self._offset
+        return stored
+
+    def _encode(self, values: np.ndarray) -> np.ndarray:
+        """turns QValues into the values that are stored. int16 values are rounded to the
+        nearest step and clipped to the int16 range, floats are cast when they are assigned.
+
+        Args:
+            values (np.ndarray): the QValues (or a single QValue)
+
+        Returns:
+            np.ndarray: the values to store
+        """
+        if self._isQuantised:
+            return np.clip(np.rint((np.asarray(values, dtype="float64") - self._offset) /
+                                   self._scale),
+                           self.__INT16_RANGE[0], self.__INT16_RANGE[1]).astype(self._dtype)
+        return values
+
+    def _setValueFormat(self, numActions: int, numStates: int, dtype: str,
+                        scale: float, offset: float) -> None:
+        """validates and saves how the values are stored (see the constructor)
+
+        Raises:
+            ValueError: the dtype isn't one of the supported dtypes
+            ValueError: the int16 scale isn't > 0
+        """
+        if dtype not in self.DTYPES:
+            raise ValueError("QStorage", f"dtype must be one of {self.DTYPES}, not '{dtype}'")
+        if not scale > 0:
+            raise ValueError("QStorage", f"the int16 scale must be > 0: '{scale}'")
+        self._numActions = numActions
+        self._numStates = numStates
+        self._dtype = np.dtype(dtype)
+        self._isQuantised = self._dtype.kind == "i"
+        # floats are stored as they are, so their scale and offset never change anything
+        self._scale = float(scale) if self._isQuantised else 1.0
+        self._offset = float(offset) if self._isQuantised else 0.0
+
+    def _recalcMaxQValueCache(self, columns: np.ndarray) -> None:
+        """searches the columns passed in again to correct their cached best action and max
+        QValue. Used after batch writes, where many values in a column may have changed.
+
+        Args:
+            columns (np.ndarray): the columns that were written to
+        """
+        columns = np.unique(columns)
+        bestActionIndices = self._data[:, columns].argmax(axis=0)
+        self._bestActionIndices[columns] = bestActionIndices
+        self._maxQValues[columns] = self._data[bestActionIndices, columns]
+
+    def _updateMaxQValueCache(self, actionIndex: int, column: int) -> None:
+        """keeps the cached best action and max QValue of a column correct after one of its
+        values has been written. Only when the current best value is decreased does the whole
+        column need to be searched again, otherwise it is a single comparison.
+
+        Args:
+            actionIndex (int): the row that was just written to
+            column (int): the column that was just written to
+        """
+        # read the value back from the table so the cache has exactly the stored precision
+        value = self._data[actionIndex, column]
+        bestActionIndex = self._bestActionIndices[column]
+        maxQValue = self._maxQValues[column]
+
+        if value > maxQValue or (value == maxQValue and actionIndex < bestActionIndex):
+            # new best value (ties go to the lowest row to match argmax())
+            self._bestActionIndices[column] = actionIndex
+            self._maxQValues[column] = value
+        elif actionIndex == bestActionIndex and value < maxQValue:
+            # the best value went down, so another action in this column may now be the best
+            bestActionIndex = self._data[:, column].argmax()
+            self._bestActionIndices[column] = bestActionIndex
+            self._maxQValues[column] = self._data[bestActionIndex, column]
+
+    # ==================== Public ========================================
+    def addToValues(self, actionIndices: np.ndarray, states: np.ndarray,
+                    deltas: np.ndarray) -> None:
+        """adds each delta onto the value at its location. If the same location appears more
+        than once, all of its deltas are added
+
+        Args:
+            actionIndices (np.ndarray): the rows
+            states (np.ndarray): the integer states
+            deltas (np.ndarray): the amount to add to each value
+        """
+        columns = self._getWriteColumns(states)
+        # total up the deltas of each location first, so each stored value is only rounded once
+        flatIndices = actionIndices * self._data.shape[1] + columns
+        uniqueIndices, inverse = np.unique(flatIndices, return_inverse=True)
+        totals = np.bincount(inverse.ravel(), weights=deltas)
+        rows, uniqueColumns = np.divmod(uniqueIndices, self._data.shape[1])
+        self._data[rows, uniqueColumns] = self._encode(self._decode(self._data[rows, uniqueColumns])
+                                                       + totals)
+        self._recalcMaxQValueCache(uniqueColumns)
+
+    def getBestActionIndex(self, state: int) -> int:
+        """the row with the highest value in the state's column"""
+        return self._bestActionIndices[self._getReadColumn(state)]
+
+    def getBestActionIndices(self, states: np.ndarray) -> np.ndarray:
+        """the batch version of getBestActionIndex"""
+        return self._bestActionIndices[self._getReadColumns(states)]
+
+    def getColumns(self, states: np.ndarray) -> np.ndarray:
+        """gets a copy of the columns of the states passed in
+
+        Args:
+            states (np.ndarray): the integer states
+
+        Returns:
+            np.ndarray: an (actions x len(states)) array
+        """
+        return self._decode(self.getRawColumns(states))
+
+    def getMaxValue(self, state: int) -> float:
+        """the highest value in the state's column"""
+        return self._decode(self._maxQValues[self._getReadColumn(state)])
+
+    def getMaxValues(self, states: np.ndarray) -> np.ndarray:
+        """the batch version of getMaxValue"""
+        return self._decode(self._maxQValues[self._getReadColumns(states)])
+
+    def getMemoryUsage(self) -> int:
+        """calculates how much memory the values and the cache are taking up
+
+        Returns:
+            int: the memory used in bytes
+        """
+        return self._data.nbytes + self._bestActionIndices.nbytes + self._maxQValues.nbytes
+
+    def getValue(self, actionIndex: int, state: int) -> float:
+        """the value at the row and state's column"""
+        return self._decode(self._data[actionIndex, self._getReadColumn(state)])
+
+    def getValues(self, actionIndices: np.ndarray, states: np.ndarray) -> np.ndarray:
+        """the batch version of getValue"""
+        return self._decode(self._data[actionIndices, self._getReadColumns(states)])
+
+    def loadArray(self, data: np.ndarray, scale: float = 1.0, offset: float = 0.0) -> np.ndarray:
+        """replaces all the values with the (actions x states) array passed in, e.g. a memory
+        mapped QTable file. It is read FILE_BLOCK_STATES states at a time, so however it is
+        stored, no more than a block of it is ever decoded in memory at once.
+
+        Args:
+            data (np.ndarray): the full table, as it was stored
+            scale (float, optional): the size of one int16 step of data (ignored if data isn't
+                                     int16). Defaults to 1.0.
+            offset (float, optional): the value an int16 of 0 in data stands for (ignored if
+                                      data isn't int16). Defaults to 0.0.
+
+        Returns:
+            np.ndarray: the states with a QValue that isn't 0
+        """
+        self._startLoading()
+        loadedStates = []
+        for start in range(0, self._numStates, FILE_BLOCK_STATES):
+            states = np.arange(start, min(start + FILE_BLOCK_STATES, self._numStates))
+            values = data[:, start:states[-1] + 1]
+            if values.dtype.kind == "i":
+                values = values * scale + offset
+            states = states[np.any(values != 0, axis=0)]
+            self._loadColumns(states, values[:, states - start])
+            loadedStates.append(states)
+        return np.concatenate(loadedStates)
+
+    def setValue(self, actionIndex: int, state: int, value: float) -> None:
+        """writes the value at the row and state's column, keeping the cache correct"""
+        column = self._getWriteColumn(state)
+        self._data[actionIndex, column] = self._encode(value)
+        self._updateMaxQValueCache(actionIndex, column)
+
+    def setValues(self, actionIndices: np.ndarray, states: np.ndarray,
+                  values: np.ndarray) -> None:
+        """writes each value to its location. If the same location appears more than once, the
+        value that appears last is the one that is kept, just like calling setValue() in a loop.
+
+        Args:
+            actionIndices (np.ndarray): the rows
+            states (np.ndarray): the integer states
+            values (np.ndarray): the new values
+        """
+        columns = self._getWriteColumns(states)
+        # numpy doesn't promise which duplicate wins a fancy assignment, so keep only the last
+        # write to each location by finding the first occurrence in the reversed flat indices
+        flatIndices = (actionIndices * self._data.shape[1] + columns)[::-1]
+        _, lastWrites = np.unique(flatIndices, return_index=True)
+        lastWrites = len(flatIndices) - 1 - lastWrites
+        self._data[actionIndices[lastWrites], columns[lastWrites]] = self._encode(
+            np.asarray(values)[lastWrites])
+        self._recalcMaxQValueCache(columns)
+
+    def getRawColumns(self, states: np.ndarray) -> np.ndarray:
+        """gets a copy of the columns of the states passed in exactly as they are stored
+
+        Args:
+            states (np.ndarray): the integer states
+
+        Returns:
+            np.ndarray: an (actions x len(states)) array of stored values
+        """
+        return self._data[:, self._getReadColumns(states)]
+
+    def getDtype(self) -> np.dtype:
+        """getter for the dtype the values are stored as"""
+        return self._dtype
+
+    def getRawArray(self) -> np.ndarray:
+        """gets the full (actions x states) table exactly as it is stored (int16 values aren't
+        decoded), e.g. for saving it to a file along with the scale and offset
+
+        Returns:
+            np.ndarray: the table of stored values
+        """
+        return self._data
+
+    def writeRawArray(self, out: np.ndarray) -> None:
+        """writes the full (actions x states) table exactly as it is stored into out, e.g. a
+        memory mapped file, without making a copy of it first
+
+        Args:
+            out (np.ndarray): an (actions x states) array of the storage's dtype to write to
+        """
+        for start in range(0, self._numStates, FILE_BLOCK_STATES):
+            end = start + FILE_BLOCK_STATES
+            out[:, start:end] = self._data[:, start:end]
+
+    def getScaleAndOffset(self) -> tuple:
+        """getter for the int16 scale and offset (1.0 and 0.0 for float dtypes)"""
+        return self._scale, self._offset
+
+    def toArray(self) -> np.ndarray:
+        """gets the full (actions x states) table of QValues
+
+        Returns:
+            np.ndarray: the table of QValues
+        """
+        return self._decode(self.getRawArray())
+
+
+class SparseQStorage(DenseQStorage):
+    def __init__(self, numActions: int, numStates: int, dtype: str,
+                 scale: float = 1.0, offset: float = 0.0) -> None:
+        """Stores the same values as DenseQStorage, but a state is only given a column the first
+        time it is written to. The car only ever visits a thin band of the states, so this keeps
+        the memory use proportional to the states visited rather than the size of STATE_SHAPE.
+        A dictionary maps each visited state onto its column. Column 0 is never written to, so
+        every unvisited state reads from it and gets the default values of 0 for free.
+
+        Args:
+            numActions (int): the number of actions (rows)
+            numStates (int): the number of states
+            dtype (str): how each value is stored (see DenseQStorage)
+            scale (float, optional): the size of one int16 step. Defaults to 1.0.
+            offset (float, optional): the value an int16 of 0 stands for. Defaults to 0.0.
+        """
+        self._setValueFormat(numActions, numStates, dtype, scale, offset)
+        self.__columns = {}
+        self.__numColumnsUsed = 1 # column 0 is the unvisited column
+        self._allocate(SPARSE_QTABLE_INITIAL_COLUMNS + 1)
+
+    # ==================== Private ========================================
+    def __grow(self) -> None:
+        """doubles the number of columns available, keeping the values and cache already stored
+        """
+        data, bestActionIndices, maxQValues = (self._data, self._bestActionIndices,
+                                               self._maxQValues)
+        self._allocate(2 * data.shape[1])
+        self._data[:, :data.shape[1]] = data
+        self._bestActionIndices[:len(bestActionIndices)] = bestActionIndices
+        self._maxQValues[:len(maxQValues)] = maxQValues
+
+    # ==================== Protected ========================================
+    # loadArray only gives a column to the states with a QValue that isn't 0
+    def _startLoading(self) -> None:
+        self.__columns = {}
+        self.__numColumnsUsed = 1
+        self._allocate(SPARSE_QTABLE_INITIAL_COLUMNS + 1)
+
+    def _getReadColumn(self, state: int) -> int:
+        return self.__columns.get(state, 0)
+
+    def _getReadColumns(self, states: np.ndarray) -> np.ndarray:
+        states = np.asarray(states).ravel()
+        return np.fromiter((self.__columns.get(state, 0) for state in states.tolist()),
+                           dtype="int64", count=len(states))
+
+    def _getWriteColumn(self, state: int) -> int:
+        column = self.__columns.get(state)
+        if column is None:
+            if self.__numColumnsUsed == self._data.shape[1]:
+                self.__grow()
+            column = self.__numColumnsUsed
+            self.__columns[state] = column
+            self.__numColumnsUsed += 1
+        return column
+
+    def _getWriteColumns(self, states: np.ndarray) -> np.ndarray:
+        states = np.asarray(states).ravel()
+        return np.fromiter((self._getWriteColumn(state) for state in states.tolist()),
+                           dtype="int64", count=len(states))
+
+    # ==================== Public ========================================
+    def getMemoryUsage(self) -> int:
+        """calculates how much memory the values, the cache and the dictionary of columns are
+        taking up. Each dictionary entry also holds two python integers.
+
+        Returns:
+            int: the memory used in bytes
+        """
+        return (super().getMemoryUsage() + sys.getsizeof(self.__columns) +
+                len(self.__columns) * 2 * sys.getsizeof(self._numStates))
+
+    def getNumVisitedStates(self) -> int:
+        """getter for the number of states which have been given a column
+
+        Returns:
+            int: the number of states written to
+        """
+        return len(self.__columns)
+
+
+    def getRawArray(self) -> np.ndarray:
+        """builds the full (actions x states) table exactly as it is stored, with the stored
+        value of 0 for unvisited states
+
+        Returns:
+            np.ndarray: the table of stored values
+        """
+        data = np.full((self._numActions, self._numStates), self._data[0, 0], dtype=self._dtype)
+        visitedStates = np.fromiter(self.__columns.keys(), dtype="int64",
+                                    count=len(self.__columns))
+        columns = np.fromiter(self.__columns.values(), dtype="int64", count=len(self.__columns))
+        data[:, visitedStates] = self._data[:, columns]
+        return data
+
+    def writeRawArray(self, out: np.ndarray) -> None:
+        """writes the full (actions x states) table exactly as it is stored into out, e.g. a
+        memory mapped file. Unvisited states are filled in with the stored value of 0 a block
+        at a time, then only the visited columns are copied, so it never builds the dense table.
+
+        Args:
+            out (np.ndarray): an (actions x states) array of the storage's dtype to write to
+        """
+        for start in range(0, self._numStates, FILE_BLOCK_STATES):
+            out[:, start:start + FILE_BLOCK_STATES] = self._data[:, :1]
+        visitedStates = np.fromiter(self.__columns.keys(), dtype="int64",
+                                    count=len(self.__columns))
+        columns = np.fromiter(self.__columns.values(), dtype="int64", count=len(self.__columns))
+        # in order of state, so each block is written to one part of the file
+        order = np.argsort(visitedStates)
+        visitedStates, columns = visitedStates[order], columns[order]
+        for start in range(0, len(visitedStates), FILE_BLOCK_STATES):
+            end = start + FILE_BLOCK_STATES
+            out[:, visitedStates[start:end]] = self._data[:, columns[start:end]]
@@ -1,31 +1,79 @@
 from Constants import *
+from StateEncoder import *
+from QTableFile import *
+from QStorage import *
+from QJournal import *
+from QTableExporter import *
+from QTableSnapshot import *
+from RandomStream import *
 
 import numpy as np
-from random import choice
+import os
 
 
 class QTable:
-    def __init__(self) -> None:
+    def __init__(self, dtype: str = QTABLE_DTYPE, randomStream: RandomStream = None) -> None:
         """starts by validating the constants for state and action shapes. From this, 
         the number of rows and column can be calculated and an emtpy numpy array can be
         initialised for my QTable.
+
+        Args:
+            dtype (str, optional): how the QValues are stored: "float64", "float32", "float16"
+                                   or "int16" (scaled by QTABLE_INT16_SCALE and
+                                   QTABLE_INT16_OFFSET). Defaults to QTABLE_DTYPE.
+            randomStream (RandomStream, optional): where random actions are drawn from. None for
+                                                   a new unseeded stream. Defaults to None.
         """
         # validate the constants (raises ValueError if invalid)
         self.__validateStateAndActionShape()
+        self.__random = RandomStream() if randomStream is None else randomStream
         
-        # state iterations per catagory is needed for O(1) mapping between states and indices.
-        self.__stateIterationsPerCatagory = [len(range(STATE_SHAPE[0][x],
-                                                       STATE_SHAPE[1][x] + 1,
-                                                       STATE_SHAPE[2][x])) for x in range(3)]
+        # the encoder maps states onto integers which are used directly as the column indices
+        self.__stateEncoder = StateEncoder()
         
         self.__allActions = [str(x) for x in range(ACTION_SHAPE[0],
                                                    ACTION_SHAPE[1] + 1,
                                                    ACTION_SHAPE[2])]
+        # the same actions as integers, so whole arrays of actions can be indexed at once
+        self.__allActionValues = np.arange(ACTION_SHAPE[0], ACTION_SHAPE[1] + 1, ACTION_SHAPE[2])
         
-        numCols = np.product(self.__stateIterationsPerCatagory)
+        numCols = self.__stateEncoder.getNumStates()
         numRows = len(self.__allActions)
-        # dtype can be experimented with if i need more/less precision
-        self.__data  = np.zeros((numRows, numCols), dtype="float32")
+        # the storage holds the values (and caches the best action of each state), either as a
+        # dense numpy array or sparsely for only the states which have been visited
+        if QTABLE_STORAGE == "dense":
+            self.__storage = DenseQStorage(numRows, numCols, dtype,
+                                           QTABLE_INT16_SCALE, QTABLE_INT16_OFFSET)
+        elif QTABLE_STORAGE == "sparse":
+            self.__storage = SparseQStorage(numRows, numCols, dtype,
+                                            QTABLE_INT16_SCALE, QTABLE_INT16_OFFSET)
+        else:
+            raise ValueError("QTable", f"QTABLE_STORAGE must be 'dense' or 'sparse', not "+
+                                       f"'{QTABLE_STORAGE}'")
+        
+        # every update is also written to the journal once one is attached
+        self.__journal = None
+        # True for every state (column) written to since the table was last saved, so that a
+        # checkpoint only needs to write those columns
+        self.__dirtyStates = np.zeros(numCols, dtype="bool")
+        # True for every state written to since the last snapshot was published, so publishing
+        # only has to read those columns
+        self.__staleSnapshotStates = np.zeros(numCols, dtype="bool")
+        # nothing has been written yet, so the column of any state is what an untouched state
+        # reads as, and every block starts out without any columns
+        defaultState = np.zeros(1, dtype="int64")
+        defaultValues = self.__storage.getColumns(defaultState)[:, 0]
+        defaultValues.setflags(write=False)
+        self.__defaultSnapshotColumn = (defaultValues,
+                                        int(self.__storage.getBestActionIndices(defaultState)[0]),
+                                        float(self.__storage.getMaxValues(defaultState)[0]))
+        emptyBlock = self.__makeSnapshotBlock(np.zeros(0, dtype="int64"),
+                                              np.zeros((len(defaultValues), 0),
+                                                       dtype=defaultValues.dtype),
+                                              np.zeros(0, dtype="int64"), np.zeros(0))
+        numBlocks = -(-numCols // SNAPSHOT_BLOCK_STATES)
+        self.__snapshot = QTableSnapshot([emptyBlock] * numBlocks, self.__defaultSnapshotColumn,
+                                         numCols, self.__allActions, 0, 0)
 
     # ==================== Private ========================================    
     @staticmethod              
@@ -37,27 +85,82 @@ class QTable:
             was recently obtained via getRandomAction or getActionWithMaxQValue and not modified)
 
         Returns:
-            int: the index of that action (row) in the __data numpy array
+            int: the index of that action (row) in the QTable's storage
         """
         return (int(action) - ACTION_SHAPE[0]) // ACTION_SHAPE[2]        
           
-    def __stateToIndex(self, state: str) -> int:
-        """maps the state onto the correct index in my QTable in constant time complexity
+    @staticmethod
+    def __actionsToIndices(actions: np.ndarray) -> np.ndarray:
+        """the batch version of __actionToIndex, which maps a whole array of actions at once
+
+        Args:
+            actions (np.ndarray): integer actions that are guarenteed to be valid
+
+        Returns:
+            np.ndarray: the index of each action (row) in the QTable's storage
+        """
+        return (np.asarray(actions, dtype="int64") - ACTION_SHAPE[0]) // ACTION_SHAPE[2]
+    
+    def __getJournalSequence(self) -> int:
+        """gets where the journal is up to, to save in the QTable file's header
+
+        Returns:
+            int: the sequence number of the last journal record made, which is saved with the
+                 table (0 without a journal)
+        """
+        return 0 if self.__journal is None else self.__journal.getSequence()
+    
+    def __markStatesChanged(self, states) -> None:
+        """marks the states as needing to be saved and published in the next snapshot
+
+        Args:
+            states (int | np.ndarray): the integer state(s) that were written to
+        """
+        self.__dirtyStates[states] = True
+        self.__staleSnapshotStates[states] = True
+    
+    @staticmethod
+    def __makeSnapshotBlock(states: np.ndarray, values: np.ndarray,
+                            bestActionIndices: np.ndarray, maxValues: np.ndarray) -> tuple:
+        """makes the arrays of a block read-only, so they can be shared between snapshots
+
+        Returns:
+            tuple: the (states, values, bestActionIndices, maxValues) block
+        """
+        for array in (states, values, bestActionIndices, maxValues):
+            array.setflags(write=False)
+        return states, values, bestActionIndices, maxValues
+    
+    @staticmethod
+    def __mergeSnapshotBlock(block: tuple, states: np.ndarray, values: np.ndarray,
+                             bestActionIndices: np.ndarray, maxValues: np.ndarray) -> tuple:
+        """copies a block of a snapshot with the columns of some of its states replaced or added
 
         Args:
-            state (str): the 6 digit state that is assumed to be valid (should be validated
-            before being passed into here) The program won't crash if the state is invalid,
-            but the returned index may not be accurate.
+            block (tuple): the (states, values, bestActionIndices, maxValues) block to copy
+            states (np.ndarray): the sorted states in the block with new columns
+            values (np.ndarray): the new (actions x len(states)) QValues
+            bestActionIndices (np.ndarray): the row of the best action of each state
+            maxValues (np.ndarray): the maximum QValue of each state
 
         Returns:
-            int: the index of that state (column) in the __data numpy array
+            tuple: the new block
         """
-        itersOfSeverity = (int(state[0]) - STATE_SHAPE[0][0]) // STATE_SHAPE[2][0]
-        index = itersOfSeverity * np.product(self.__stateIterationsPerCatagory[1:])
-        itersOfDistance = (int(state[1:3]) - STATE_SHAPE[0][1]) // STATE_SHAPE[2][1]
-        index += itersOfDistance * self.__stateIterationsPerCatagory[2]
-        index += (int(state[-3:]) - STATE_SHAPE[0][2]) // STATE_SHAPE[2][2]
-        return index
+        oldStates, oldValues, oldBestActionIndices, oldMaxValues = block
+        mergedStates = np.union1d(oldStates, states)
+        oldPositions = np.searchsorted(mergedStates, oldStates)
+        newPositions = np.searchsorted(mergedStates, states)
+        mergedValues = np.empty((len(values), len(mergedStates)), dtype=values.dtype)
+        mergedBestActionIndices = np.empty(len(mergedStates), dtype="int64")
+        mergedMaxValues = np.empty(len(mergedStates))
+        for merged, old, new in ((mergedValues.T, oldValues.T, values.T),
+                                 (mergedBestActionIndices, oldBestActionIndices,
+                                  bestActionIndices),
+                                 (mergedMaxValues, oldMaxValues, maxValues)):
+            merged[oldPositions] = old
+            merged[newPositions] = new
+        return QTable.__makeSnapshotBlock(mergedStates, mergedValues, mergedBestActionIndices,
+                                          mergedMaxValues)
     
     @staticmethod
     def __validateStateAndActionShape() -> None:
@@ -121,45 +224,134 @@ class QTable:
                                         f"'{ACTION_SHAPE[2]}'")  
                    
     # ==================== Public ======================================== 
-    def getActionWithMaxQValue(self, state: str) -> str:
+    def attachJournal(self, journal: QJournal) -> None:
+        """from now on, every update to the QTable is also recorded in the journal
+
+        Args:
+            journal (QJournal): the open journal to record updates in
+        """
+        self.__journal = journal
+    
+    def checkpointToFile(self, fileName: str, iterations: int) -> int:
+        """writes only the columns that have changed since the last save into the binary file,
+        which is memory mapped so the rest of it is never touched. If the file doesn't exist
+        yet or is stored differently, the whole table is saved instead.
+        The header's iterations and journal sequence number are written last, so if the program
+        crashes part way through, the journal still replays everything after the previous
+        checkpoint.
+
+        Args:
+            fileName (str): the file saved by saveToFile or a previous checkpoint
+            iterations (int): the number of training iterations, stored in the file's header
+
+        Returns:
+            int: the number of columns written
+        """
+        scale, offset = self.__storage.getScaleAndOffset()
+        if os.path.exists(fileName):
+            header = QTableFile.readHeader(fileName)
+            if (header["version"] == QTableFile.VERSION and
+                header["dtype"] == self.__storage.getDtype() and
+                header["scale"] == scale and header["offset"] == offset):
+                dirtyStates = np.flatnonzero(self.__dirtyStates)
+                data, _ = QTableFile.load(fileName, "r+")
+                data[:, dirtyStates] = self.__storage.getRawColumns(dirtyStates)
+                data.flush()
+                del data
+                QTableFile.writeProgress(fileName, iterations, self.__getJournalSequence())
+                self.__dirtyStates[:] = False
+                return len(dirtyStates)
+        
+        self.saveToFile(fileName, iterations)
+        return len(self.__dirtyStates)
+    
+    def loadFromFile(self, fileName: str) -> tuple:
+        """replaces the QTable with the one saved in the binary file, so training can be resumed
+
+        Args:
+            fileName (str): the file saved by saveToFile
+
+        Raises:
+            ValueError: if the file isn't a valid QTable file for the current shape constants
+
+        Returns:
+            tuple: the number of training iterations the saved table had, and the sequence
+                   number of the last journal record it includes (for replayJournal)
+        """
+        data, header = QTableFile.load(fileName)
+        # the file may be stored in a different dtype, so it is decoded before it's re-encoded
+        loadedStates = self.__storage.loadArray(data, header["scale"], header["offset"])
+        del data
+        self.__dirtyStates[:] = False
+        # every state with a column in the last snapshot or a value in the file may have changed
+        for block in self.__snapshot.getBlocks():
+            self.__staleSnapshotStates[block[0]] = True
+        self.__staleSnapshotStates[loadedStates] = True
+        return header["iterations"], header["journalSequence"]
+    
+    def getActionWithMaxQValue(self, state: int) -> str:
         """returns the valid action string which has the highest QValue associated with it for
         the specified state.
 
         Args:
-            state (str): the 6 digit state string (assumed to be valid)
+            state (int): the integer state (assumed to be valid)
 
         Returns:
             str: the action string with the highest Qvalue associated with it
         """
-        # argmax() returns a list of indices with the maximum values associated with them along
-        # a given axis: 0 for columns. Then we index into the action we're interested in
-        return self.__allActions[self.__data.argmax(axis=0)[self.__stateToIndex(state)]]
+        # the best action of every column is kept up to date by update(), so no search is needed
+        return self.__allActions[self.__storage.getBestActionIndex(state)]
     
-    def getMaxQValue(self, state: str) -> float:
+    def getAllQValues(self) -> np.ndarray:
+        """gets the whole (actions x states) table of QValues, decoded from however they are
+        stored
+
+        Returns:
+            np.ndarray: the table of QValues
+        """
+        return self.__storage.toArray()
+    
+    def getMaxQValue(self, state: int) -> float:
         """return the maximum Qvalue of the specified state (coloumn)
 
         Args:
-            state (str): the 6 digit state string (assumed to be valid)
+            state (int): the integer state (assumed to be valid)
 
         Returns:
             float: the maximum QValue of the column
         """
-        # np.amax() returns a list of the maximum values along a given axis: 0 is for columns
-        # then we index this list to find the max value of the column we're interested in
-        return np.amax(self.__data, axis=0)[self.__stateToIndex(state)]
+        # the max value of every column is kept up to date by update(), so no search is needed
+        return self.__storage.getMaxValue(state)
+    
+    def getSnapshot(self) -> QTableSnapshot:
+        """returns the most recently published snapshot. This is safe to call from any thread
+        without a lock, as a snapshot is never changed once it has been published.
+
+        Returns:
+            QTableSnapshot: the latest immutable copy of the table
+        """
+        return self.__snapshot
+    
+    def getMemoryUsage(self) -> int:
+        """getter for how much memory the QTable's values are taking up, so the dense and sparse
+        storage can be compared
+
+        Returns:
+            int: the memory used in bytes
+        """
+        return self.__storage.getMemoryUsage()
     
-    def getQValue(self, state: str, action: str) -> float:
+    def getQValue(self, state: int, action: str) -> float:
         """returns the QValue at the specified state and action location on the Qtable
 
         Args:
-            state (str): the 6 digit state string (assumed to be valid)
+            state (int): the integer state (assumed to be valid)
             action (str): the action (guaranteed to be valid)
 
         Returns:
             float: the QValue
         """
-        return self.__data[self.__actionToIndex(action),
-                           self.__stateToIndex(state)]
+        return self.__storage.getValue(self.__actionToIndex(action), state)
     
     def getRandomAction(self) -> str:
         """returns a random valid action from the QTable
@@ -167,62 +359,238 @@ class QTable:
         Returns:
             str: the random action
         """
-        return choice(self.__allActions)
+        return self.__allActions[self.__random.randomInt(len(self.__allActions))]
+    
+    def publishSnapshot(self, iterations: int) -> QTableSnapshot:
+        """publishes a new immutable snapshot of the table for other threads. Only the columns
+        of states changed since the last snapshot are read out of the storage, and only the
+        blocks they are in are copied, the rest are shared with the last snapshot. The new
+        snapshot is completely built before the single reference assignment that publishes it,
+        so readers never need a lock.
+
+        Args:
+            iterations (int): the number of training iterations, stored in the snapshot
+
+        Returns:
+            QTableSnapshot: the snapshot that was published
+        """
+        previous = self.__snapshot
+        blocks = previous.getBlocks()
+        staleStates = np.flatnonzero(self.__staleSnapshotStates)
+        # each column is read out of the storage once, however many blocks it is split over
+        values = self.__storage.getColumns(staleStates)
+        bestActionIndices = self.__storage.getBestActionIndices(staleStates)
+        maxValues = self.__storage.getMaxValues(staleStates)
+        # the states are in order, so the states of each block are next to each other
+        blockNumbers = staleStates // SNAPSHOT_BLOCK_STATES
+        blockStarts = np.flatnonzero(np.diff(blockNumbers, prepend=-1))
+        for start, end in zip(blockStarts.tolist(), blockStarts[1:].tolist() + [len(staleStates)]):
+            blockNumber = int(blockNumbers[start])
+            blocks[blockNumber] = self.__mergeSnapshotBlock(blocks[blockNumber],
+                                                            staleStates[start:end],
+                                                            values[:, start:end],
+                                                            bestActionIndices[start:end],
+                                                            maxValues[start:end])
+        self.__snapshot = QTableSnapshot(blocks, self.__defaultSnapshotColumn,
+                                         len(self.__staleSnapshotStates), self.__allActions,
+                                         previous.getVersion() + 1, iterations)
+        self.__staleSnapshotStates[:] = False
+        return self.__snapshot
+    
+    def saveToFile(self, fileName: str, iterations: int) -> None:
+        """saves the QTable to a binary file, so it can be loaded back later. The storage
+        writes itself straight into the file, so a sparse table is never made dense in memory.
+
+        Args:
+            fileName (str): the file to save to
+            iterations (int): the number of training iterations, stored in the file's header
+        """
+        QTableFile.saveWith(fileName, self.__storage.writeRawArray, self.__storage.getDtype(),
+                            iterations, *self.__storage.getScaleAndOffset(),
+                            self.__getJournalSequence())
+        self.__dirtyStates[:] = False
     
-    def update(self, state: str, action: str, value: float) -> None:
+    def update(self, state: int, action: str, value: float) -> None:
         """updates the QTable at the specified action and state location with the specified
         value.
 
         Args:
-            state (str): the 6 digit state string (assumed to be valid)
+            state (int): the integer state (assumed to be valid)
             action (str): the action string (guarenteed to be valid)
             value (float): the new QValue that needs to be written
         """
-        self.__data[self.__actionToIndex(action), self.__stateToIndex(state)] = value
+        actionIndex = self.__actionToIndex(action)
+        self.__storage.setValue(actionIndex, state, value)
+        self.__markStatesChanged(state)
+        if self.__journal is not None:
+            self.__journal.record(state, actionIndex, value)
     
-    @staticmethod
-    def validateState(state: str) -> bool:
-        """validates the state passed in agains the state shape constant to make sure it is
-        within all the upper and lower bounds
+    def replayJournal(self, records: np.ndarray, afterSequence: int, iterations: int) -> int:
+        """re-applies the updates in a journal on top of the table, skipping any that were made
+        before the table was saved. Records are picked by their sequence number rather than
+        their training iteration, as updates made between iterations (e.g. by replay) share
+        the iteration of the save before them.
 
         Args:
-            state (str): the 6 digit state string
+            records (np.ndarray): the records read by QJournal.read
+            afterSequence (int): the journal sequence number saved with the table, only records
+                                 after this are replayed
+            iterations (int): the number of training iterations of the table
+
+        Returns:
+            int: the number of training iterations of the table after the replay
+        """
+        records = records[records["sequence"] > afterSequence]
+        if len(records) == 0:
+            return iterations
+        # the records are in the order they were made, so the last write to each location wins
+        self.__storage.setValues(records["action"].astype("int64"),
+                                 records["state"].astype("int64"),
+                                 records["value"])
+        self.__markStatesChanged(records["state"])
+        return max(iterations, int(records["iteration"].max()))
+    
+    def validateState(self, state: int) -> bool:
+        """validates the state passed in against the state shape constant to make sure it is
+        one of the states in the QTable
+
+        Args:
+            state (int): the integer state from the StateEncoder
 
         Returns:
             bool: True if the state is valid, False otherwise
         """
-        if not STATE_SHAPE[0][0] <= int(state[0]) <= STATE_SHAPE[1][0]:
-            return False
-        elif not STATE_SHAPE[0][1] <= int(state[1:3]) <= STATE_SHAPE[1][1]:
-            return False
-        elif not STATE_SHAPE[0][2] <= int(state[-3:]) <= STATE_SHAPE[1][2]:
-            return False
-        return True
+        return self.__stateEncoder.validate(state)
     
     
-    @staticmethod
-    def __getallStatesFromShape(shape: list) -> list:
-        states = []
-        for s in range(shape[0][0], shape[1][0]+1, shape[2][0]):
-            for d in range(shape[0][1], shape[1][1]+1, shape[2][1]):
-                for v in range(shape[0][2], shape[1][2]+1, shape[2][2]):
-                    states.append(f"{s}{d:02d}{v:03d}")
-        return states
-    
-    def writeTableToFile(self):
-        with open("QTable.txt", "w") as f:
-            allStates = self.__getallStatesFromShape(STATE_SHAPE)
-            f.write("   |  "+",   ".join(allStates))
-            f.write("\n---"+"----------"*len(allStates))
-            for i, action in enumerate(self.__allActions):
-                formatted = []
-                for col in self.__data[i]:
-                    if col >= 0:
-                        formatted.append(f"{col:.2E}")
-                    else:
-                        formatted.append(f"{col:.1E}")
-                        
-                f.write(f"\n{action} | "+"  ".join(formatted))
+    # ==================== Batch
+    # These take numpy arrays of integer states and integer actions, so that thousands of
+    # transitions can be processed by a single numpy call instead of a python loop.
+    def addToQValues(self, states: np.ndarray, actions: np.ndarray, deltas: np.ndarray,
+                     journal: bool = True) -> None:
+        """adds each delta onto the QValue at its state and action location. If the same
+        location appears more than once, all of its deltas are added, so learning updates that
+        were calculated from the same QValues should be averaged per location first (see
+        QAgent.__applyBatchUpdates)
+
+        Args:
+            states (np.ndarray): the integer states (assumed to be valid)
+            actions (np.ndarray): the integer actions (guarenteed to be valid)
+            deltas (np.ndarray): the amount to add to each QValue
+            journal (bool, optional): False to not record the updates in the journal, e.g. for
+                                      the very many planning updates, which journalQValues
+                                      records once they are finished. Defaults to True.
+        """
+        actionIndices = self.__actionsToIndices(actions)
+        self.__storage.addToValues(actionIndices, states, deltas)
+        self.__markStatesChanged(states)
+        if journal and self.__journal is not None:
+            self.__journal.recordBatch(states, actionIndices,
+                                       self.__storage.getValues(actionIndices, states))
+    
+    def getActionsWithMaxQValue(self, states: np.ndarray) -> np.ndarray:
+        """the batch version of getActionWithMaxQValue
+
+        Args:
+            states (np.ndarray): the integer states (assumed to be valid)
+
+        Returns:
+            np.ndarray: the integer action with the highest QValue for each state
+        """
+        return self.__allActionValues[self.__storage.getBestActionIndices(states)]
+    
+    def getMaxQValues(self, states: np.ndarray) -> np.ndarray:
+        """the batch version of getMaxQValue
+
+        Args:
+            states (np.ndarray): the integer states (assumed to be valid)
+
+        Returns:
+            np.ndarray: the maximum QValue of each state's column
+        """
+        return self.__storage.getMaxValues(states)
+    
+    def getRandomActions(self, numActions: int) -> np.ndarray:
+        """the batch version of getRandomAction
+
+        Args:
+            numActions (int): how many random actions to pick
+
+        Returns:
+            np.ndarray: the random integer actions
+        """
+        return self.__allActionValues[self.__random.randomInts(len(self.__allActionValues),
+                                                               numActions)]
+    
+    def getQValues(self, states: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        """the batch version of getQValue
+
+        Args:
+            states (np.ndarray): the integer states (assumed to be valid)
+            actions (np.ndarray): the integer actions (guarenteed to be valid)
+
+        Returns:
+            np.ndarray: the QValue at each state and action location
+        """
+        return self.__storage.getValues(self.__actionsToIndices(actions), states)
+    
+    def validateStates(self, states: np.ndarray) -> np.ndarray:
+        """the batch version of validateState
+
+        Args:
+            states (np.ndarray): the integer states from the StateEncoder
+
+        Returns:
+            np.ndarray: True where the state is valid, False otherwise
+        """
+        return self.__stateEncoder.validateBatch(states)
+    
+    def journalQValues(self, states: np.ndarray, actions: np.ndarray) -> None:
+        """records the current QValue of each state and action location in the journal, once
+        per location however many times it is passed in. This is for updates made with
+        journal=False, so that a crash still loses nothing without a record of every update.
+
+        Args:
+            states (np.ndarray): the integer states (assumed to be valid)
+            actions (np.ndarray): the integer actions (guarenteed to be valid)
+        """
+        if self.__journal is None or len(states) == 0:
+            return
+        numActions = len(self.__allActions)
+        uniqueLocations = np.unique(np.asarray(states, dtype="int64") * numActions +
+                                    self.__actionsToIndices(actions))
+        states, actionIndices = np.divmod(uniqueLocations, numActions)
+        self.__journal.recordBatch(states, actionIndices,
+                                   self.__storage.getValues(actionIndices, states))
+    
+    def updateBatch(self, states: np.ndarray, actions: np.ndarray, values: np.ndarray) -> None:
+        """the batch version of update. If the same location appears more than once, the value
+        that appears last is the one that is kept, just like calling update() in a loop.
+
+        Args:
+            states (np.ndarray): the integer states (assumed to be valid)
+            actions (np.ndarray): the integer actions (guarenteed to be valid)
+            values (np.ndarray): the new QValues that need to be written
+        """
+        actionIndices = self.__actionsToIndices(actions)
+        self.__storage.setValues(actionIndices, states, values)
+        self.__markStatesChanged(states)
+        if self.__journal is not None:
+            self.__journal.recordBatch(states, actionIndices, values)
+    
+    def writeTableToFile(self, fileName: str = "QTable.txt", fileFormat: str = "text",
+                         stateMajor: bool = False) -> None:
+        """writes the QTable to a human readable file for inspection. It is streamed a block of
+        states at a time, so it runs in bounded memory however big the table is.
+
+        Args:
+            fileName (str, optional): the file to write to. Defaults to "QTable.txt".
+            fileFormat (str, optional): "text" or "csv". Defaults to "text".
+            stateMajor (bool, optional): True for one row per state instead of one row per
+                                         action. Defaults to False.
+        """
+        QTableExporter(self.__storage.getColumns, self.__allActions).export(fileName, fileFormat,
+                                                                            stateMajor)
     
     
     
@@ -253,8 +621,10 @@ class QTable:
 if __name__ == '__main__':
     table = QTable()
     
+    stateEncoder = StateEncoder()
     for i in range(199999 + 1):
         state = "{:06d}".format(i)
-        print(f"State {state} validated returns {table.validateState(state)}")
+        print(f"State {state} validated returns "+
+              f"{table.validateState(stateEncoder.fromString(state))}")
 
     
\ No newline at end of file
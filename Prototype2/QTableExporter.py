@@ -0,0 +1,141 @@
+from Constants import *
+from StateEncoder import *
+
+import numpy as np
+import shutil
+import tempfile
+from contextlib import ExitStack
+
+
+class QTableExporter:
+    """Writes a QTable to a human readable file. The table is read and formatted a block of
+    EXPORT_BLOCK_STATES states at a time with numpy, and each block is written as soon as it is
+    formatted, so exporting never holds more than one block of strings in memory.
+    Formats:
+        "text": the layout QTable.txt has always had (and QTableFile.loadLegacyText reads)
+        "csv": comma separated, with every value at full float32 precision
+    Either can be action major (one row per action, like QTable.txt) or state major (one row per
+    state), which is easier to read when there are many more states than actions.
+    """
+    FORMATS = ("text", "csv")
+
+    def __init__(self, getColumns, actions: list) -> None:
+        """sets up an exporter that reads the table through getColumns
+
+        Args:
+            getColumns (function): returns the (actions x len(states)) QValues for an array of
+                                   integer states, e.g. the QTable storage's getColumns
+            actions (list): the action strings, in row order
+        """
+        self.__getColumns = getColumns
+        self.__actions = actions
+        self.__stateEncoder = StateEncoder()
+
+    # ==================== Private ========================================
+    def __getStateBlocks(self):
+        """splits all the integer states into blocks of EXPORT_BLOCK_STATES
+
+        Yields:
+            np.ndarray: the next block of integer states
+        """
+        numStates = self.__stateEncoder.getNumStates()
+        for start in range(0, numStates, EXPORT_BLOCK_STATES):
+            yield np.arange(start, min(start + EXPORT_BLOCK_STATES, numStates))
+
+    @staticmethod
+    def __formatValues(values: np.ndarray, fileFormat: str) -> np.ndarray:
+        """formats every value in the array at once. The text format uses 3 significant figures,
+        but 2 for negative values so that every value is 8 characters wide.
+
+        Args:
+            values (np.ndarray): the QValues
+            fileFormat (str): "text" or "csv"
+
+        Returns:
+            np.ndarray: the formatted values, in the same shape
+        """
+        if fileFormat == "csv":
+            return np.char.mod("%.9g", values)
+        return np.where(values >= 0, np.char.mod("%.2E", values), np.char.mod("%.1E", values))
+
+    def __writeActionMajor(self, f, fileFormat: str) -> None:
+        """writes one row per action. A row spans every state, so each block of states is read
+        once and its part of every row is written to a temporary file for that row, then the
+        rows are copied into the file one after another.
+
+        Args:
+            f (file): the open file to write to
+            fileFormat (str): "text" or "csv"
+        """
+        if fileFormat == "csv":
+            headerStart, stateSeparator, rowStart, valueSeparator = "action", ",", "\n{},", ","
+        else:
+            headerStart, stateSeparator, rowStart, valueSeparator = "   |  ", ",   ", "\n{} | ", "  "
+
+        f.write(headerStart)
+        for blockNumber, states in enumerate(self.__getStateBlocks()):
+            if blockNumber > 0 or fileFormat == "csv":
+                f.write(stateSeparator)
+            f.write(stateSeparator.join(self.__stateEncoder.toStrings(states)))
+        if fileFormat == "text":
+            f.write("\n---")
+            for states in self.__getStateBlocks():
+                f.write("----------" * len(states))
+
+        with ExitStack() as stack:
+            rowFiles = [stack.enter_context(tempfile.TemporaryFile("w+"))
+                        for _ in self.__actions]
+            for blockNumber, states in enumerate(self.__getStateBlocks()):
+                formatted = self.__formatValues(self.__getColumns(states), fileFormat)
+                for rowFile, row in zip(rowFiles, formatted):
+                    if blockNumber > 0:
+                        rowFile.write(valueSeparator)
+                    rowFile.write(valueSeparator.join(row))
+            for action, rowFile in zip(self.__actions, rowFiles):
+                f.write(rowStart.format(action))
+                rowFile.seek(0)
+                shutil.copyfileobj(rowFile, f)
+
+    def __writeStateMajor(self, f, fileFormat: str) -> None:
+        """writes one row per state, so each block of states is a block of whole rows
+
+        Args:
+            f (file): the open file to write to
+            fileFormat (str): "text" or "csv"
+        """
+        if fileFormat == "csv":
+            f.write("state," + ",".join(self.__actions))
+            rowStart, valueSeparator = "\n{},", ","
+        else:
+            # the labels are padded to the 8 character width of the values so the columns line up
+            f.write("state  | " + "  ".join(action.rjust(8) for action in self.__actions))
+            f.write("\n---------" + "----------" * len(self.__actions))
+            rowStart, valueSeparator = "\n{} | ", "  "
+
+        for states in self.__getStateBlocks():
+            formatted = self.__formatValues(self.__getColumns(states).T, fileFormat)
+            labels = self.__stateEncoder.toStrings(states)
+            f.write("".join(rowStart.format(label) + valueSeparator.join(row)
+                            for label, row in zip(labels, formatted)))
+
+    # ==================== Public ========================================
+    def export(self, fileName: str, fileFormat: str = "text", stateMajor: bool = False) -> None:
+        """writes the whole table to the file
+
+        Args:
+            fileName (str): the file to write to
+            fileFormat (str, optional): "text" or "csv". Defaults to "text".
+            stateMajor (bool, optional): True for one row per state, False for one row per
+                                         action. Defaults to False.
+
+        Raises:
+            ValueError: the file format isn't one of FORMATS
+        """
+        if fileFormat not in self.FORMATS:
+            raise ValueError("QTableExporter", f"file format must be one of {self.FORMATS}, "+
+                                               f"not '{fileFormat}'")
+        with open(fileName, "w") as f:
+            if stateMajor:
+                self.__writeStateMajor(f, fileFormat)
+            else:
+                self.__writeActionMajor(f, fileFormat)
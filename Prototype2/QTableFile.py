@@ -0,0 +1,291 @@
+from Constants import *
+from StateEncoder import *
+
+import numpy as np
+import os
+import sys
+
+
+class QTableFile:
+    """The binary file format for saving QTables. The file starts with a fixed size header:
+    magic bytes, format version, STATE_SHAPE, ACTION_SHAPE, dtype, the number of training
+    iterations, the int16 scale and offset and the sequence number of the last journal
+    record the table includes. The raw (actions x states) array follows straight after in C
+    order, so the whole table can be written in one go and read back with np.memmap without
+    any parsing.
+    """
+    MAGIC = b"QTBL"
+    VERSION = 3 # version 1 files had no scale or offset and version 2 no journal sequence
+                # number, both are still read
+    HEADER_SIZE = 128 # bytes, the raw array always starts at this offset
+    HEADER_DTYPE = np.dtype([("magic", "S4"),
+                             ("version", "<u4"),
+                             ("stateShape", "<i4", (3, 3)),
+                             ("actionShape", "<i4", (3,)),
+                             ("dtype", "S8"),
+                             ("iterations", "<i8"),
+                             ("scale", "<f8"),
+                             ("offset", "<f8"),
+                             ("journalSequence", "<u8")])
+
+    # ==================== Private ========================================
+    @staticmethod
+    def __makeHeader(dtype: np.dtype, iterations: int, scale: float, offset: float,
+                     journalSequence: int) -> bytes:
+        """packs the header into bytes, padded with zeros up to HEADER_SIZE
+
+        Args:
+            dtype (np.dtype): the dtype of the table being saved
+            iterations (int): the number of training iterations the table has had
+            scale (float): the size of one int16 step
+            offset (float): the value an int16 of 0 stands for
+            journalSequence (int): the sequence number of the last journal record in the table
+
+        Returns:
+            bytes: the header
+        """
+        header = np.zeros(1, dtype=QTableFile.HEADER_DTYPE)
+        header["magic"] = QTableFile.MAGIC
+        header["version"] = QTableFile.VERSION
+        header["stateShape"] = STATE_SHAPE
+        header["actionShape"] = ACTION_SHAPE
+        header["dtype"] = np.dtype(dtype).str.encode()
+        header["iterations"] = iterations
+        header["scale"] = scale
+        header["offset"] = offset
+        header["journalSequence"] = journalSequence
+        return header.tobytes().ljust(QTableFile.HEADER_SIZE, b"\0")
+
+    @staticmethod
+    def __getTableShape() -> tuple:
+        """calculates the (rows, columns) shape of the QTable from the shape constants
+
+        Returns:
+            tuple: the number of actions and the number of states
+        """
+        numRows = len(range(ACTION_SHAPE[0], ACTION_SHAPE[1] + 1, ACTION_SHAPE[2]))
+        numCols = int(np.prod([len(range(STATE_SHAPE[0][x],
+                                          STATE_SHAPE[1][x] + 1,
+                                          STATE_SHAPE[2][x])) for x in range(3)]))
+        return numRows, numCols
+
+    # ==================== Public ========================================
+    @staticmethod
+    def load(fileName: str, mode: str = "r") -> tuple:
+        """memory maps the table in the file. Nothing is read from disk until it is used, so
+        this is fast no matter how big the table is. Use np.array() on the result to get a copy
+        in memory.
+
+        Args:
+            fileName (str): the file to load
+            mode (str, optional): the np.memmap mode, "r" (read only) or "r+" (read and write).
+                                  Defaults to "r".
+
+        Returns:
+            tuple: the memory mapped table (as stored) and the header dictionary
+        """
+        header = QTableFile.readHeader(fileName)
+        data = np.memmap(fileName, dtype=header["dtype"], mode=mode,
+                         offset=QTableFile.HEADER_SIZE, shape=QTableFile.__getTableShape())
+        return data, header
+
+    @staticmethod
+    def loadLegacyText(fileName: str) -> np.ndarray:
+        """reads a table in the old text format written by QTable.writeTableToFile: a header of
+        state strings, a dashed line, then one 'action | values' row per action. All the values
+        are parsed by numpy in one go rather than one float() at a time. Rows are placed by their
+        action label, so a table with fewer actions than ACTION_SHAPE can still be imported.
+
+        Args:
+            fileName (str): the text file to read
+
+        Raises:
+            ValueError: the header states don't match STATE_SHAPE
+            ValueError: a row's action isn't in ACTION_SHAPE
+            ValueError: a value isn't a number
+            ValueError: the number of values doesn't match the header and rows
+
+        Returns:
+            np.ndarray: the (actions x states) table for the current shape constants
+        """
+        with open(fileName, "r") as f:
+            lines = f.read().split("\n")
+        
+        stateEncoder = StateEncoder()
+        numRows, numCols = QTableFile.__getTableShape()
+        headerStates = [state.strip() for state in lines[0].split("|", 1)[1].split(",")]
+        expectedStates = [stateEncoder.toString(state) for state in range(numCols)]
+        if headerStates != expectedStates:
+            raise ValueError("QTableFile", f"the states in the header of '{fileName}' don't "+
+                                           f"match the state shape {STATE_SHAPE}")
+        
+        # the first two lines are the header and the dashed line
+        rows = [line.split("|", 1) for line in lines[2:] if line.strip() != EMPTY]
+        actionIndices = []
+        for action, _ in rows:
+            action = int(action)
+            if (action not in range(ACTION_SHAPE[0], ACTION_SHAPE[1] + 1, ACTION_SHAPE[2])):
+                raise ValueError("QTableFile", f"action '{action}' in '{fileName}' is not in "+
+                                               f"the action shape {ACTION_SHAPE}")
+            actionIndices.append((action - ACTION_SHAPE[0]) // ACTION_SHAPE[2])
+        
+        try:
+            values = np.array(" ".join(rowValues for _, rowValues in rows).split(),
+                              dtype="float32")
+        except ValueError:
+            raise ValueError("QTableFile", f"'{fileName}' has a value that isn't a number")
+        if len(values) != len(rows) * numCols:
+            raise ValueError("QTableFile", f"'{fileName}' has {len(values)} values but "+
+                                           f"{len(rows)} rows of {numCols} states were expected")
+        
+        data = np.zeros((numRows, numCols), dtype="float32")
+        data[actionIndices] = values.reshape((len(rows), numCols))
+        return data
+
+    @staticmethod
+    def convertLegacyText(textFileName: str, fileName: str, iterations: int = 0) -> None:
+        """imports a table in the old text format and saves it in the binary format, so that
+        QAgent can resume training from it.
+
+        Args:
+            textFileName (str): the old text file to read
+            fileName (str): the binary file to save to
+            iterations (int, optional): the number of training iterations to store, as the text
+                                        format doesn't record it. Defaults to 0.
+        """
+        QTableFile.save(fileName, QTableFile.loadLegacyText(textFileName), iterations)
+
+    @staticmethod
+    def readHeader(fileName: str) -> tuple:
+        """reads and validates the header of the file against the current shape constants
+
+        Args:
+            fileName (str): the file to read
+
+        Raises:
+            ValueError: the file isn't a QTable file
+            ValueError: the file was written by a different version of this format
+            ValueError: the file was saved with a different state or action shape
+
+        Returns:
+            dict: the format version, the dtype of the table, the number of training
+                  iterations, the int16 scale and offset and the journal sequence number
+        """
+        header = np.fromfile(fileName, dtype=QTableFile.HEADER_DTYPE, count=1)
+        if len(header) != 1 or header["magic"][0] != QTableFile.MAGIC:
+            raise ValueError("QTableFile", f"'{fileName}' is not a QTable file")
+        if header["version"][0] not in (1, 2, QTableFile.VERSION):
+            raise ValueError("QTableFile", f"'{fileName}' has format version "+
+                                           f"'{header['version'][0]}' but only version "+
+                                           f"'{QTableFile.VERSION}' can be read")
+        if not (np.array_equal(header["stateShape"][0], STATE_SHAPE) and
+                np.array_equal(header["actionShape"][0], ACTION_SHAPE)):
+            raise ValueError("QTableFile", f"'{fileName}' was saved with state shape "+
+                                           f"{header['stateShape'][0].tolist()} and action "+
+                                           f"shape {header['actionShape'][0].tolist()}, which "+
+                                           f"don't match the current {STATE_SHAPE} and "+
+                                           f"{ACTION_SHAPE}")
+        version = header["version"][0]
+        return {
+            "version": int(version),
+            "dtype": np.dtype(header["dtype"][0].decode()),
+            "iterations": int(header["iterations"][0]),
+            "scale": 1.0 if version == 1 else float(header["scale"][0]),
+            "offset": 0.0 if version == 1 else float(header["offset"][0]),
+            # older files were saved before the journal had sequence numbers
+            "journalSequence": 0 if version < 3 else int(header["journalSequence"][0])
+        }
+
+    @staticmethod
+    def save(fileName: str, data: np.ndarray, iterations: int,
+             scale: float = 1.0, offset: float = 0.0, journalSequence: int = 0) -> None:
+        """writes the header and the raw table to the file (see saveWith)
+
+        Args:
+            fileName (str): the file to save to
+            data (np.ndarray): the (actions x states) table, as it is stored
+            iterations (int): the number of training iterations the table has had
+            scale (float, optional): the size of one int16 step. Defaults to 1.0.
+            offset (float, optional): the value an int16 of 0 stands for. Defaults to 0.0.
+            journalSequence (int, optional): the sequence number of the last journal record in
+                                             the table. Defaults to 0.
+        """
+        def writeTable(out: np.ndarray) -> None:
+            out[:] = data
+        QTableFile.saveWith(fileName, writeTable, data.dtype, iterations, scale, offset,
+                            journalSequence)
+
+    @staticmethod
+    def saveWith(fileName: str, writeTable, dtype: np.dtype, iterations: int,
+                 scale: float = 1.0, offset: float = 0.0, journalSequence: int = 0) -> None:
+        """writes the header, then has writeTable fill in the raw table straight into the
+        memory mapped file, so the table never has to be built in memory first (e.g. from a
+        sparse storage). It is written to a temporary file first and then renamed, so a crash
+        while saving never leaves a half written table.
+
+        Args:
+            fileName (str): the file to save to
+            writeTable (function): writes the whole (actions x states) table, as it is stored,
+                                   into the memory mapped array it is passed
+            dtype (np.dtype): the dtype the table is stored as
+            iterations (int): the number of training iterations the table has had
+            scale (float, optional): the size of one int16 step. Defaults to 1.0.
+            offset (float, optional): the value an int16 of 0 stands for. Defaults to 0.0.
+            journalSequence (int, optional): the sequence number of the last journal record in
+                                             the table. Defaults to 0.
+        """
+        temporaryFileName = fileName + ".tmp"
+        shape = QTableFile.__getTableShape()
+        with open(temporaryFileName, "wb") as f:
+            f.write(QTableFile.__makeHeader(dtype, iterations, scale, offset, journalSequence))
+            f.truncate(QTableFile.HEADER_SIZE + int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        data = np.memmap(temporaryFileName, dtype=dtype, mode="r+",
+                         offset=QTableFile.HEADER_SIZE, shape=shape)
+        writeTable(data)
+        data.flush()
+        del data
+        os.replace(temporaryFileName, fileName)
+
+    @staticmethod
+    def writeProgress(fileName: str, iterations: int, journalSequence: int) -> None:
+        """overwrites just the number of training iterations and the journal sequence number in
+        the file's header, after the table in the file has been updated in place. The file must
+        already be the current version.
+
+        Args:
+            fileName (str): the file to update
+            iterations (int): the new number of training iterations
+            journalSequence (int): the sequence number of the last journal record in the table
+        """
+        with open(fileName, "r+b") as f:
+            f.seek(QTableFile.HEADER_DTYPE.fields["iterations"][1])
+            f.write(np.array(iterations, dtype="<i8").tobytes())
+            f.seek(QTableFile.HEADER_DTYPE.fields["journalSequence"][1])
+            f.write(np.array(journalSequence, dtype="<u8").tobytes())
+
+    @staticmethod
+    def toValues(data: np.ndarray, header: dict) -> np.ndarray:
+        """decodes a loaded table into QValues using the scale and offset in its header. Float
+        tables are returned as they are.
+
+        Args:
+            data (np.ndarray): the table as it was stored
+            header (dict): the header that was loaded with it
+
+        Returns:
+            np.ndarray: the QValues
+        """
+        if header["dtype"].kind == "i":
+            return data * header["scale"] + header["offset"]
+        return data
+
+
+if __name__ == '__main__':
+    # converting an old text table: python QTableFile.py QTable.txt [QTable.qtable] [iterations]
+    if len(sys.argv) < 2:
+        print("usage: python QTableFile.py textFile [binaryFile] [iterations]")
+    else:
+        binaryFileName = sys.argv[2] if len(sys.argv) > 2 else QTABLE_FILE_NAME
+        QTableFile.convertLegacyText(sys.argv[1], binaryFileName,
+                                     int(sys.argv[3]) if len(sys.argv) > 3 else 0)
+        print(f"Converted '{sys.argv[1]}' to '{binaryFileName}'")
@@ -0,0 +1,174 @@
+from Constants import *
+from QTableExporter import *
+
+import numpy as np
+
+
+class QTableSnapshot:
+    """An immutable copy of the QTable at one moment of training. The training thread publishes
+    a new snapshot by building it completely and then swapping a single reference, so any other
+    thread (the user interface, an export, policy evaluation) can read a snapshot without a lock
+    and will always see one consistent table, never one that is half way through an update.
+    The states are split into blocks of SNAPSHOT_BLOCK_STATES, and each block only holds the
+    columns of the states that have been trained on, in order of state. Every other state has
+    the default column (all 0s). A block that hasn't changed is shared with the snapshot before
+    (copy on write), so publishing only copies the blocks that were trained on, and a snapshot
+    of a sparse QTable stays as sparse as the QTable.
+    The arrays are read-only so that a reader can't change them by mistake.
+    """
+    def __init__(self, blocks: list, defaultColumn: tuple, numStates: int, actions: list,
+                 version: int, iterations: int) -> None:
+        """wraps the arrays the QTable publishes. Nothing is copied, so they must not change
+
+        Args:
+            blocks (list): a (states, values, bestActionIndices, maxValues) tuple of read-only
+                           arrays for each block of states in order: the sorted states in the
+                           block that have a column, their (actions x states) QValues, the row
+                           of their best action and their maximum QValue
+            defaultColumn (tuple): the (values, bestActionIndex, maxValue) of every state
+                                   without a column
+            numStates (int): the number of states in the table
+            actions (list): the action strings, in row order
+            version (int): counts up by 1 each time a snapshot is published
+            iterations (int): the number of training iterations the table had
+        """
+        self.__blocks = blocks
+        self.__defaultColumn = defaultColumn
+        self.__numStates = numStates
+        self.__actions = actions
+        self.__version = version
+        self.__iterations = iterations
+
+    # ==================== Private ========================================
+    def __findColumn(self, state: int) -> tuple:
+        """finds the state's block, then its column in the block with a binary search
+
+        Args:
+            state (int): the integer state (assumed to be valid)
+
+        Returns:
+            tuple: the state's block and the position of its column in the block, or INVALID if
+                   the state has the default column
+        """
+        block = self.__blocks[state // SNAPSHOT_BLOCK_STATES]
+        position = int(np.searchsorted(block[0], state))
+        if position == len(block[0]) or block[0][position] != state:
+            return INVALID
+        return block, position
+
+    # ==================== Public ========================================
+    def getActionWithMaxQValue(self, state: int) -> str:
+        """picks the best action for the state as the table was when the snapshot was taken
+
+        Args:
+            state (int): the integer state (assumed to be valid)
+
+        Returns:
+            str: the action string with the highest QValue for the state
+        """
+        column = self.__findColumn(state)
+        if column is INVALID:
+            return self.__actions[self.__defaultColumn[1]]
+        block, position = column
+        return self.__actions[block[2][position]]
+
+    def getAllQValues(self) -> np.ndarray:
+        """builds the whole (actions x states) table. For a sparse QTable this is far bigger
+        than the snapshot, so getColumns is better for reading part of it.
+
+        Returns:
+            np.ndarray: the table of QValues
+        """
+        return self.getColumns(np.arange(self.__numStates))
+
+    def getBlocks(self) -> list:
+        """getter for the blocks, so the next snapshot can share the ones that haven't changed
+
+        Returns:
+            list: a new list of the snapshot's blocks, which are shared rather than copied, to
+                  build the next snapshot from
+        """
+        return list(self.__blocks)
+
+    def getColumns(self, states: np.ndarray) -> np.ndarray:
+        """the batch version of getQValue, for every action of each state
+
+        Args:
+            states (np.ndarray): the integer states (assumed to be valid)
+
+        Returns:
+            np.ndarray: the (actions x len(states)) QValues of the states
+        """
+        states = np.asarray(states, dtype="int64")
+        columns = np.repeat(self.__defaultColumn[0][:, np.newaxis], len(states), axis=1)
+        blockNumbers = states // SNAPSHOT_BLOCK_STATES
+        # usually all the states are in one or two blocks, e.g. when exporting
+        for blockNumber in np.unique(blockNumbers).tolist():
+            blockStates, values, _, _ = self.__blocks[blockNumber]
+            if len(blockStates) == 0:
+                continue
+            inBlock = np.flatnonzero(blockNumbers == blockNumber)
+            positions = np.minimum(np.searchsorted(blockStates, states[inBlock]),
+                                   len(blockStates) - 1)
+            hasColumn = blockStates[positions] == states[inBlock]
+            columns[:, inBlock[hasColumn]] = values[:, positions[hasColumn]]
+        return columns
+
+    def getIterations(self) -> int:
+        """getter for the number of training iterations when the snapshot was published
+
+        Returns:
+            int: the number of training iterations the table had when the snapshot was taken
+        """
+        return self.__iterations
+
+    def getMaxQValue(self, state: int) -> float:
+        """gets the highest QValue of the state as the table was when the snapshot was taken
+
+        Args:
+            state (int): the integer state (assumed to be valid)
+
+        Returns:
+            float: the maximum QValue of the state
+        """
+        column = self.__findColumn(state)
+        if column is INVALID:
+            return float(self.__defaultColumn[2])
+        block, position = column
+        return float(block[3][position])
+
+    def getQValue(self, state: int, action: str) -> float:
+        """gets one QValue as the table was when the snapshot was taken
+
+        Args:
+            state (int): the integer state (assumed to be valid)
+            action (str): the action (guaranteed to be valid)
+
+        Returns:
+            float: the QValue
+        """
+        actionIndex = (int(action) - ACTION_SHAPE[0]) // ACTION_SHAPE[2]
+        column = self.__findColumn(state)
+        if column is INVALID:
+            return float(self.__defaultColumn[0][actionIndex])
+        block, position = column
+        return float(block[1][actionIndex, position])
+
+    def getVersion(self) -> int:
+        """getter for the version, so readers can tell whether they have the newest snapshot
+
+        Returns:
+            int: the version of the snapshot, higher versions were published later
+        """
+        return self.__version
+
+    def writeTableToFile(self, fileName: str = "QTable.txt", fileFormat: str = "text",
+                         stateMajor: bool = False) -> None:
+        """writes the snapshot to a human readable file, see QTable.writeTableToFile
+
+        Args:
+            fileName (str, optional): the file to write to. Defaults to "QTable.txt".
+            fileFormat (str, optional): "text" or "csv". Defaults to "text".
+            stateMajor (bool, optional): True for one row per state. Defaults to False.
+        """
+        QTableExporter(self.getColumns, self.__actions).export(fileName, fileFormat, stateMajor)
@@ -0,0 +1,63 @@
+from Constants import *
+from QAgent import *
+from simulation import SimulateTrack
+
+import sys
+
+
+def runQuantisationReport(iterations: int, unitTime: float = 0.2, seed: int = None) -> dict:
+    """trains a float64 reference agent on the simulated track and, in lock step, an agent for
+    every other dtype on exactly the same transitions. The reference agent decides every action,
+    so the only difference between the tables is how their values are stored.
+
+    Args:
+        iterations (int): the number of simulated training iterations
+        unitTime (float, optional): the simulation time step in seconds. Defaults to 0.2.
+        seed (int, optional): seeds the simulation and the reference agent, so the report can be
+                              reproduced. None for a different run every time. Defaults to None.
+
+    Returns:
+        dict: for each dtype, the max and mean absolute error against float64 and the size of
+              the table in bytes
+    """
+    randomStream = RandomStream(seed)
+    reference = QAgent(EMPTY, "float64", randomStream)
+    agents = {dtype: QAgent(EMPTY, dtype) for dtype in DenseQStorage.DTYPES
+              if dtype != "float64"}
+    sim = SimulateTrack(unitTime, randomStream)
+
+    for _ in range(iterations):
+        s1, speed1 = sim.getStateAndSpeed()
+        a1 = reference.decideAction(s1)
+        sim.doAction(a1)
+        s2, speed2 = sim.getStateAndSpeed()
+        reward = reference.getUpdatedReward((speed1+speed2)/2,
+                                            sim.getLapsCompleted(),
+                                            sim.getDeslotted())
+        reference.train(s1, s2, a1, reward)
+        for agent in agents.values():
+            agent.train(s1, s2, a1, reward)
+        if sim.getDeslotted():
+            sim.resetCar()
+
+    referenceValues = reference.getAllQValues()
+    results = {"float64": {"maxError": 0.0, "meanError": 0.0,
+                           "bytes": referenceValues.nbytes}}
+    for dtype, agent in agents.items():
+        errors = np.abs(agent.getAllQValues().astype("float64") - referenceValues)
+        results[dtype] = {"maxError": float(errors.max()),
+                          "meanError": float(errors.mean()),
+                          "bytes": referenceValues.size * np.dtype(dtype).itemsize}
+    return results
+
+
+if __name__ == '__main__':
+    # python QuantisationReport.py [iterations]
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    results = runQuantisationReport(iterations)
+    print(f"Quantisation error against float64 after {iterations} simulated iterations")
+    print(f"(int16 scale: {QTABLE_INT16_SCALE}, offset: {QTABLE_INT16_OFFSET})\n")
+    print(f"{'dtype':<10}{'max error':>14}{'mean error':>14}{'table bytes':>14}")
+    for dtype, result in results.items():
+        print(f"{dtype:<10}{result['maxError']:>14.4g}{result['meanError']:>14.4g}"+
+              f"{result['bytes']:>14}")
@@ -0,0 +1,101 @@
+from Constants import *
+
+import numpy as np
+
+
+class RandomStream:
+    """The source of every random number used in training and simulation, so that a whole run
+    can be reproduced from one seed, and separate runs (e.g. in parallel) can be given their
+    own independent streams. It wraps a numpy Generator.
+    Drawing one number at a time from a Generator is slow, so scalar draws are served from a
+    block of RANDOM_BLOCK_SIZE numbers that is drawn in one go and refilled when it runs out.
+    Arrays of numbers are drawn from the Generator directly.
+    """
+    def __init__(self, seed: int = None, blockSize: int = RANDOM_BLOCK_SIZE) -> None:
+        """creates the generator and draws the first block of numbers
+
+        Args:
+            seed (int, optional): the seed, the same seed always gives the same numbers. None
+                                  for a different stream every time (or a numpy Generator to
+                                  wrap). Defaults to None.
+            blockSize (int, optional): how many scalar draws are made at once. Defaults to
+                                       RANDOM_BLOCK_SIZE.
+        """
+        self.__generator = np.random.default_rng(seed)
+        self.__blockSize = blockSize
+        self.__refill()
+
+    # ==================== Private ========================================
+    def __refill(self) -> None:
+        """draws the next block of numbers for scalar draws. They're turned into python floats
+        and iterated over, which is much faster than indexing a numpy array one at a time.
+        """
+        self.__block = iter(self.__generator.random(self.__blockSize).tolist())
+
+    # ==================== Public ========================================
+    def getGenerator(self) -> np.random.Generator:
+        """getter for the numpy generator behind the stream
+
+        Returns:
+            np.random.Generator: the underlying generator, for any other distribution
+        """
+        return self.__generator
+
+    def random(self) -> float:
+        """gets the next number from the current block, drawing a new block when it runs out
+
+        Returns:
+            float: a random number in [0, 1)
+        """
+        try:
+            return next(self.__block)
+        except StopIteration:
+            self.__refill()
+            return next(self.__block)
+
+    def randomArray(self, size: int) -> np.ndarray:
+        """draws an array of numbers straight from the generator, skipping the block
+
+        Args:
+            size (int): how many numbers to draw
+
+        Returns:
+            np.ndarray: random numbers in [0, 1)
+        """
+        return self.__generator.random(size)
+
+    def randomInt(self, high: int) -> int:
+        """draws one random integer, e.g. the index of a random action
+
+        Args:
+            high (int): one more than the largest number that can be drawn
+
+        Returns:
+            int: a random integer in [0, high)
+        """
+        return int(self.random() * high)
+
+    def randomInts(self, high: int, size: int) -> np.ndarray:
+        """the batch version of randomInt
+
+        Args:
+            high (int): one more than the largest number that can be drawn
+            size (int): how many numbers to draw
+
+        Returns:
+            np.ndarray: random integers in [0, high)
+        """
+        return self.__generator.integers(0, high, size)
+
+    def spawn(self, numStreams: int) -> list:
+        """makes independent child streams, e.g. one for each parallel worker, that are still
+        reproducible from this stream's seed
+
+        Args:
+            numStreams (int): how many streams to make
+
+        Returns:
+            list: the new RandomStreams
+        """
+        return [RandomStream(generator, self.__blockSize)
+                for generator in self.__generator.spawn(numStreams)]
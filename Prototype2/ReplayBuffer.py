@@ -0,0 +1,192 @@
+from Constants import *
+from SumTree import *
+from RandomStream import *
+
+import numpy as np
+
+
+class ReplayBuffer:
+    """Remembers the most recent transitions the car has made, so the QAgent can learn from each
+    of them many times instead of once. Every field is its own preallocated numpy array (one
+    row per transition), so a whole batch of transitions can be sampled with one fancy index.
+    Once it is full, the oldest transition is overwritten (a ring buffer).
+    Transitions are sampled uniformly, see PrioritisedReplayBuffer for the alternative.
+    """
+    def __init__(self, capacity: int = REPLAY_BUFFER_CAPACITY,
+                 randomStream: RandomStream = None) -> None:
+        """preallocates every field for capacity transitions, so adding one never allocates
+
+        Args:
+            capacity (int, optional): the most transitions remembered at once. Defaults to
+                                      REPLAY_BUFFER_CAPACITY.
+            randomStream (RandomStream, optional): where samples are drawn from. None for a new
+                                                   unseeded stream. Defaults to None.
+
+        Raises:
+            ValueError: if the capacity isn't > 0
+        """
+        if not capacity > 0:
+            raise ValueError("ReplayBuffer", f"capacity must be > 0, not '{capacity}'")
+        self.__states = np.zeros(capacity, dtype="int64")
+        self.__actions = np.zeros(capacity, dtype="int64")
+        self.__rewards = np.zeros(capacity, dtype="float64")
+        self.__nextStates = np.zeros(capacity, dtype="int64")
+        self.__dones = np.zeros(capacity, dtype="bool")
+        self._capacity = capacity
+        self._random = RandomStream() if randomStream is None else randomStream
+        # where the next transition is written, wrapping round to 0 when the end is reached
+        self.__nextIndex = 0
+        self._size = 0
+
+    # ==================== Protected ========================================
+    def _getTransitions(self, indices: np.ndarray) -> tuple:
+        """gathers whole transitions from every field at once
+
+        Args:
+            indices (np.ndarray): the indices of the transitions in the buffer
+
+        Returns:
+            tuple: arrays of the states, actions, rewards, next states and done flags
+        """
+        return (self.__states[indices], self.__actions[indices], self.__rewards[indices],
+                self.__nextStates[indices], self.__dones[indices])
+
+    # ==================== Public ========================================
+    def add(self, state: int, action: int, reward: float, nextState: int, done: bool) -> int:
+        """remembers one transition, overwriting the oldest one if the buffer is full
+
+        Args:
+            state (int): the integer state the car started in
+            action (int): the integer action taken
+            reward (float): the reward the action led to
+            nextState (int): the integer state the car ended in
+            done (bool): True if the run ended with this transition (e.g. the car deslotted)
+
+        Returns:
+            int: the index the transition was stored at, for updatePriorities
+        """
+        i = self.__nextIndex
+        self.__states[i] = state
+        self.__actions[i] = action
+        self.__rewards[i] = reward
+        self.__nextStates[i] = nextState
+        self.__dones[i] = done
+        self.__nextIndex = (i + 1) % self._capacity
+        self._size = min(self._size + 1, self._capacity)
+        return i
+
+    def getSize(self) -> int:
+        """getter for how full the buffer is
+
+        Returns:
+            int: the number of transitions currently remembered
+        """
+        return self._size
+
+    def sample(self, batchSize: int) -> tuple:
+        """picks transitions uniformly at random (with replacement) from the buffer
+
+        Args:
+            batchSize (int): the number of transitions to pick
+
+        Returns:
+            tuple: arrays of the states, actions, rewards, next states, done flags, indices in
+                   the buffer and importance sampling weights (all 1, as sampling is uniform),
+                   or EMPTY if the buffer is empty
+        """
+        if self._size == 0:
+            return EMPTY
+        indices = self._random.randomInts(self._size, batchSize)
+        return self._getTransitions(indices) + (indices, np.ones(batchSize))
+
+    def setBeta(self, beta: float) -> None:
+        """only used by PrioritisedReplayBuffer, uniform sampling doesn't need correcting
+        """
+        pass
+
+    def updatePriorities(self, indices: np.ndarray, tdErrors: np.ndarray) -> None:
+        """only used by PrioritisedReplayBuffer, uniform sampling has no priorities
+        """
+        pass
+
+
+class PrioritisedReplayBuffer(ReplayBuffer):
+    """A replay buffer that picks transitions in proportion to how wrong the QTable was about
+    them (their TD error), so rare but important transitions like deslots are learned from far
+    more often than ones the QTable already predicts well. The priorities are kept in a sum
+    tree, so sampling and updating them is O(log n).
+    A transition's priority is (|TD error| + REPLAY_PRIORITY_EPSILON) ^ alpha, where alpha = 0
+    is uniform sampling and alpha = 1 is fully proportional. As this biases which transitions
+    are learned from, each update is scaled by an importance sampling weight of
+    (size * probability) ^ -beta (normalised so the largest is 1), where beta = 1 fully
+    corrects the bias.
+    """
+    def __init__(self, capacity: int = REPLAY_BUFFER_CAPACITY,
+                 alpha: float = REPLAY_PRIORITY_ALPHA,
+                 beta: float = REPLAY_PRIORITY_BETA,
+                 randomStream: RandomStream = None) -> None:
+        """sets up an empty buffer with a sum tree over the priorities of its transitions
+
+        Args:
+            capacity (int, optional): the most transitions remembered at once. Defaults to
+                                      REPLAY_BUFFER_CAPACITY.
+            alpha (float, optional): how strongly priorities affect sampling (0 -> 1). Defaults
+                                     to REPLAY_PRIORITY_ALPHA.
+            beta (float, optional): how much the sampling bias is corrected (0 -> 1). Defaults
+                                    to REPLAY_PRIORITY_BETA.
+            randomStream (RandomStream, optional): where samples are drawn from. None for a new
+                                                   unseeded stream. Defaults to None.
+        """
+        super().__init__(capacity, randomStream)
+        self.__sumTree = SumTree(capacity)
+        self.__alpha = alpha
+        self.__beta = beta
+        # new transitions get the largest priority so far until their TD error is known
+        self.__maxPriority = 1.0
+
+    # ==================== Public ========================================
+    def add(self, state: int, action: int, reward: float, nextState: int, done: bool) -> int:
+        """remembers one transition with the largest priority so far (see ReplayBuffer.add)"""
+        i = super().add(state, action, reward, nextState, done)
+        self.__sumTree.update(np.array([i]), np.array([self.__maxPriority]))
+        return i
+
+    def sample(self, batchSize: int) -> tuple:
+        """picks transitions in proportion to their priority. The total priority is split into
+        batchSize equal segments with one transition picked from each, which spreads the batch
+        out more evenly than picking them all independently.
+
+        Args:
+            batchSize (int): the number of transitions to pick
+
+        Returns:
+            tuple: arrays of the states, actions, rewards, next states, done flags, indices in
+                   the buffer and importance sampling weights, or EMPTY if the buffer is empty
+        """
+        if self._size == 0:
+            return EMPTY
+        total = self.__sumTree.getTotal()
+        segments = (np.arange(batchSize) + self._random.randomArray(batchSize)) * (total / batchSize)
+        indices = self.__sumTree.find(segments)
+        probabilities = self.__sumTree.getPriorities(indices) / total
+        weights = (self._size * probabilities) ** -self.__beta
+        return self._getTransitions(indices) + (indices, weights / weights.max())
+
+    def setBeta(self, beta: float) -> None:
+        """changes the bias correction, e.g. as it is annealed towards 1 over training
+
+        Args:
+            beta (float): how much the sampling bias is corrected from now on (0 -> 1)
+        """
+        self.__beta = beta
+
+    def updatePriorities(self, indices: np.ndarray, tdErrors: np.ndarray) -> None:
+        """sets the priorities of transitions from their latest TD errors
+
+        Args:
+            indices (np.ndarray): the indices of the transitions in the buffer
+            tdErrors (np.ndarray): the TD error of each transition
+        """
+        priorities = (np.abs(tdErrors) + REPLAY_PRIORITY_EPSILON) ** self.__alpha
+        self.__sumTree.update(indices, priorities)
+        self.__maxPriority = max(self.__maxPriority, float(priorities.max()))
@@ -0,0 +1,174 @@
+from Constants import *
+
+import numpy as np
+
+
+class StateEncoder:
+    def __init__(self) -> None:
+        """Calculates everything needed to map a state (severity, distance, speed) onto a single
+        integer. The integer is the state's column index in the QTable, so it can be used
+        directly without any further parsing. STATE_SHAPE is assumed to have been validated
+        already (the QTable validates it when it is constructed).
+        """
+        self.__lowerBounds = [STATE_SHAPE[0][x] for x in range(3)]
+        self.__upperBounds = [STATE_SHAPE[1][x] for x in range(3)]
+        self.__incrementors = [STATE_SHAPE[2][x] for x in range(3)]
+
+        # state iterations per catagory is needed for O(1) mapping between states and integers.
+        self.__stateIterationsPerCatagory = [len(range(STATE_SHAPE[0][x],
+                                                       STATE_SHAPE[1][x] + 1,
+                                                       STATE_SHAPE[2][x])) for x in range(3)]
+        # how far the integer moves for one step in each catagory (like place values)
+        self.__strides = [self.__stateIterationsPerCatagory[1] *
+                          self.__stateIterationsPerCatagory[2],
+                          self.__stateIterationsPerCatagory[2],
+                          1]
+        self.__numStates = int(np.prod(self.__stateIterationsPerCatagory))
+
+    # ==================== Public ========================================
+    def decode(self, state: int) -> tuple:
+        """maps the integer state back onto the values of each catagory. The values returned are
+        the lower edge of the step the state is in, as that is all the integer remembers.
+
+        Args:
+            state (int): the integer state (assumed to be valid)
+
+        Returns:
+            tuple: severity, distance (cm), speed (cm/s)
+        """
+        values = []
+        for i in range(3):
+            iterations = (state // self.__strides[i]) % self.__stateIterationsPerCatagory[i]
+            values.append(self.__lowerBounds[i] + iterations * self.__incrementors[i])
+        return tuple(values)
+
+    def decodeBatch(self, states: np.ndarray) -> tuple:
+        """the batch version of decode
+
+        Args:
+            states (np.ndarray): the integer states (assumed to be valid)
+
+        Returns:
+            tuple: arrays of the severities, distances (cm) and speeds (cm/s)
+        """
+        states = np.asarray(states, dtype="int64")
+        return tuple(self.__lowerBounds[i] + ((states // self.__strides[i]) %
+                                              self.__stateIterationsPerCatagory[i]) *
+                     self.__incrementors[i] for i in range(3))
+
+    def encode(self, severity: int, distance: int, speed: int) -> int:
+        """maps the values of each catagory onto the integer state in constant time complexity.
+        This is done once per measurement so that nothing after it has to format or parse states.
+
+        Args:
+            severity (int): the type of the next track location (TRACK_STRAIGHT or TRACK_TURN)
+            distance (int): the distance to the next track location (cm)
+            speed (int): the speed of the car (cm/s)
+
+        Returns:
+            int: the integer state, or INVALID if any value is outside of the state shape
+        """
+        if not (self.__lowerBounds[0] <= severity <= self.__upperBounds[0] and
+                self.__lowerBounds[1] <= distance <= self.__upperBounds[1] and
+                self.__lowerBounds[2] <= speed <= self.__upperBounds[2]):
+            return INVALID
+
+        state = ((severity - self.__lowerBounds[0]) // self.__incrementors[0]) * self.__strides[0]
+        state += ((distance - self.__lowerBounds[1]) // self.__incrementors[1]) * self.__strides[1]
+        state += (speed - self.__lowerBounds[2]) // self.__incrementors[2]
+        return int(state)
+
+    def encodeBatch(self, severities: np.ndarray, distances: np.ndarray,
+                    speeds: np.ndarray) -> np.ndarray:
+        """the batch version of encode
+
+        Args:
+            severities (np.ndarray): the types of the next track locations
+            distances (np.ndarray): the distances to the next track locations (cm)
+            speeds (np.ndarray): the speeds of the cars (cm/s)
+
+        Returns:
+            np.ndarray: the integer states, INVALID where any value is outside of the state shape
+        """
+        states = np.zeros(len(severities), dtype="int64")
+        valid = np.ones(len(severities), dtype="bool")
+        for i, values in enumerate((severities, distances, speeds)):
+            values = np.asarray(values, dtype="int64")
+            valid &= (self.__lowerBounds[i] <= values) & (values <= self.__upperBounds[i])
+            states += ((values - self.__lowerBounds[i]) // self.__incrementors[i]) * self.__strides[i]
+        states[~valid] = INVALID
+        return states
+
+    def fromString(self, stateString: str) -> int:
+        """maps the old 6 digit state string (0-00-000) onto the integer state. Only needed to
+        read states that were written to files in the old format.
+
+        Args:
+            stateString (str): the 6 digit state string
+
+        Returns:
+            int: the integer state, or INVALID if the string isn't a valid state
+        """
+        try:
+            return self.encode(int(stateString[0]), int(stateString[1:3]), int(stateString[-3:]))
+        except ValueError:
+            return INVALID
+
+    def getNumStates(self) -> int:
+        """getter for the number of different states, which is also the number of QTable columns
+
+        Returns:
+            int: the number of states
+        """
+        return self.__numStates
+
+    def toString(self, state: int) -> str:
+        """formats the integer state as the 6 digit state string (0-00-000). This should only be
+        used for logging and writing to files.
+
+        Args:
+            state (int): the integer state (assumed to be valid)
+
+        Returns:
+            str: the 6 digit state string
+        """
+        severity, distance, speed = self.decode(state)
+        return f"{severity}{distance:02d}{speed:03d}"
+
+    def toStrings(self, states: np.ndarray) -> np.ndarray:
+        """the batch version of toString, formatting a whole array of states with numpy
+
+        Args:
+            states (np.ndarray): the integer states (assumed to be valid)
+
+        Returns:
+            np.ndarray: the 6 digit state strings
+        """
+        severities, distances, speeds = self.decodeBatch(states)
+        return np.char.add(np.char.add(severities.astype(str),
+                                       np.char.zfill(distances.astype(str), 2)),
+                           np.char.zfill(speeds.astype(str), 3))
+
+    def validate(self, state: int) -> bool:
+        """validates that the integer state is one of the states in the state shape. States made
+        by encode() are always valid unless they are INVALID.
+
+        Args:
+            state (int): the integer state
+
+        Returns:
+            bool: True if the state is valid, False otherwise
+        """
+        return 0 <= state < self.__numStates
+
+    def validateBatch(self, states: np.ndarray) -> np.ndarray:
+        """the batch version of validate
+
+        Args:
+            states (np.ndarray): the integer states
+
+        Returns:
+            np.ndarray: True where the state is valid, False otherwise
+        """
+        states = np.asarray(states)
+        return (0 <= states) & (states < self.__numStates)
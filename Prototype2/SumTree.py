@@ -0,0 +1,77 @@
+import numpy as np
+
+
+class SumTree:
+    """A binary tree stored in a flat numpy array, where each leaf holds the priority of one
+    item and each parent holds the sum of its two children, so the root is the total priority.
+    Node i has children 2i and 2i + 1 and the root is node 1. This lets items be picked with a
+    probability proportional to their priority, and priorities be changed, in O(log n) time,
+    for a whole array of items at once.
+    """
+    def __init__(self, capacity: int) -> None:
+        """starts with every priority 0
+
+        Args:
+            capacity (int): the number of items (leaves)
+        """
+        # the leaves are rounded up to a power of 2 so that every leaf is at the same depth
+        self.__depth = max(1, int(np.ceil(np.log2(capacity))))
+        self.__numLeaves = 1 << self.__depth
+        self.__capacity = capacity
+        self.__tree = np.zeros(2 * self.__numLeaves, dtype="float64")
+
+    # ==================== Public ========================================
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """finds the item that each value lands on when the priorities are laid end to end, so
+        a value picked uniformly between 0 and getTotal() picks an item in proportion to its
+        priority. Each value walks from the root down to a leaf, all of them level by level.
+
+        Args:
+            values (np.ndarray): values between 0 and getTotal()
+
+        Returns:
+            np.ndarray: the index of the item each value landed on
+        """
+        values = np.array(values, dtype="float64")
+        nodes = np.ones(len(values), dtype="int64")
+        for _ in range(self.__depth):
+            leftChildren = 2 * nodes
+            leftSums = self.__tree[leftChildren]
+            goRight = values > leftSums
+            values -= np.where(goRight, leftSums, 0.0)
+            nodes = leftChildren + goRight
+        # rounding error can only ever push a value past the last item
+        return np.minimum(nodes - self.__numLeaves, self.__capacity - 1)
+
+    def getPriorities(self, indices: np.ndarray) -> np.ndarray:
+        """looks up the priorities of items straight from their leaves
+
+        Args:
+            indices (np.ndarray): the indices of the items
+
+        Returns:
+            np.ndarray: the priority of each item
+        """
+        return self.__tree[self.__numLeaves + np.asarray(indices)]
+
+    def getTotal(self) -> float:
+        """getter for the total priority, which is kept in the root
+
+        Returns:
+            float: the sum of every item's priority
+        """
+        return float(self.__tree[1])
+
+    def update(self, indices: np.ndarray, priorities: np.ndarray) -> None:
+        """sets the priorities of the items, then recalculates the sums above them a level at a
+        time, so each changed sum is only calculated once however many of its items changed
+
+        Args:
+            indices (np.ndarray): the indices of the items
+            priorities (np.ndarray): their new priorities (>= 0)
+        """
+        nodes = self.__numLeaves + np.asarray(indices, dtype="int64")
+        self.__tree[nodes] = priorities
+        for _ in range(self.__depth):
+            nodes = np.unique(nodes // 2)
+            self.__tree[nodes] = self.__tree[2 * nodes] + self.__tree[2 * nodes + 1]
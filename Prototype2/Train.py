@@ -0,0 +1,170 @@
+from Constants import *
+from QAgent import *
+from simulation import SimulateTracks
+
+import argparse
+
+
+def trainAgent(agent: QAgent, sims: SimulateTracks, maxIterations: int = None,
+               maxEpisodes: int = None, reportInterval: float = 5.0) -> dict:
+    """trains the agent on every simulated car at once until a budget runs out. The next
+    states of one step are the starting states of the next (a deslotted car is reset to a
+    speed of 0, which is the state it was already given), so the cars are only read once per
+    step. Progress is only printed every reportInterval seconds, so the terminal never slows
+    training down however fast it goes. The QTable is checkpointed as in Main (every
+    CHECKPOINT_INTERVAL seconds), and if the agent has a QTable file, every batch of updates
+    is journaled in between like any other training, so a crash loses nothing that was trained.
+
+    Args:
+        agent (QAgent): the agent to train
+        sims (SimulateTracks): the simulated cars to train on
+        maxIterations (int, optional): stop after this many training iterations (one per car
+                                       per step). None for no limit. Defaults to None.
+        maxEpisodes (int, optional): stop after this many runs have ended, where a run ends
+                                     when its car deslots. None for no limit. Defaults to None.
+        reportInterval (float, optional): seconds between progress reports. Defaults to 5.0.
+
+    Raises:
+        ValueError: if there is neither an iteration nor an episode budget
+
+    Returns:
+        dict: the iterations, episodes, seconds taken and iterations per second
+    """
+    if maxIterations is None and maxEpisodes is None:
+        raise ValueError("Train", "there must be an iteration or episode budget")
+    iterations = 0
+    episodes = 0
+    startTime = time()
+    # what has happened since the last report
+    lastReportTime = startTime
+    windowIterations = 0
+    windowReward = 0.0
+    windowDeslots = 0
+
+    s1, speeds1 = sims.getStatesAndSpeeds()
+    while ((maxIterations is None or iterations < maxIterations) and
+           (maxEpisodes is None or episodes < maxEpisodes)):
+        a1 = agent.decideActions(s1)
+        sims.doActions(a1)
+        s2, speeds2 = sims.getStatesAndSpeeds()
+        deslotted = sims.getDeslotted()
+        rewards = agent.getUpdatedRewards((speeds1+speeds2)/2, sims.getLapsCompleted(),
+                                          deslotted)
+        numTrained = int(agent.trainBatch(s1, s2, a1, rewards, deslotted).sum())
+        sims.resetCars(deslotted)
+        agent.checkpointIfDue()
+        s1, speeds1 = s2, speeds2
+
+        numDeslots = int(deslotted.sum())
+        iterations += numTrained
+        episodes += numDeslots
+        windowIterations += numTrained
+        windowReward += float(rewards.sum())
+        windowDeslots += numDeslots
+
+        now = time()
+        if now - lastReportTime >= reportInterval:
+            print(f"iterations: {agent.getNumTrainingIterations():>12}   "+
+                  f"episodes: {episodes:>9}   "+
+                  f"steps/s: {windowIterations / (now-lastReportTime):>10.0f}   "+
+                  f"reward: {windowReward / max(windowIterations, 1):>8.3f}   "+
+                  f"deslot rate: {windowDeslots / max(windowIterations, 1):.3f}   "+
+                  f"P(explore): {agent.getProbabilityToExplore():.3f}")
+            lastReportTime = now
+            windowIterations = 0
+            windowReward = 0.0
+            windowDeslots = 0
+
+    seconds = time() - startTime
+    return {"iterations": iterations, "episodes": episodes, "seconds": seconds,
+            "stepsPerSecond": iterations / seconds if seconds > 0 else 0.0}
+
+
+def evaluateAgent(agent: QAgent, sims: SimulateTracks, steps: int) -> dict:
+    """drives the simulated cars with the greedy policy (no exploring) without training, to
+    measure what has actually been learned
+
+    Args:
+        agent (QAgent): the agent to evaluate
+        sims (SimulateTracks): the simulated cars to drive
+        steps (int): how many actions each car takes
+
+    Returns:
+        dict: the mean reward per action, the deslot rate (deslots per action) and the laps
+              completed per car
+    """
+    totalReward = 0.0
+    deslots = 0
+    laps = 0
+    numActions = 0
+
+    s1, speeds1 = sims.getStatesAndSpeeds()
+    for _ in range(steps):
+        a1 = agent.decideActions(s1, greedy=True)
+        lapsBefore = sims.getLapsCompleted()
+        sims.doActions(a1)
+        s2, speeds2 = sims.getStatesAndSpeeds()
+        deslotted = sims.getDeslotted()
+        rewards = agent.getUpdatedRewards((speeds1+speeds2)/2, sims.getLapsCompleted(),
+                                          deslotted)
+        # a deslot resets the laps completed, so only count laps when there wasn't one
+        laps += int(np.where(deslotted, 0, sims.getLapsCompleted() - lapsBefore).sum())
+        deslots += int(deslotted.sum())
+        totalReward += float(rewards.sum())
+        numActions += len(a1)
+        sims.resetCars(deslotted)
+        s1, speeds1 = s2, speeds2
+
+    return {"reward": totalReward / numActions, "deslotRate": deslots / numActions,
+            "lapsPerCar": laps / (numActions / steps)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Trains the QAgent on the simulated track "+
+                                     "without the user interface, then evaluates it greedily")
+    parser.add_argument("--iterations", type=int, default=None,
+                        help="training iterations budget (one per car per step). Defaults to "+
+                             "MAX_EXPLORING_ITERATIONS if there is no episode budget")
+    parser.add_argument("--episodes", type=int, default=None,
+                        help="stop once this many runs have ended in a deslot")
+    parser.add_argument("--cars", type=int, default=1000, help="simulated cars trained at once")
+    parser.add_argument("--unit-time", type=float, default=0.2,
+                        help="simulation time step in seconds")
+    parser.add_argument("--report-interval", type=float, default=5.0,
+                        help="seconds between progress reports")
+    parser.add_argument("--qtable", default=QTABLE_FILE_NAME,
+                        help="QTable file to resume from, save to and journal every batch "+
+                             "of updates next to, '' to not save (or journal)")
+    parser.add_argument("--export", default=EMPTY,
+                        help="also write the trained QTable to this text file")
+    parser.add_argument("--eval-steps", type=int, default=1000,
+                        help="greedy evaluation actions per car, 0 to skip evaluation")
+    parser.add_argument("--eval-cars", type=int, default=100)
+    parser.add_argument("--exploration", default=EXPLORATION_SCHEDULE, choices=SCHEDULES,
+                        help="how P(explore) falls over training")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    if args.iterations is None and args.episodes is None:
+        args.iterations = MAX_EXPLORING_ITERATIONS
+
+    randomStream = RandomStream(args.seed)
+    agent = QAgent(args.qtable, randomStream=randomStream,
+                   explorationSchedule=args.exploration)
+    print(f"Training from iteration {agent.getNumTrainingIterations()} with {args.cars} cars")
+    result = trainAgent(agent, SimulateTracks(args.unit_time, args.cars, randomStream),
+                        args.iterations, args.episodes, args.report_interval)
+    agent.saveQTable()
+    agent.close()
+    agent.publishQTableSnapshot()
+    if args.export != EMPTY:
+        agent.exportQTable(args.export)
+    print(f"Trained {result['iterations']} iterations ({result['episodes']} episodes) in "+
+          f"{result['seconds']:.1f}s, {result['stepsPerSecond']:.0f} steps/s")
+
+    if args.eval_steps > 0:
+        evaluation = evaluateAgent(agent, SimulateTracks(args.unit_time, args.eval_cars,
+                                                         randomStream), args.eval_steps)
+        print(f"Greedy evaluation over {args.eval_steps} steps of {args.eval_cars} cars: "+
+              f"reward {evaluation['reward']:.3f}   "+
+              f"deslot rate {evaluation['deslotRate']:.3f}   "+
+              f"laps per car {evaluation['lapsPerCar']:.2f}")
@@ -1,27 +1,30 @@
-from random import random
 from Constants import *
+from StateEncoder import *
+from RandomStream import *
+
+import numpy as np
 
 
 class SimulateTrack:
-    def __init__(self, timeStep: float) -> None:
+    def __init__(self, timeStep: float, randomStream: RandomStream = None) -> None:
+        # every random number comes from here, so seeding it makes the simulation reproducible
+        self.__random = RandomStream() if randomStream is None else randomStream
         self.__lapsCompleted = 0
         self.resetCar()
         self.__distanceToCorner = 99            # cm
         
-        self.__corners = ["0", "1", "1", "0", "1", "1"]
+        self.__corners = [TRACK_STRAIGHT, TRACK_TURN, TRACK_TURN,
+                          TRACK_STRAIGHT, TRACK_TURN, TRACK_TURN]
         self.__currentCorner = 0
         
         self.__timeStep = timeStep              # seconds
+        self.__stateEncoder = StateEncoder()
         
         
     def getStateAndSpeed(self) -> tuple:
-        state = ""
-        state += self.__corners[self.__currentCorner]
-        state += "{:02d}".format(int(self.__distanceToCorner))
-        if self.__deslotted:
-            state += "000"
-        else:
-            state += "{:03d}".format(int(self.__speed))
+        state = self.__stateEncoder.encode(self.__corners[self.__currentCorner],
+                                           int(self.__distanceToCorner),
+                                           0 if self.__deslotted else int(self.__speed))
         return state, (self.__speed if not self.__deslotted else 0)
     
     def getDeslotted(self) -> bool:
@@ -39,11 +42,10 @@ class SimulateTrack:
     def __normalise(value: int, low: int = SERVO_RANGE[0], high: int = SERVO_RANGE[1]) -> float:
         return ((value-low)/(high-low))
     
-    @ staticmethod
-    def __getSpeedFromAngle(angle: str) -> float:
+    def __getSpeedFromAngle(self, angle: str) -> float:
         # linear relationship between angle and speed: highest angle -> highest speed (999)
-        # add a bit of randomness as well
-        return (SimulateTrack.__normalise(int(angle)) * 990) + ((random()*2 -1)*10)
+        # add a bit of randomness as well, but the car can't go backwards
+        return max(0, (self.__normalise(int(angle)) * 990) + ((self.__random.random()*2 -1)*10))
     
     def __updateSpeed(self, action: str) -> None:
         self.__prevSpeed = self.__speed
@@ -70,35 +72,35 @@ class SimulateTrack:
     def __decideIfDeslotted(self) -> None:
         # Deciding if the car has deslotted
         # can can only deslot on turns, as it wont delsot on straight lines
-        if self.__corners[self.__currentCorner] == "1":
+        if self.__corners[self.__currentCorner] == TRACK_TURN:
             if self.__speed > 800:
                 # with high momentum and speed, very high chance to delot
-                if self.__prevSpeed > 800 and random() < 0.9:
+                if self.__prevSpeed > 800 and self.__random.random() < 0.9:
                     self.__deslotted = True
-                elif self.__prevSpeed < 400 and random() < 0.4:
+                elif self.__prevSpeed < 400 and self.__random.random() < 0.4:
                     self.__deslotted = True
-                elif random() < 0.65:
+                elif self.__random.random() < 0.65:
                     self.__deslotted = True
                 
             
             elif self.__speed > 650:
-                if self.__prevSpeed > 800 and random() < 0.6:
+                if self.__prevSpeed > 800 and self.__random.random() < 0.6:
                     self.__deslotted = True
-                elif self.__prevSpeed < 400 and random() < 0.1:
+                elif self.__prevSpeed < 400 and self.__random.random() < 0.1:
                     self.__deslotted = True
-                elif random() < 0.2:
+                elif self.__random.random() < 0.2:
                     self.__deslotted = True
                     
             elif self.__speed > 400:
-                if self.__prevSpeed > 80 and random() < 0.2:
+                if self.__prevSpeed > 80 and self.__random.random() < 0.2:
                     self.__deslotted = True
             
             # speeds below 400 are very likely to get stuck, which I call a deslot
-            elif self.__prevSpeed > 800 and random() < 0.2:
+            elif self.__prevSpeed > 800 and self.__random.random() < 0.2:
                 self.__deslotted = True
-            elif self.__prevSpeed > 400 and random() < 0.5:
+            elif self.__prevSpeed > 400 and self.__random.random() < 0.5:
                 self.__deslotted = True
-            elif random() < 0.9:
+            elif self.__random.random() < 0.9:
                 self.__deslotted = True
         
         if self.__deslotted:
@@ -117,3 +119,98 @@ class SimulateTrack:
                 
             
                 
+
+
+class SimulateTracks:
+    """The same simulation as SimulateTrack, but for many independent cars at once. Every car's
+    values are kept in numpy arrays and each method steps all the cars together, so simulating
+    N cars costs about the same as simulating one. The random() branches that decide a deslot
+    are replaced by the overall probability of each branch, which gives the same outcomes.
+    """
+    def __init__(self, timeStep: float, numCars: int, randomStream: RandomStream = None) -> None:
+        self.__random = RandomStream() if randomStream is None else randomStream
+        self.__numCars = numCars
+        self.__lapsCompleted = np.zeros(numCars, dtype="int64")
+        self.__deslotted = np.zeros(numCars, dtype="bool")
+        self.__prevSpeed = np.zeros(numCars)            # cm / s
+        self.__speed = np.zeros(numCars)                # mm / s
+        self.__distanceToCorner = np.full(numCars, 99.0)    # cm
+
+        self.__corners = np.array([TRACK_STRAIGHT, TRACK_TURN, TRACK_TURN,
+                                   TRACK_STRAIGHT, TRACK_TURN, TRACK_TURN])
+        self.__currentCorner = np.zeros(numCars, dtype="int64")
+
+        self.__timeStep = timeStep                      # seconds
+        self.__stateEncoder = StateEncoder()
+
+    def getStatesAndSpeeds(self) -> tuple:
+        speeds = np.where(self.__deslotted, 0.0, self.__speed)
+        states = self.__stateEncoder.encodeBatch(self.__corners[self.__currentCorner],
+                                                 self.__distanceToCorner.astype("int64"),
+                                                 speeds.astype("int64"))
+        return states, speeds
+
+    def getDeslotted(self) -> np.ndarray:
+        return self.__deslotted.copy()
+
+    def getLapsCompleted(self) -> np.ndarray:
+        return self.__lapsCompleted.copy()
+
+    def resetCars(self, cars: np.ndarray) -> None:
+        # cars is a boolean mask of the cars to reset
+        self.__deslotted[cars] = False
+        self.__prevSpeed[cars] = 0
+        self.__speed[cars] = 0
+
+    def __updateSpeeds(self, actions: np.ndarray) -> None:
+        self.__prevSpeed = self.__speed
+        # the same linear relationship as SimulateTrack.__getSpeedFromAngle
+        normalised = (actions - SERVO_RANGE[0]) / (SERVO_RANGE[1] - SERVO_RANGE[0])
+        noise = (self.__random.randomArray(self.__numCars)*2 - 1) * 10
+        self.__speed = np.maximum(0, normalised*990 + noise)
+
+    def __updateDistancesAndCorners(self) -> None:
+        self.__distanceToCorner -= (self.__speed/10) * self.__timeStep
+
+        passedCorner = self.__distanceToCorner <= 0
+        self.__distanceToCorner[passedCorner] = 99
+        completedLap = passedCorner & (self.__currentCorner == len(self.__corners)-1)
+        self.__lapsCompleted[completedLap] += 1
+        self.__currentCorner[passedCorner] += 1
+        self.__currentCorner[completedLap] = 0
+
+    def __decideIfDeslotted(self) -> None:
+        # the overall probability of each branch of SimulateTrack.__decideIfDeslotted, checked
+        # in the same order: a branch that fails its random() falls through to the next one
+        speed, prevSpeed = self.__speed, self.__prevSpeed
+        probabilities = np.select([(speed > 800) & (prevSpeed > 800),
+                                   (speed > 800) & (prevSpeed < 400),
+                                   speed > 800,
+                                   (speed > 650) & (prevSpeed > 800),
+                                   (speed > 650) & (prevSpeed < 400),
+                                   speed > 650,
+                                   (speed > 400) & (prevSpeed > 80),
+                                   speed > 400,
+                                   prevSpeed > 800,
+                                   prevSpeed > 400],
+                                  [0.9 + 0.1*0.65,
+                                   0.4 + 0.6*0.65,
+                                   0.65,
+                                   0.6 + 0.4*0.2,
+                                   0.1 + 0.9*0.2,
+                                   0.2,
+                                   0.2,
+                                   0.0,
+                                   0.2 + 0.8*(0.5 + 0.5*0.9),
+                                   0.5 + 0.5*0.9],
+                                  0.9)
+
+        # cars can only deslot on turns, as they won't deslot on straight lines
+        onTurn = self.__corners[self.__currentCorner] == TRACK_TURN
+        self.__deslotted |= onTurn & (self.__random.randomArray(self.__numCars) < probabilities)
+        self.__lapsCompleted[self.__deslotted] = 0
+
+    def doActions(self, actions: np.ndarray) -> None:
+        self.__updateSpeeds(np.asarray(actions))
+        self.__updateDistancesAndCorners()
+        self.__decideIfDeslotted()
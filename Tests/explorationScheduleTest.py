@@ -0,0 +1,67 @@
+"""checks the precomputed exploration schedules: the cosine schedule matches the np.cos
+calculation the QAgent used to make every iteration, every schedule falls from 1 to 0 and a
+single lookup gives the same P(explore) as an array lookup. Run from the repository folder
+with:
+    python -m unittest discover -s Tests -p "*Test.py"
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Prototype2"))
+from ExplorationSchedule import *
+
+
+class ExplorationScheduleTest(unittest.TestCase):
+    MAX_ITERATIONS = 100003 # doesn't divide evenly into the table's points
+
+    def setUp(self):
+        # the start, the end and random iterations in between
+        random = np.random.default_rng(0)
+        self.iterations = np.concatenate([np.arange(0, 50),
+                                          random.integers(0, self.MAX_ITERATIONS, 2000),
+                                          np.arange(self.MAX_ITERATIONS - 50,
+                                                    self.MAX_ITERATIONS + 50)])
+
+    def makeSchedules(self) -> list:
+        return [makeExplorationSchedule(name, self.MAX_ITERATIONS) for name in SCHEDULES]
+
+    def testCosineMatchesTheOldCalculation(self):
+        schedule = CosineSchedule(self.MAX_ITERATIONS)
+        exploring = self.iterations[self.iterations <= self.MAX_ITERATIONS]
+        old = 0.5 * np.cos((np.pi / self.MAX_ITERATIONS) * exploring) + 0.5
+        np.testing.assert_allclose(schedule.getProbabilities(exploring), old, atol=1e-6)
+
+    def testFallsFromOneToZero(self):
+        for schedule in self.makeSchedules():
+            self.assertEqual(schedule.getProbability(0), 1.0)
+            self.assertEqual(schedule.getProbability(self.MAX_ITERATIONS), 0.0)
+            self.assertEqual(schedule.getProbability(10 * self.MAX_ITERATIONS), 0.0)
+            probabilities = schedule.getProbabilities(np.arange(0, self.MAX_ITERATIONS + 100,
+                                                                7))
+            self.assertTrue(np.all(np.diff(probabilities) <= 0), type(schedule).__name__)
+            self.assertTrue(np.all((probabilities >= 0) & (probabilities <= 1)))
+
+    def testOneLookupMatchesTheArrayLookup(self):
+        for schedule in self.makeSchedules():
+            single = [schedule.getProbability(int(i)) for i in self.iterations]
+            np.testing.assert_allclose(single, schedule.getProbabilities(self.iterations),
+                                       rtol=0, atol=1e-12, err_msg=type(schedule).__name__)
+
+    def testPiecewisePassesThroughItsPoints(self):
+        schedule = PiecewiseSchedule(1000, 1000, [[0, 1], [0.25, 0.4], [1, 0]])
+        self.assertAlmostEqual(schedule.getProbability(250), 0.4)
+        self.assertAlmostEqual(schedule.getProbability(125), 0.7)
+        self.assertAlmostEqual(schedule.getProbability(625), 0.2)
+
+    def testRefusesBadSettings(self):
+        self.assertRaises(TypeError, ExplorationSchedule)
+        self.assertRaises(ValueError, CosineSchedule, 0)
+        self.assertRaises(ValueError, makeExplorationSchedule, "sine")
+        self.assertRaises(ValueError, PiecewiseSchedule, 10, 10, [[0, 1], [0.5, 0.5], [0.5, 0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""checks the FrameGrabber with a fake camera that only takes a frame when the test says so:
+frames are handed out oldest first without gaps, the oldest are overwritten once the ring is
+full, frames that fail to decode are dropped and reading stops when the camera does. Run from
+the repository folder with:
+    python -m unittest discover -s Tests -p "*Test.py"
+"""
+import os
+import sys
+import unittest
+from threading import Condition, Semaphore
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Prototype2"))
+from FrameGrabber import *
+
+
+class FakeCamera:
+    """stands in for a cv.VideoCapture. Every pixel of frame n is n, and each grab() waits
+    until the test releases a frame."""
+    def __init__(self, shape: tuple = (4, 6, 3)) -> None:
+        self.shape = shape
+        self.failingFrames = set()
+        self.numFrames = 0
+        self.isOpen = True
+        self.__grabs = Semaphore(0)
+        self.__retrieved = Condition()
+        self.__numRetrieved = 0
+
+    def grab(self) -> bool:
+        self.__grabs.acquire()
+        return self.isOpen
+
+    def retrieve(self, image: np.ndarray = None) -> tuple:
+        number = self.numFrames
+        self.numFrames += 1
+        success = number not in self.failingFrames
+        if success:
+            if image is None or image.shape != self.shape:
+                image = np.empty(self.shape, dtype="uint8")
+            image[...] = number
+        with self.__retrieved:
+            self.__numRetrieved += 1
+            self.__retrieved.notify_all()
+        return success, (image if success else None)
+
+    def release(self) -> None:
+        """lets one more frame be taken and waits until it has been decoded"""
+        with self.__retrieved:
+            target = self.__numRetrieved + 1
+            self.__grabs.release()
+            self.__retrieved.wait_for(lambda: self.__numRetrieved >= target, 1.0)
+
+    def close(self) -> None:
+        """makes the next grab() fail, like a disconnected camera"""
+        self.isOpen = False
+        self.__grabs.release()
+
+
+class FrameGrabberTest(unittest.TestCase):
+    RING_SIZE = 4
+
+    def setUp(self):
+        self.camera = FakeCamera()
+        self.grabber = FrameGrabber(self.camera, self.RING_SIZE)
+        self.grabber.startReading()
+        self.latestTime = 0.0
+
+    def tearDown(self):
+        self.camera.close()
+        self.grabber.stopReading()
+
+    def takeFrames(self, numFrames: int) -> None:
+        """takes frames one at a time, waiting for each to be handed out before the next"""
+        for _ in range(numFrames):
+            self.camera.release()
+            if self.camera.numFrames - 1 not in self.camera.failingFrames:
+                _, self.latestTime = self.grabber.getLatestFrame(self.latestTime)
+
+    def getFramesInOrder(self) -> list:
+        """goes through every frame still in the ring with getFrameAfter
+
+        Returns:
+            list: the number of each frame, in the order they were handed out
+        """
+        numbers, after = [], 0.0
+        while after < self.latestTime:
+            frame, after = self.grabber.getFrameAfter(after)
+            numbers.append(int(frame[0, 0, 0]))
+        return numbers
+
+    def testFramesAreHandedOutInOrder(self):
+        self.takeFrames(3)
+        self.assertEqual(self.getFramesInOrder(), [0, 1, 2])
+        frame, timeOfFrame = self.grabber.getLatestFrame()
+        self.assertEqual((frame[0, 0, 0], timeOfFrame), (2, self.latestTime))
+        self.assertEqual(self.grabber.getFrameAfter(self.latestTime, 0.05), INVALID)
+
+    def testTheOldestFramesAreOverwritten(self):
+        self.takeFrames(2 * self.RING_SIZE - 1)
+        self.assertEqual(self.getFramesInOrder(), list(range(self.RING_SIZE - 1,
+                                                             2 * self.RING_SIZE - 1)))
+
+    def testFramesThatFailToDecodeAreDropped(self):
+        self.camera.failingFrames = {0, 2, 3}
+        self.takeFrames(7)
+        # the slot of a dropped frame is filled by the next one, so the ring never has a gap
+        self.assertEqual(self.getFramesInOrder(), [1, 4, 5, 6])
+
+    def testANewFrameSizeStartsANewRing(self):
+        self.takeFrames(3)
+        oldFrame = self.grabber.getLatestFrame()[0]
+        self.camera.shape = (8, 2, 3)
+        self.takeFrames(2)
+        self.assertEqual(self.getFramesInOrder(), [3, 4])
+        self.assertEqual(self.grabber.getLatestFrame()[0].shape, (8, 2, 3))
+        # frames handed out before keep the old ring alive
+        self.assertEqual(oldFrame[0, 0, 0], 2)
+
+    def testReadingStopsWithTheCamera(self):
+        self.takeFrames(1)
+        self.camera.close()
+        self.assertEqual(self.grabber.getLatestFrame(self.latestTime, 1.0), INVALID)
+        self.assertFalse(self.grabber.isReading())
+        # the frames already grabbed can still be had
+        self.assertEqual(self.grabber.getLatestFrame()[0][0, 0, 0], 0)
+
+    def testRefusesARingOfOne(self):
+        self.assertRaises(ValueError, FrameGrabber, self.camera, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
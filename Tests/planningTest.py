@@ -0,0 +1,66 @@
+"""checks Dyna-Q planning: it stops after DYNA_MAX_UPDATES_PER_PAIR made up transitions per
+pair in the model, it converges when every made up transition is the same, and what it learns
+is journaled so a crash doesn't lose it. Run from the repository folder with:
+    python -m unittest discover -s Tests -p "*Test.py"
+"""
+import os
+import sys
+import tempfile
+import unittest
+from time import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Prototype2"))
+from QAgent import *
+
+
+@unittest.skipUnless(DYNA_PLANNING, "planning is turned off")
+class PlanningTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.directory.name, "test.qtable")
+        self.agents = []
+
+    def tearDown(self):
+        for agent in self.agents:
+            agent.close()
+        self.directory.cleanup()
+
+    def makeAgent(self, fileName: str = EMPTY) -> QAgent:
+        agent = QAgent(fileName, randomStream=RandomStream(0))
+        self.agents.append(agent)
+        return agent
+
+    def testPlanningIsCappedAndConverges(self):
+        agent = self.makeAgent()
+        reward = -4.0
+        agent.train(5, 6, "40", reward, True)
+        # the model holds 1 pair, so planning stops well before the deadline
+        self.assertEqual(agent.planUntil(time() + 5), DYNA_MAX_UPDATES_PER_PAIR)
+        for _ in range(200):
+            agent.planUntil(time() + 5)
+            qValue = agent.getAllQValues().min()
+            self.assertTrue(np.isfinite(qValue))
+            self.assertGreaterEqual(qValue, reward - 1e-4)
+        self.assertAlmostEqual(qValue, reward, places=3)
+
+    def testPlanningIsRecoveredAfterACrash(self):
+        agent = self.makeAgent(self.fileName)
+        random = np.random.default_rng(0)
+        numStates = StateEncoder().getNumStates()
+        for iteration in range(300):
+            currentState, nextState = random.integers(0, numStates, 2).tolist()
+            action = str(int(ACTION_SHAPE[0] + ACTION_SHAPE[2] * random.integers(0, 31)))
+            agent.train(currentState, nextState, action, float(random.normal()),
+                        bool(random.random() < 0.1))
+            agent.planUntil(time() + 5)
+            if iteration == 150:
+                agent.checkpointQTable()
+        agent.flushJournal()
+        recovered = self.makeAgent(self.fileName)
+        np.testing.assert_array_equal(recovered.getAllQValues(), agent.getAllQValues())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""checks that the journal keeps every record however its buffer fills up, and that a QAgent
+with a QTable file gets back exactly the QTable it had when it is made again after a crash,
+from the last save or checkpoint plus the journal. Run from the repository folder with:
+    python -m unittest discover -s Tests -p "*Test.py"
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Prototype2"))
+from QAgent import *
+
+
+class QJournalBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.directory.name, "test.journal")
+        self.journal = QJournal(self.fileName)
+
+    def tearDown(self):
+        self.journal.close()
+        self.directory.cleanup()
+
+    def recordBatch(self, numRecords: int) -> None:
+        self.journal.recordBatch(np.arange(numRecords), np.zeros(numRecords),
+                                 np.full(numRecords, 1.5))
+
+    def assertSequences(self, numRecords: int) -> None:
+        """checks the file holds numRecords records, numbered from 1 without gaps"""
+        self.journal.flush()
+        records = QJournal.read(self.fileName)
+        np.testing.assert_array_equal(records["sequence"], np.arange(1, numRecords + 1))
+        self.assertEqual(self.journal.getSequence(), numRecords)
+
+    def testRecordAfterBatchFillsTheBuffer(self):
+        self.recordBatch(JOURNAL_BUFFER_RECORDS)
+        self.journal.record(1, 2, 3.0)
+        self.assertSequences(JOURNAL_BUFFER_RECORDS + 1)
+
+    def testRecordAfterBatchFillsTheRestOfTheBuffer(self):
+        self.journal.record(1, 2, 3.0)
+        self.recordBatch(JOURNAL_BUFFER_RECORDS - 1)
+        self.journal.record(1, 2, 3.0)
+        self.assertSequences(JOURNAL_BUFFER_RECORDS + 1)
+
+    def testBatchBiggerThanTheBuffer(self):
+        self.journal.record(1, 2, 3.0)
+        self.recordBatch(3 * JOURNAL_BUFFER_RECORDS)
+        self.journal.record(1, 2, 3.0)
+        self.assertSequences(3 * JOURNAL_BUFFER_RECORDS + 2)
+
+
+class QJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.directory.name, "test.qtable")
+        self.random = np.random.default_rng(0)
+        self.agents = []
+
+    def tearDown(self):
+        for agent in self.agents:
+            agent.close()
+        self.directory.cleanup()
+
+    def makeAgent(self) -> QAgent:
+        agent = QAgent(self.fileName, randomStream=RandomStream(0))
+        self.agents.append(agent)
+        return agent
+
+    def train(self, agent: QAgent, numIterations: int) -> None:
+        """trains the agent on random transitions between valid states"""
+        numStates = StateEncoder().getNumStates()
+        actions = np.arange(ACTION_SHAPE[0], ACTION_SHAPE[1] + 1, ACTION_SHAPE[2])
+        for _ in range(numIterations):
+            currentState, nextState = self.random.integers(0, numStates, 2).tolist()
+            action = str(int(self.random.choice(actions)))
+            done = bool(self.random.random() < 0.1)
+            self.assertTrue(agent.train(currentState, nextState, action,
+                                        float(self.random.normal()), done))
+
+    def assertRecovers(self, agent: QAgent) -> QAgent:
+        """'crashes' the agent (its journal is flushed but the QTable isn't saved) and checks the
+        agent made from its files again has the same QTable and training iterations
+
+        Returns:
+            QAgent: the recovered agent
+        """
+        agent.flushJournal()
+        recovered = self.makeAgent()
+        np.testing.assert_array_equal(recovered.getAllQValues(), agent.getAllQValues())
+        self.assertEqual(recovered.getNumTrainingIterations(), agent.getNumTrainingIterations())
+        return recovered
+
+    def testSaveRoundTrip(self):
+        agent = self.makeAgent()
+        self.train(agent, 200)
+        agent.saveQTable()
+        self.assertRecovers(agent)
+
+    def testRecoversTrainingAfterCheckpoint(self):
+        agent = self.makeAgent()
+        self.train(agent, 200)
+        agent.checkpointQTable()
+        self.train(agent, 100)
+        self.assertRecovers(agent)
+
+    def testRecoversReplayAfterCheckpoint(self):
+        # replay updates share the iteration of the checkpoint, so only their sequence numbers
+        # show they were made after it
+        agent = self.makeAgent()
+        self.train(agent, 200)
+        agent.checkpointQTable()
+        for _ in range(10):
+            self.assertEqual(agent.replay(), REPLAY_BATCH_SIZE)
+        self.assertRecovers(agent)
+
+    def testTrainingWithReplayEveryStep(self):
+        # like Main's training loop, which mixes single records with batches of replay
+        agent = self.makeAgent()
+        for _ in range(300):
+            self.train(agent, 1)
+            agent.replay()
+        self.assertRecovers(agent)
+
+    def testRecoversTwice(self):
+        # the records of the second session carry on numbering after the first's
+        agent = self.makeAgent()
+        self.train(agent, 200)
+        agent.checkpointQTable()
+        self.train(agent, 50)
+        recovered = self.assertRecovers(agent)
+        self.train(recovered, 50)
+        recovered.replay()
+        self.assertRecovers(recovered)
+
+    def testIgnoresPartlyWrittenRecord(self):
+        agent = self.makeAgent()
+        self.train(agent, 200)
+        agent.flushJournal()
+        with open(self.fileName + ".journal", "ab") as f:
+            f.write(b"\x01" * (QJournal.RECORD_DTYPE.itemsize // 2))
+        recovered = self.assertRecovers(agent)
+        # records appended after the cut off one must still be read back
+        self.train(recovered, 50)
+        self.assertRecovers(recovered)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+"""checks the QTable storages: the cached best action and max QValue of every state must always
+match searching its column, the sparse storage must hold exactly the same table as the dense
+one, and both must load and save it without making a dense copy. Run from the repository
+folder with:
+    python -m unittest discover -s Tests -p "*Test.py"
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Prototype2"))
+from QStorage import *
+
+
+class QStorageTest(unittest.TestCase):
+    NUM_ACTIONS = 7
+    NUM_STATES = 3 * FILE_BLOCK_STATES + 11
+
+    def setUp(self):
+        self.random = np.random.default_rng(0)
+
+    def makeStorages(self, dtype: str = "float32", scale: float = 1.0,
+                     offset: float = 0.0) -> tuple:
+        return (DenseQStorage(self.NUM_ACTIONS, self.NUM_STATES, dtype, scale, offset),
+                SparseQStorage(self.NUM_ACTIONS, self.NUM_STATES, dtype, scale, offset))
+
+    def randomWrites(self, numWrites: int) -> tuple:
+        """some states near the ends of blocks, the rest anywhere"""
+        states = np.concatenate([[0, FILE_BLOCK_STATES - 1, FILE_BLOCK_STATES,
+                                  self.NUM_STATES - 1],
+                                 self.random.integers(0, self.NUM_STATES, numWrites - 4)])
+        actionIndices = self.random.integers(0, self.NUM_ACTIONS, numWrites)
+        values = self.random.normal(0, 10, numWrites)
+        return actionIndices, states, values
+
+    def assertSameTable(self, storage, reference) -> None:
+        allStates = np.arange(self.NUM_STATES)
+        np.testing.assert_array_equal(storage.toArray(), reference.toArray())
+        np.testing.assert_array_equal(storage.getBestActionIndices(allStates),
+                                      reference.getBestActionIndices(allStates))
+        np.testing.assert_array_equal(storage.getMaxValues(allStates),
+                                      reference.getMaxValues(allStates))
+
+    def assertCacheIsCorrect(self, storage) -> None:
+        """checks the cached best action and max QValue of every state against argmax and max"""
+        allStates = np.arange(self.NUM_STATES)
+        table = storage.toArray()
+        np.testing.assert_array_equal(storage.getBestActionIndices(allStates),
+                                      table.argmax(axis=0))
+        np.testing.assert_array_equal(storage.getMaxValues(allStates), table.max(axis=0))
+
+    def checkSetValueKeepsTheCache(self, storage) -> None:
+        """writes one value at a time to a few states, drawing the values from a handful so
+        there are lots of ties, and often lowering the best value of the state"""
+        states = np.array([0, 1, FILE_BLOCK_STATES, self.NUM_STATES - 1])
+        for _ in range(2000):
+            state = int(self.random.choice(states))
+            if self.random.random() < 0.3:
+                actionIndex = int(storage.getBestActionIndex(state))
+                value = float(storage.getMaxValue(state)) - float(self.random.integers(1, 3))
+            else:
+                actionIndex = int(self.random.integers(0, self.NUM_ACTIONS))
+                value = float(self.random.integers(-2, 3))
+            storage.setValue(actionIndex, state, value)
+            column = storage.getColumns(np.array([state]))[:, 0]
+            self.assertEqual(storage.getBestActionIndex(state), column.argmax())
+            self.assertEqual(storage.getMaxValue(state), column.max())
+        self.assertCacheIsCorrect(storage)
+
+    def checkBatchWritesKeepTheCache(self, storage) -> None:
+        """writes batches with repeated locations, which can raise or lower the best values"""
+        for _ in range(50):
+            actionIndices, states, values = self.randomWrites(200)
+            states[100:] = states[:100] # every state in the batch twice
+            storage.setValues(actionIndices, states, np.rint(values))
+            self.assertCacheIsCorrect(storage)
+            storage.addToValues(actionIndices, states, -np.abs(values))
+            self.assertCacheIsCorrect(storage)
+
+    def testDenseSetValueKeepsTheCache(self):
+        self.checkSetValueKeepsTheCache(self.makeStorages()[0])
+
+    def testDenseBatchWritesKeepTheCache(self):
+        self.checkBatchWritesKeepTheCache(self.makeStorages()[0])
+
+    def testSparseSetValueKeepsTheCache(self):
+        self.checkSetValueKeepsTheCache(self.makeStorages()[1])
+
+    def testSparseBatchWritesKeepTheCache(self):
+        # enough states are written for the sparse columns to grow several times
+        sparse = self.makeStorages()[1]
+        self.checkBatchWritesKeepTheCache(sparse)
+        self.assertGreater(sparse.getNumVisitedStates(), 4 * SPARSE_QTABLE_INITIAL_COLUMNS)
+
+    def testInt16WritesKeepTheCache(self):
+        # many more values tie once they are rounded to int16 steps
+        for storage in self.makeStorages("int16", 0.5, -1.0):
+            self.checkSetValueKeepsTheCache(storage)
+            self.checkBatchWritesKeepTheCache(storage)
+
+    def testInt16RoundsToTheNearestStepAndClips(self):
+        scale, offset = 0.01, 3.0
+        for storage in self.makeStorages("int16", scale, offset):
+            states = np.arange(0, self.NUM_STATES, 97)
+            actionIndices = states % self.NUM_ACTIONS
+            values = self.random.normal(0, 50, len(states))
+            storage.setValues(actionIndices, states, values)
+            stored = storage.getValues(actionIndices, states)
+            self.assertLessEqual(np.abs(stored - values).max(), scale / 2 + 1e-9)
+            np.testing.assert_array_equal(storage.getRawArray()[actionIndices, states],
+                                          np.rint((values - offset) / scale))
+            storage.setValue(0, 1, 1e9)
+            storage.setValue(1, 1, -1e9)
+            self.assertAlmostEqual(storage.getValue(0, 1), 32767 * scale + offset)
+            self.assertAlmostEqual(storage.getValue(1, 1), -32768 * scale + offset)
+            self.assertEqual(storage.getBestActionIndex(1), 0)
+
+    def testRefusesBadValueFormats(self):
+        self.assertRaises(ValueError, DenseQStorage, 2, 2, "int8")
+        self.assertRaises(ValueError, SparseQStorage, 2, 2, "int16", 0.0)
+
+    def testTiesGoToTheLowestAction(self):
+        # like argmax, so the cache never disagrees with searching the column
+        storage = self.makeStorages()[0]
+        storage.setValue(4, 3, 1.0)
+        storage.setValue(2, 3, 1.0)
+        self.assertEqual(storage.getBestActionIndex(3), 2)
+        storage.setValue(2, 3, 0.5)
+        self.assertEqual(storage.getBestActionIndex(3), 4)
+        # a column of 0s, as every state starts
+        self.assertEqual(storage.getBestActionIndex(5), 0)
+
+    def testSparseWritesTheSameRawArray(self):
+        dense, sparse = self.makeStorages()
+        for storage in (dense, sparse):
+            storage.setValues(*self.randomWrites(500))
+            self.random = np.random.default_rng(0)
+        out = np.empty((self.NUM_ACTIONS, self.NUM_STATES), dtype=sparse.getDtype())
+        sparse.writeRawArray(out)
+        np.testing.assert_array_equal(out, dense.getRawArray())
+        dense.writeRawArray(out)
+        np.testing.assert_array_equal(out, dense.getRawArray())
+
+    def testLoadOnlyGivesColumnsToStatesThatArentZero(self):
+        dense, sparse = self.makeStorages()
+        dense.setValues(*self.randomWrites(300))
+        sparse.setValue(2, 5, 1.0) # loading replaces everything already there
+        loadedStates = sparse.loadArray(dense.getRawArray())
+        self.assertSameTable(sparse, dense)
+        expectedStates = np.flatnonzero(np.any(dense.toArray() != 0, axis=0))
+        np.testing.assert_array_equal(loadedStates, expectedStates)
+        self.assertEqual(sparse.getNumVisitedStates(), len(expectedStates))
+        np.testing.assert_array_equal(dense.loadArray(dense.getRawArray().copy()), expectedStates)
+
+    def testLoadDecodesInt16(self):
+        scale, offset = 0.01, 3.0
+        int16Dense, _ = self.makeStorages("int16", scale, offset)
+        int16Dense.setValues(*self.randomWrites(300))
+        for storage in self.makeStorages("float64"):
+            storage.loadArray(int16Dense.getRawArray(), scale, offset)
+            np.testing.assert_allclose(storage.toArray(), int16Dense.toArray(), atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""checks that exporting a QTable as text writes exactly the bytes QTable.writeTableToFile always
+wrote, however many blocks the states are split into, so anything that reads QTable.txt still
+can. Run from the repository folder with:
+    python -m unittest discover -s Tests -p "*Test.py"
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Prototype2"))
+from QTableExporter import *
+from QTableFile import *
+
+
+class QTableExporterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.directory.name, "QTable.txt")
+        self.actions = [str(action) for action in range(ACTION_SHAPE[0], ACTION_SHAPE[1] + 1,
+                                                         ACTION_SHAPE[2])]
+        random = np.random.default_rng(0)
+        numStates = StateEncoder().getNumStates()
+        # every sign and a wide range of sizes, as formatting them is where it could differ
+        self.table = (random.normal(0, 1, (len(self.actions), numStates)) *
+                      10.0 ** random.integers(-6, 6, (len(self.actions), numStates)))
+        self.table[:, ::5] = 0
+        self.table = self.table.astype("float32")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def writeOldText(self) -> str:
+        """the text QTable.writeTableToFile wrote before the exporter replaced it"""
+        allStates = []
+        for s in range(STATE_SHAPE[0][0], STATE_SHAPE[1][0]+1, STATE_SHAPE[2][0]):
+            for d in range(STATE_SHAPE[0][1], STATE_SHAPE[1][1]+1, STATE_SHAPE[2][1]):
+                for v in range(STATE_SHAPE[0][2], STATE_SHAPE[1][2]+1, STATE_SHAPE[2][2]):
+                    allStates.append(f"{s}{d:02d}{v:03d}")
+        text = "   |  "+",   ".join(allStates)
+        text += "\n---"+"----------"*len(allStates)
+        for i, action in enumerate(self.actions):
+            formatted = []
+            for col in self.table[i]:
+                if col >= 0:
+                    formatted.append(f"{col:.2E}")
+                else:
+                    formatted.append(f"{col:.1E}")
+            text += f"\n{action} | "+"  ".join(formatted)
+        return text
+
+    def export(self) -> str:
+        """exports the table as text
+
+        Returns:
+            str: the text of the file
+        """
+        exporter = QTableExporter(lambda states: self.table[:, states], self.actions)
+        exporter.export(self.fileName)
+        with open(self.fileName, "r") as f:
+            return f.read()
+
+    def testTextMatchesTheOldQTableFile(self):
+        oldText = self.writeOldText()
+        self.assertEqual(self.export(), oldText)
+        # blocks that don't divide the states evenly, one state and every state at once
+        for blockStates in (7, 1, StateEncoder().getNumStates()):
+            with mock.patch("QTableExporter.EXPORT_BLOCK_STATES", blockStates):
+                self.assertEqual(self.export(), oldText)
+
+    def testTextCanBeImported(self):
+        # negative values only keep 2 significant figures
+        self.export()
+        np.testing.assert_allclose(QTableFile.loadLegacyText(self.fileName), self.table,
+                                   rtol=0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""checks the binary QTable file format: a saved table and its header are loaded back exactly,
+files written by older versions of the format can still be read and files that aren't
+QTables, or were saved with other shape constants, are refused. Run from the repository
+folder with:
+    python -m unittest discover -s Tests -p "*Test.py"
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Prototype2"))
+from QTableFile import *
+
+
+class QTableFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.directory.name, "test.qtable")
+        numActions = len(range(ACTION_SHAPE[0], ACTION_SHAPE[1] + 1, ACTION_SHAPE[2]))
+        numStates = StateEncoder().getNumStates()
+        self.table = np.random.default_rng(0).normal(0, 10, (numActions, numStates))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def writeHeaderField(self, field: str, value) -> None:
+        """overwrites one field of the header of the saved file"""
+        dtype, offset = QTableFile.HEADER_DTYPE.fields[field][:2]
+        with open(self.fileName, "r+b") as f:
+            f.seek(offset)
+            # the base dtype, so a (3, 3) shape field takes a (3, 3) value
+            f.write(np.array(value, dtype=dtype.base).tobytes())
+
+    def testRoundTrip(self):
+        for dtype in ("float64", "float32", "float16", "int16"):
+            table = self.table.astype(dtype)
+            QTableFile.save(self.fileName, table, 1234, 0.25, -3.0, 99)
+            data, header = QTableFile.load(self.fileName)
+            self.assertEqual(data.dtype, table.dtype)
+            np.testing.assert_array_equal(data, table)
+            self.assertEqual(header, {"version": QTableFile.VERSION, "dtype": table.dtype,
+                                      "iterations": 1234, "scale": 0.25, "offset": -3.0,
+                                      "journalSequence": 99})
+            del data
+        self.assertFalse(os.path.exists(self.fileName + ".tmp"))
+        self.assertEqual(os.path.getsize(self.fileName),
+                         QTableFile.HEADER_SIZE + self.table.size * np.dtype("int16").itemsize)
+
+    def testWriteProgressOnlyChangesTheProgress(self):
+        table = self.table.astype("float32")
+        QTableFile.save(self.fileName, table, 10, journalSequence=5)
+        QTableFile.writeProgress(self.fileName, 20, 7)
+        data, header = QTableFile.load(self.fileName)
+        np.testing.assert_array_equal(data, table)
+        self.assertEqual((header["iterations"], header["journalSequence"]), (20, 7))
+
+    def testReadsOlderVersions(self):
+        # older versions had the same layout with the newer fields left as 0
+        QTableFile.save(self.fileName, self.table.astype("float32"), 10, 0.5, 2.0, 7)
+        self.writeHeaderField("version", 2)
+        header = QTableFile.readHeader(self.fileName)
+        self.assertEqual((header["version"], header["scale"], header["offset"]), (2, 0.5, 2.0))
+        self.assertEqual(header["journalSequence"], 0)
+        self.writeHeaderField("version", 1)
+        header = QTableFile.readHeader(self.fileName)
+        self.assertEqual((header["scale"], header["offset"], header["journalSequence"]),
+                         (1.0, 0.0, 0))
+        self.assertEqual(header["iterations"], 10)
+
+    def testRefusesOtherFiles(self):
+        QTableFile.save(self.fileName, self.table.astype("float32"), 10)
+        self.writeHeaderField("version", QTableFile.VERSION + 1)
+        self.assertRaises(ValueError, QTableFile.readHeader, self.fileName)
+        self.writeHeaderField("version", QTableFile.VERSION)
+        self.writeHeaderField("stateShape", np.array(STATE_SHAPE) + 1)
+        self.assertRaises(ValueError, QTableFile.load, self.fileName)
+        self.writeHeaderField("magic", b"QTBX")
+        self.assertRaises(ValueError, QTableFile.load, self.fileName)
+        with open(self.fileName, "wb") as f:
+            f.write(b"QT")
+        self.assertRaises(ValueError, QTableFile.load, self.fileName)
+
+
+if __name__ == '__main__':
+    unittest.main()
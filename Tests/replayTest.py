@@ -0,0 +1,99 @@
+"""checks experience replay: the ring buffer keeps the most recent transitions, prioritised
+sampling picks them in proportion to their TD errors, nothing is replayed until the buffer
+holds a whole batch and replaying the same transition over and over converges instead of
+overshooting. Run from the repository folder with:
+    python -m unittest discover -s Tests -p "*Test.py"
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Prototype2"))
+from QAgent import *
+
+
+class ReplayBufferTest(unittest.TestCase):
+    def testOverwritesTheOldestTransition(self):
+        buffer = ReplayBuffer(4, RandomStream(0))
+        self.assertEqual(buffer.sample(3), EMPTY)
+        indices = [buffer.add(state, 30, 1.0, state + 1, False) for state in range(6)]
+        self.assertEqual(indices, [0, 1, 2, 3, 0, 1])
+        self.assertEqual(buffer.getSize(), 4)
+        states, actions, rewards, nextStates, dones, sampled, weights = buffer.sample(1000)
+        # states 0 and 1 were overwritten by 4 and 5
+        self.assertEqual(set(states.tolist()), {2, 3, 4, 5})
+        np.testing.assert_array_equal(nextStates, states + 1)
+        np.testing.assert_array_equal(states % 4, sampled)
+        np.testing.assert_array_equal(weights, 1.0)
+
+    def testRefusesNoCapacity(self):
+        self.assertRaises(ValueError, ReplayBuffer, 0)
+
+
+class PrioritisedReplayBufferTest(unittest.TestCase):
+    def testSamplesByTDError(self):
+        buffer = PrioritisedReplayBuffer(4, alpha=1.0, beta=1.0, randomStream=RandomStream(0))
+        for state in range(4):
+            buffer.add(state, 30, 1.0, state + 1, False)
+        tdErrors = np.array([0.0, 1.0, 3.0, 6.0])
+        buffer.updatePriorities(np.arange(4), tdErrors)
+        states, _, _, _, _, indices, weights = buffer.sample(100000)
+        priorities = tdErrors + REPLAY_PRIORITY_EPSILON
+        np.testing.assert_allclose(np.bincount(states, minlength=4) / len(states),
+                                   priorities / priorities.sum(), atol=0.005)
+        # the rarest picked transition gets the largest weight, which is 1
+        self.assertEqual(weights.max(), 1.0)
+        np.testing.assert_allclose(weights, priorities.min() / priorities[indices])
+        # a new transition gets the largest priority so far
+        self.assertEqual(buffer.add(9, 30, 1.0, 10, False), 0)
+        states = buffer.sample(100000)[0]
+        self.assertAlmostEqual(np.mean(states == 9),
+                               priorities.max() / (priorities[1:].sum() + priorities.max()),
+                               places=2)
+
+
+class QAgentReplayTest(unittest.TestCase):
+    STATE = 5
+    NEXT_STATE = 6
+    ACTION = "40"
+
+    def setUp(self):
+        self.agent = QAgent(EMPTY, randomStream=RandomStream(0))
+
+    def tearDown(self):
+        self.agent.close()
+
+    def trainRepeatedly(self, numIterations: int, reward: float) -> None:
+        """trains the same transition, which ends the run, over and over"""
+        for _ in range(numIterations):
+            self.assertTrue(self.agent.train(self.STATE, self.NEXT_STATE, self.ACTION, reward,
+                                             True))
+
+    def testNothingIsReplayedUntilTheBufferHoldsABatch(self):
+        self.trainRepeatedly(REPLAY_BATCH_SIZE - 1, 1.0)
+        qValues = self.agent.getAllQValues()
+        self.assertEqual(self.agent.replay(), 0)
+        np.testing.assert_array_equal(self.agent.getAllQValues(), qValues)
+        self.trainRepeatedly(1, 1.0)
+        self.assertEqual(self.agent.replay(), REPLAY_BATCH_SIZE)
+        self.assertEqual(self.agent.getNumTrainingIterations(), REPLAY_BATCH_SIZE)
+
+    def testReplayOfDuplicatesConverges(self):
+        # every transition in the buffer is the same, so every replayed batch is all duplicates
+        reward = 5.0
+        self.trainRepeatedly(REPLAY_BATCH_SIZE, reward)
+        previousError = np.inf
+        for _ in range(200):
+            self.assertEqual(self.agent.replay(), REPLAY_BATCH_SIZE)
+            qValue = self.agent.getAllQValues().max()
+            self.assertTrue(np.isfinite(qValue))
+            self.assertLessEqual(qValue, reward + 1e-4)
+            self.assertLessEqual(abs(reward - qValue), previousError + 1e-6)
+            previousError = abs(reward - qValue)
+        self.assertAlmostEqual(qValue, reward, places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
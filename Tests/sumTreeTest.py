@@ -0,0 +1,63 @@
+"""checks that the SumTree used by prioritised replay picks items in proportion to their
+priorities. Run from the repository folder with:
+    python -m unittest discover -s Tests -p "*Test.py"
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Prototype2"))
+from SumTree import SumTree
+
+
+class SumTreeTest(unittest.TestCase):
+    NUM_SAMPLES = 200000
+
+    def sampleFrequencies(self, tree: SumTree, capacity: int) -> np.ndarray:
+        """picks NUM_SAMPLES items with values spread uniformly over the total priority
+
+        Returns:
+            np.ndarray: the fraction of the samples that landed on each item
+        """
+        values = np.random.default_rng(0).uniform(0, tree.getTotal(), self.NUM_SAMPLES)
+        counts = np.bincount(tree.find(values), minlength=capacity)
+        return counts / self.NUM_SAMPLES
+
+    def testTotalIsTheSumOfThePriorities(self):
+        tree = SumTree(6)
+        priorities = np.array([1.0, 2.0, 3.0, 4.0, 0.0, 10.0])
+        tree.update(np.arange(6), priorities)
+        self.assertAlmostEqual(tree.getTotal(), priorities.sum())
+        np.testing.assert_array_equal(tree.getPriorities(np.arange(6)), priorities)
+
+    def testSamplesInProportionToPriority(self):
+        # 6 items are padded to 8 leaves, the padding must never be picked
+        tree = SumTree(6)
+        priorities = np.array([1.0, 2.0, 3.0, 4.0, 0.0, 10.0])
+        tree.update(np.arange(6), priorities)
+        frequencies = self.sampleFrequencies(tree, 6)
+        np.testing.assert_allclose(frequencies, priorities / priorities.sum(), atol=0.005)
+        self.assertEqual(frequencies[4], 0.0)
+
+    def testUpdatesChangeTheProportions(self):
+        tree = SumTree(5)
+        tree.update(np.arange(5), np.ones(5))
+        # the same item twice in one update, the last priority given is the one kept
+        tree.update(np.array([0, 3, 3]), np.array([6.0, 1.0, 2.0]))
+        priorities = np.array([6.0, 1.0, 1.0, 2.0, 1.0])
+        self.assertAlmostEqual(tree.getTotal(), priorities.sum())
+        np.testing.assert_allclose(self.sampleFrequencies(tree, 5),
+                                   priorities / priorities.sum(), atol=0.005)
+
+    def testValuesAtTheEndsStayInRange(self):
+        tree = SumTree(3)
+        tree.update(np.arange(3), np.array([1.0, 1.0, 1.0]))
+        indices = tree.find(np.array([0.0, tree.getTotal(), tree.getTotal() * (1 + 1e-12)]))
+        self.assertEqual(indices[0], 0)
+        self.assertTrue(np.all(indices < 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
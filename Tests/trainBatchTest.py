@@ -0,0 +1,117 @@
+"""checks training many cars at once: a batch of transitions gives each (state, action) pair one
+update however many cars made it, so more cars can't make the QTable diverge, and the
+vectorised simulation deslots cars as often as the one car simulation does. Run from the
+repository folder with:
+    python -m unittest discover -s Tests -p "*Test.py"
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Prototype2"))
+from QAgent import *
+from simulation import *
+
+
+class TrainBatchTest(unittest.TestCase):
+    STATE = 5
+    NEXT_STATE = 6
+    ACTION = "40"
+
+    def setUp(self):
+        self.batchAgent = QAgent(EMPTY, randomStream=RandomStream(0))
+        self.sequentialAgent = QAgent(EMPTY, randomStream=RandomStream(0))
+
+    def tearDown(self):
+        self.batchAgent.close()
+        self.sequentialAgent.close()
+
+    def testBatchOfDuplicatesIsOneUpdate(self):
+        # 1000 cars making the same transition move the QValue as far as 1 car would
+        numCars = 1000
+        self.batchAgent.trainBatch(np.full(numCars, self.STATE),
+                                   np.full(numCars, self.NEXT_STATE),
+                                   np.full(numCars, int(self.ACTION)), np.full(numCars, 2.0),
+                                   np.ones(numCars, dtype="bool"))
+        self.sequentialAgent.train(self.STATE, self.NEXT_STATE, self.ACTION, 2.0, True)
+        np.testing.assert_allclose(self.batchAgent.getAllQValues(),
+                                   self.sequentialAgent.getAllQValues())
+        self.assertEqual(self.batchAgent.getNumTrainingIterations(), numCars)
+
+    def testDuplicatesShareTheirAverageUpdate(self):
+        # the cars' TD errors are averaged, so the update is towards their mean reward
+        rewards = np.array([1.0, 2.0, 6.0, -1.0])
+        numCars = len(rewards)
+        self.batchAgent.trainBatch(np.full(numCars, self.STATE),
+                                   np.full(numCars, self.NEXT_STATE),
+                                   np.full(numCars, int(self.ACTION)), rewards,
+                                   np.ones(numCars, dtype="bool"))
+        self.sequentialAgent.train(self.STATE, self.NEXT_STATE, self.ACTION, rewards.mean(),
+                                   True)
+        np.testing.assert_allclose(self.batchAgent.getAllQValues(),
+                                   self.sequentialAgent.getAllQValues())
+
+    def testBatchMatchesSequentialForDistinctPairs(self):
+        # with no duplicates and no pair's next state trained in the same batch, a batch is
+        # exactly the same as training the transitions one at a time
+        states = np.arange(0, 40)
+        nextStates = states + 40
+        actions = 30 + 2 * (states % 31)
+        rewards = np.linspace(-3, 3, len(states))
+        dones = states % 3 == 0
+        self.batchAgent.trainBatch(states, nextStates, actions, rewards, dones)
+        for transition in zip(states, nextStates, actions, rewards, dones):
+            state, nextState, action, reward, done = transition
+            self.sequentialAgent.train(int(state), int(nextState), str(action), float(reward),
+                                       bool(done))
+        np.testing.assert_allclose(self.batchAgent.getAllQValues(),
+                                   self.sequentialAgent.getAllQValues(), rtol=1e-6)
+
+    def testInvalidStatesAreSkipped(self):
+        numStates = StateEncoder().getNumStates()
+        trained = self.batchAgent.trainBatch(np.array([self.STATE, -1, numStates]),
+                                             np.array([self.NEXT_STATE, 1, 1]),
+                                             np.full(3, int(self.ACTION)), np.ones(3),
+                                             np.zeros(3, dtype="bool"))
+        np.testing.assert_array_equal(trained, [True, False, False])
+        self.assertEqual(self.batchAgent.getNumTrainingIterations(), 1)
+
+
+class SimulateTracksTest(unittest.TestCase):
+    NUM_CARS = 4000
+    # so long that every car that isn't crawling passes exactly one corner each step, which
+    # puts them on the first two turns of the track for the first two steps
+    TIME_STEP = 6.0
+    # from crawling (< 400 mm/s) to flat out (> 800 mm/s), to reach every branch of the
+    # deslot decision with every previous speed
+    ACTIONS = ("40", "50", "60", "72", "84")
+
+    def testDeslotsAsOftenAsOneCar(self):
+        random = RandomStream(0)
+        for firstAction in self.ACTIONS:
+            for secondAction in self.ACTIONS:
+                cars = SimulateTracks(self.TIME_STEP, self.NUM_CARS, random)
+                singleCars = [SimulateTrack(self.TIME_STEP, random)
+                              for _ in range(self.NUM_CARS)]
+                for action in (firstAction, secondAction):
+                    cars.doActions(np.full(self.NUM_CARS, int(action)))
+                    for car in singleCars:
+                        car.doAction(action)
+                    singleDeslotted = np.mean([car.getDeslotted() for car in singleCars])
+                    self.assertAlmostEqual(cars.getDeslotted().mean(), singleDeslotted,
+                                           delta=0.04, msg=f"{firstAction}, {secondAction}")
+
+    def testResetsOnlyTheCarsGiven(self):
+        cars = SimulateTracks(0.3, 3, RandomStream(0))
+        for _ in range(20):
+            cars.doActions(np.full(3, 90))
+        self.assertTrue(cars.getDeslotted().all())
+        cars.resetCars(np.array([True, False, True]))
+        np.testing.assert_array_equal(cars.getDeslotted(), [False, True, False])
+        np.testing.assert_array_equal(cars.getStatesAndSpeeds()[1], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()